@@ -0,0 +1,34 @@
+# ==============================================================================
+# gunicorn Config สำหรับ linux_api (Production)
+#   gunicorn -c gunicorn.conf.py
+# ปรับผ่าน Environment: OBOT_BIND, OBOT_WORKERS, OBOT_THREADS, OBOT_SCHEDULER_LOCK,
+#                        OBOT_STATE_BACKEND, OBOT_STATE_DB, OBOT_STAGED_STARTUP, OBOT_SESSION_DIR
+# ==============================================================================
+import os
+
+# หลาย Worker ต้องเห็น bot_status / News Lockdown เดียวกัน -> ใช้ SQLite State Store
+os.environ.setdefault('OBOT_STATE_BACKEND', 'sqlite')
+# Delta Ingestion ของ EA (UseDeltaIngestion = true): Session ต้องอยู่ในไฟล์ที่ทุก Worker อ่านได้ ไม่งั้น Delta ที่ตกอีก Worker = RESYNC
+os.environ.setdefault('OBOT_SESSION_DIR', '/tmp/obot_sessions')
+
+wsgi_app = 'linux_api:create_app()'
+
+bind = os.environ.get('OBOT_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('OBOT_WORKERS', '2'))
+threads = int(os.environ.get('OBOT_THREADS', '4'))
+worker_class = 'gthread'
+
+if workers > 1 and not os.environ['OBOT_SESSION_DIR']:
+    # Session ไม่ได้ใช้ร่วมกัน (OBOT_SESSION_DIR='') -> หลาย Worker จะวน RESYNC -> ใช้ Worker เดียวแต่เพิ่ม Thread แทน
+    print(f"⚠️ OBOT_SESSION_DIR is empty: running 1 worker x {workers * threads} threads instead of {workers} workers.")
+    workers, threads = 1, workers * threads
+
+# Master โหลด model.h5 / Scaler ครั้งเดียวก่อน fork (create_app -> preload_assets)
+preload_app = True
+timeout = 120  # OBOT_STAGED_STARTUP=0: Worker ต้อง Trace Graph + Parity Check ก่อนรับ Request
+
+
+# Staged Startup (ค่าเริ่มต้น): post_fork คืนทันที -> Worker รับ /status ได้เลย, Model โหลดใน Background Thread
+def post_fork(server, worker):
+    import linux_api
+    linux_api.init_worker()
@@ -8,15 +8,14 @@ import numpy as np
 import pandas as pd
 import os
 import sys
+import fcntl
 import inspect
 import pickle
 import json
 import traceback
 import numpy as np
 import pandas as pd
-import requests 
-from flask import Flask, request, jsonify
-from tensorflow.keras.models import load_model
+from flask import Flask, Response, request, jsonify
 import warnings
 import subprocess
 import sqlite3
@@ -24,9 +23,7 @@ import threading
 import time      
 import pytz
 from datetime import datetime, timedelta 
-from bs4 import BeautifulSoup 
-from playwright.sync_api import sync_playwright
-import talib
+# (TensorFlow / Playwright / BeautifulSoup / requests ถูก Import ตอนใช้ครั้งแรก -> ดู Staged Startup)
 
 # Suppress TensorFlow and other library warnings
 warnings.filterwarnings("ignore")
@@ -40,7 +37,24 @@ try:
         sys.path.append(root_dir)
     
     # [v7.1] Import from linux_model.py
-    from linux_model import compute_features_lite, scale_features, REQUIRED_FEATURES
+    from linux_model import (
+        compute_features_lite, FeatureWindows, FeatureBuffer, REQUIRED_FEATURES, INDICATOR_COLUMNS, FEATURE_SET_VERSION,
+        StreamingFeatureEngine
+    )
+    from linux_ingest import (
+        SessionStore, ResyncRequired, bars_to_columns, sort_columns, decode_bar_payload, decode_wire_payload, bar_count,
+        BAR_FIELDS, WIRE_CONTENT_TYPE
+    )
+    from linux_cache import LRUCache, bars_fingerprint
+    from linux_inference import ModelRegistry, ModelRouter, import_tensorflow
+    from linux_config import Config, default_route, configured_routes
+    from linux_state import make_state_store
+    from linux_news import PersistentBrowser, NewsIntervalIndex
+    from linux_jobs import JobManager
+    from linux_metrics import PipelineMetrics
+    from linux_startup import StagedStartup
+    from linux_filters import SignalDecision, run_pipeline, dynamic_risk
+    from linux_train import promote as promote_model_version
     
     print("✅ External model functions (18 Features - v7.1) loaded successfully.")
 except ImportError as e:
@@ -51,23 +65,18 @@ except Exception as e:
     sys.exit(1)
 
 # --- Configuration ---
-
-class Config:
-    # Path Config for LITE Model
-    MODEL_PATH = 'models/model.h5'
-    SCALER_PATH = 'models/scaler.pkl'
-
-    SEQUENCE_LENGTH = 50
-    PREDICTION_THRESHOLD = 0.55 
-    NEWS_LOCKDOWN_MINUTES = 30
-    MIN_ATR = 1.0
-    USE_EMA_FILTER = True
+# (Config + Default Route อยู่ที่ linux_config.py -> ใช้ร่วมกับ linux_backtest โดยไม่ต้อง Import Server นี้)
 
 app = Flask(__name__)
 
 # Global Variables
-lite_model = None
-scaler = None
+# Model + Scaler + Inference Backend ชุดปัจจุบัน (Hot Swap ได้ระหว่างเทรด ดู linux_inference.ModelRegistry)
+model_registry = ModelRegistry()
+
+# Preload ใน gunicorn Master (ก่อน fork): เก็บแค่ Bytes ของ model.h5 / scaler.pkl
+# (TensorFlow Runtime ใช้ข้าม fork ไม่ได้ -> Worker สร้าง Graph เองจาก Bytes นี้)
+preloaded_model_bytes = None
+preloaded_scaler_bytes = None
 
 REQUIRED_FEATURES = [
     'log_ret_1', 'log_ret_5', 'dist_ema50', 'dist_h1_ema',
@@ -79,50 +88,93 @@ REQUIRED_FEATURES = [
     'usd_ret_5', 'usd_corr'
 ]
 
-account_status = {
-    'bot_status': 'STOPPED', 'balance': 0.0, 'equity': 0.0,
-    'margin_free': 0.0, 'open_trades': 0, 'last_signal': 'NONE',
-    'last_regime': 'V7.1' 
-}
-
-news_lockdown = {'active': False, 'message': 'News filter starting...'}
-news_lock = threading.Lock() 
+def model_load_kwargs():
+    """Argument ของ ModelRegistry.load ที่ทุก Route ใช้ร่วมกัน"""
+    return dict(
+        backend=Config.INFERENCE_BACKEND, parity_atol=Config.INFERENCE_PARITY_ATOL,
+        batch_window_ms=Config.BATCH_WINDOW_MS if Config.USE_MICRO_BATCHING else None,
+        max_batch=Config.MAX_BATCH_SIZE, fast_scaler=Config.USE_FAST_SCALER
+    )
+
+# Routing Table: Default Route (linux_config.default_route) ใช้ model_registry + Route เพิ่มเติมจาก MODEL_ROUTES_PATH
+model_router = ModelRouter(model_load_kwargs(), max_models=Config.MAX_LOADED_MODELS, max_mb=Config.MAX_MODELS_MB)
+model_router.add(default_route, model_registry)
+try:
+    for route in configured_routes():
+        model_router.add(route)
+        print(f"✅ Model route {route.name} registered ({route.model_path}).")
+except (OSError, ValueError) as e:
+    print(f"❌ Could not load model routes from {Config.MODEL_ROUTES_PATH}: {e}")
+
+# Shared State: 'account' (bot_status, Balance, Last Signal) + 'news' (Lockdown)
+# -> START/STOP ผ่าน /command เห็นทุก Worker เมื่อใช้ STATE_BACKEND = 'sqlite'
+state_store = make_state_store(Config.STATE_BACKEND, {
+    'account': {
+        'bot_status': 'STOPPED', 'balance': 0.0, 'equity': 0.0,
+        'margin_free': 0.0, 'open_trades': 0, 'last_signal': 'NONE',
+        'last_regime': 'V7.1' 
+    },
+    'news': {'message': 'News filter starting...'}
+}, path=Config.STATE_DB_PATH)
+
+# Background Jobs (/retrain, /fix, /update_ea) - สถานะอยู่ใน state_store namespace 'jobs'
+job_manager = JobManager(state_store, lock_path=Config.JOB_LOCK_FILE)
+
+# Checksum ของ Default Model ที่ Job ล่าสุด Publish (state_store namespace 'models') -> Worker อื่น Reload ตาม
+model_sync_lock = threading.Lock()
+model_sync_attempted = None
+
+# เวลาแต่ละขั้นของ /predict + Error/Cache Counter (Snapshot ต่อ Worker ใน namespace 'metrics' ของ Store แยก)
+metrics = PipelineMetrics(
+    make_state_store(Config.STATE_BACKEND, {}, path=Config.METRICS_DB_PATH), flush_seconds=Config.METRICS_FLUSH_SECONDS
+)
+
+# สถานะ Startup ของ Process นี้ (ดู start_staged_startup)
+startup = StagedStartup()
+
+# Streaming Feature Engines (1 Engine ต่อ Symbol)
+feature_engines = {}
+feature_engines_lock = threading.Lock()
+
+# Columnar Feature Buffer (1 Buffer ต่อ Thread, ใช้ซ้ำทุก Request)
+feature_buffers = threading.local()
+
+# Cache: Feature Window (ใช้ข้าม Model Version ได้) / ผลทำนาย (ผูกกับ Model Version)
+feature_cache = LRUCache(Config.CACHE_MAX_ENTRIES, Config.CACHE_MAX_MB * 1024 * 1024, Config.CACHE_TTL_SECONDS)
+result_cache = LRUCache(Config.CACHE_MAX_ENTRIES, 1024 * 1024, Config.CACHE_TTL_SECONDS)
+
+# Delta Ingestion Sessions (Ring Buffer ต่อ Terminal/Symbol, ใช้ร่วมกันทุก Worker ผ่าน SESSION_DIR)
+bar_sessions = SessionStore(
+    ttl_seconds=Config.SESSION_TTL_SECONDS, max_sessions=Config.MAX_SESSIONS,
+    capacity=Config.RING_BUFFER_BARS, max_rows=Config.STREAM_MAX_ROWS,
+    shared_dir=Config.SESSION_DIR or None
+)
 
 # --- News Filter Functions (Playwright) ---
+news_browser = PersistentBrowser(headless=True)
+news_index = NewsIntervalIndex(Config.NEWS_INDEX_PATH, window_minutes=Config.NEWS_LOCKDOWN_MINUTES)
+
 def fetch_html_with_playwright(url):
     """
-    ใช้ Playwright เพื่อเปิดเว็บ, รอข้อมูลโหลด, แล้วคืนค่า HTML
+    ใช้ Playwright (Browser ที่เปิดค้างไว้) เปิดเว็บ, รอจนตารางข่าวโหลด, แล้วคืนค่า HTML
     """
     html_content = None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True) 
-            page = browser.new_page()
-            
-            print(f"NEWS: Playwright accessing {url}...")
-            page.goto(url, timeout=20000, wait_until='domcontentloaded')
-            
-            # (รอ 5 วินาทีให้ JS โหลดข้อมูลข่าว)
-            print("NEWS: Waiting 5 seconds for dynamic content...")
-            time.sleep(5) 
-
-            html_content = page.content()
-            browser.close()
-            print("NEWS: Playwright successfully fetched HTML.")
+        print(f"NEWS: Playwright accessing {url}...")
+        # (รอแถวแรกของตารางข่าว แทนการรอ 5 วินาที)
+        html_content = news_browser.fetch(url, wait_selector='#eventDate_table_body tr', timeout_ms=20000)
+        print("NEWS: Playwright successfully fetched HTML.")
             
     except Exception as e:
         print(f"NEWS: Playwright Error: {e}")
-        if 'Target page, context or browser has been closed' in str(e):
-             print("NEWS: (INFO) Browser closed as expected.")
         
     return html_content
 
 def fetch_ff_news():
     """
-    ดึงปฏิทินข่าวจาก FXVerify ด้วย Playwright
+    ดึงปฏิทินข่าวจาก FXVerify ด้วย Playwright -> เก็บข่าวแดง USD ทุกข่าวลง news_index
+    (การตัดสินว่าอยู่ในช่วง Lockdown หรือไม่ ทำตอน /predict ด้วย news_index.active_event)
     """
-    global news_lockdown
-    
     url = "https://fxverify.com/tools/economic-calendar#popout" 
     
     try:
@@ -132,6 +184,7 @@ def fetch_ff_news():
         if not html_text:
             raise Exception("Playwright failed to fetch HTML (content is None).")
 
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_text, 'html.parser')
         
         # 2. ค้นหาตารางหลัก
@@ -145,8 +198,7 @@ def fetch_ff_news():
         # (จาก HTML: <tr ... class="ec-fx-table-event-row" ...>)
         rows = table_body.find_all('tr', class_='ec-fx-table-event-row')
         
-        found_event = None
-        now_utc = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        events = []
 
         if not rows:
             print("NEWS: No event rows found with class 'ec-fx-table-event-row'.")
@@ -176,19 +228,13 @@ def fetch_ff_news():
                 continue
             
             try:
-                # (แปลง Unix timestamp (ซึ่งเป็น UTC อยู่แล้ว)
-                event_dt_utc = datetime.fromtimestamp(int(timestamp_str), tz=pytz.UTC)
-                
-                # 7. (เหมือนเดิม) คำนวณ Lockdown
-                lockdown_start = event_dt_utc - timedelta(minutes=Config.NEWS_LOCKDOWN_MINUTES)
-                lockdown_end = event_dt_utc + timedelta(minutes=Config.NEWS_LOCKDOWN_MINUTES)
+                # (Unix timestamp ซึ่งเป็น UTC อยู่แล้ว)
+                event_ts = int(timestamp_str)
 
-                if lockdown_start <= now_utc <= lockdown_end:
-                    # 8. หาชื่อข่าว
-                    # (จาก HTML: <a class="event-name" ...>)
-                    event_name_tag = row.find('a', class_='event-name')
-                    found_event = event_name_tag.text.strip() if event_name_tag else "High Impact Event"
-                    break # เจอข่าวแล้ว หยุดค้นหา
+                # 7. หาชื่อข่าว
+                # (จาก HTML: <a class="event-name" ...>)
+                event_name_tag = row.find('a', class_='event-name')
+                events.append((event_ts, event_name_tag.text.strip() if event_name_tag else "High Impact Event"))
 
             except ValueError:
                 print(f"NEWS: Could not parse timestamp '{timestamp_str}'")
@@ -196,22 +242,24 @@ def fetch_ff_news():
 
         # --- 🛑 [จบส่วนที่แก้ไข] ---
         
-        # (อัปเดตสถานะ)
-        with news_lock:
-            if found_event:
-                news_lockdown['active'] = True
-                news_lockdown['message'] = f"LOCKDOWN: {found_event}"
-            else:
-                news_lockdown['active'] = False
-                news_lockdown['message'] = 'No high-impact USD news.'
+        # (อัปเดตปฏิทิน: ช่วง Lockdown ทั้งหมดของข่าวที่ดึงมา)
+        news_index.replace(events)
+        state_store.update('news', message=f"Calendar updated: {len(events)} high-impact USD events.")
         
-        print(f"NEWS: {news_lockdown['message']}")
+        print(f"NEWS: {state_store.get('news')['message']} Now: {get_news_status()}")
 
     except Exception as e:
         print(f"NEWS: Error fetching FXVerify (Playwright): {e}")
         traceback.print_exc()
-        with news_lock:
-            news_lockdown = {'active': False, 'message': 'Error fetching news.'}
+        # (ปฏิทินเดิมใน news_index ยังใช้ได้ต่อ)
+        state_store.update('news', message='Error fetching news.')
+
+def get_news_status(now=None):
+    """ข้อความสถานะข่าว ณ เวลานี้ (จาก news_index)"""
+    event = news_index.active_event(now)
+    if event:
+        return f"LOCKDOWN: {event}"
+    return 'No high-impact USD news.'
 
 def run_news_scheduler():
     fetch_ff_news() # (รันครั้งแรก)
@@ -219,11 +267,33 @@ def run_news_scheduler():
         time.sleep(3600) # (รอ 1 ชั่วโมง)
         fetch_ff_news()
 
+def run_news_scheduler_leader():
+    """
+    ทุก Worker เรียกได้ แต่มีแค่ Process ที่ได้ flock ของ SCHEDULER_LOCK_FILE ที่ Scrape ข่าว
+    (ถ้า Process นั้นตาย Lock จะถูกปล่อย แล้ว Worker อื่นรับช่วงต่อภายใน 60 วินาที)
+    """
+    lock_file = open(Config.SCHEDULER_LOCK_FILE, 'w')
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            time.sleep(60)
+            continue
+        print(f"NEWS: Scheduler leader is PID {os.getpid()}")
+        run_news_scheduler()
+
+def start_news_scheduler():
+    print("Starting background news scheduler (Playwright + FXVerify Scraper)...")
+    scheduler_thread = threading.Thread(target=run_news_scheduler_leader, daemon=True)
+    scheduler_thread.start()
+    return scheduler_thread
+
 # --- Download Function (Placeholder URLs) ---
 def download_model_assets():
     """
     Download Lite model/scaler from GitHub.
     """
+    import requests
     GITHUB_FILES = {
         'lite_model': {
             'url': 'https://raw.githubusercontent.com/bookhub10/models/main/models/model.h5', 
@@ -237,6 +307,8 @@ def download_model_assets():
 
     os.makedirs(os.path.dirname(Config.MODEL_PATH), exist_ok=True)
 
+    # ดาวน์โหลดลงไฟล์ชั่วคราวให้ครบทั้งคู่ก่อน แล้วค่อยแทนที่ -> ไม่มีจังหวะที่ Model/Scaler คนละชุดกัน
+    downloaded = []
     for file_info in GITHUB_FILES.values():
         url = file_info['url']
         output_path = file_info['filename']
@@ -246,17 +318,22 @@ def download_model_assets():
             response = requests.get(url)
             response.raise_for_status()
 
-            with open(output_path, 'wb') as f:
+            with open(output_path + '.download', 'wb') as f:
                 f.write(response.content)
+            downloaded.append(output_path)
 
             print(f"✅ Downloaded: {output_path}")
         except Exception as e:
             print(f"❌ Failed to download {output_path}: {e}")
             raise
 
+    for output_path in downloaded:
+        os.replace(output_path + '.download', output_path)
+
 # --- Download Python Files from GitHub ---
 def download_python_files():
     """Download the main Python scripts from GitHub."""
+    import requests
     GITHUB_PYTHON_FILES = {
         'linux_api': {
             'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_api.py',
@@ -269,6 +346,58 @@ def download_python_files():
         'linux_model': { 
             'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_model.py',
             'filename': 'linux_model.py'
+        },
+        'linux_ingest': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_ingest.py',
+            'filename': 'linux_ingest.py'
+        },
+        'linux_inference': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_inference.py',
+            'filename': 'linux_inference.py'
+        },
+        'linux_state': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_state.py',
+            'filename': 'linux_state.py'
+        },
+        'linux_news': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_news.py',
+            'filename': 'linux_news.py'
+        },
+        'linux_jobs': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_jobs.py',
+            'filename': 'linux_jobs.py'
+        },
+        'linux_cache': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_cache.py',
+            'filename': 'linux_cache.py'
+        },
+        'linux_backtest': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_backtest.py',
+            'filename': 'linux_backtest.py'
+        },
+        'linux_metrics': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_metrics.py',
+            'filename': 'linux_metrics.py'
+        },
+        'linux_bench': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_bench.py',
+            'filename': 'linux_bench.py'
+        },
+        'linux_startup': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_startup.py',
+            'filename': 'linux_startup.py'
+        },
+        'linux_filters': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_filters.py',
+            'filename': 'linux_filters.py'
+        },
+        'linux_train': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_train.py',
+            'filename': 'linux_train.py'
+        },
+        'linux_config': {
+            'url': 'https://raw.githubusercontent.com/bookhub10/models/main/linux_config.py',
+            'filename': 'linux_config.py'
         }
     }
 
@@ -293,23 +422,21 @@ def download_python_files():
 
 # --- Asset Management ---
 
-def load_assets():
-    """Load the Single Lite Model and Scaler."""
-    global lite_model, scaler
+def load_assets(model_bytes=None, scaler_bytes=None):
+    """
+    Load the Single Lite Model and Scaler. (model_bytes / scaler_bytes = ไฟล์ที่ Preload ไว้แล้ว)
+    โหลด + Validate + Warmup ชุดใหม่แยกต่างหาก แล้วสลับเข้าใช้งานทีเดียว
+    ถ้าไม่สำเร็จ ชุดเดิม (ถ้ามี) ยังให้บริการต่อ
+    """
     print("--- Attempting to load LITE Model System ---")
     try:
-        lite_model = load_model(Config.MODEL_PATH)
-        print(f"✅ Loaded Lite Model: {Config.MODEL_PATH}")
-        
-        with open(Config.SCALER_PATH, 'rb') as f:
-            scaler = pickle.load(f)
+        bundle = model_registry.load(
+            model_bytes if model_bytes is not None else Config.MODEL_PATH,
+            scaler_bytes if scaler_bytes is not None else Config.SCALER_PATH,
+            Config.SEQUENCE_LENGTH, len(REQUIRED_FEATURES), **model_load_kwargs()
+        )
+        print(f"✅ Loaded Lite Model: {Config.MODEL_PATH} (v{bundle.version}, PID {os.getpid()})")
         print(f"✅ Loaded Scaler: {Config.SCALER_PATH}")
-        
-        if hasattr(scaler, 'n_features_in_'):
-            print(f"DEBUG: Scaler expects {scaler.n_features_in_} features.")
-            if scaler.n_features_in_ != len(REQUIRED_FEATURES):
-                print(f"⚠️ WARNING: Scaler/Config mismatch. Scaler needs {scaler.n_features_in_}, Config has {len(REQUIRED_FEATURES)}")
-
         print("✅ All v7.1 assets loaded successfully.")
         return True
     except FileNotFoundError as e:
@@ -318,10 +445,81 @@ def load_assets():
         print(f"❌ Critical Error loading assets: {e}")
         traceback.print_exc()
 
-    lite_model = None
-    scaler = None
+    if model_registry.current is not None:
+        print(f"⚠️ Keeping model v{model_registry.current.version} in service.")
     return False
 
+def publish_model_version():
+    """หลัง Job Load Model ใหม่ใน Worker นี้สำเร็จ: Publish Checksum ลง state_store ให้ Worker อื่น Reload MODEL_PATH"""
+    bundle = model_registry.current
+    if bundle is not None:
+        state_store.update('models', default=bundle.checksum)
+
+def sync_model_version():
+    """
+    เรียกก่อน /predict: Checksum ที่ Publish ไม่ตรงกับ Model ของ Worker นี้ -> load_assets() ใน Background
+    (ระหว่างนี้ตอบด้วย Model เดิม, ลองครั้งเดียวต่อ Checksum ถ้าโหลดไม่ผ่านจะไม่วนโหลดซ้ำทุก Request)
+    """
+    global model_sync_attempted
+    published = state_store.get('models').get('default')
+    bundle = model_registry.current
+    if published is None or bundle is None or published in (bundle.checksum, model_sync_attempted):
+        return
+    if not model_sync_lock.acquire(blocking=False):
+        return
+    model_sync_attempted = published
+
+    def reload():
+        try:
+            print(f"🔄 Model {published} was published by another worker. Reloading {Config.MODEL_PATH} in PID {os.getpid()}...")
+            load_assets()
+        finally:
+            model_sync_lock.release()
+
+    threading.Thread(target=reload, name='model-sync', daemon=True).start()
+
+# --- Production Serving (gunicorn) ---
+def preload_assets():
+    """
+    รันใน gunicorn Master ก่อน fork: อ่าน model.h5 + Scaler ครั้งเดียว (Worker ได้แบบ Copy-on-Write)
+    ไม่สร้าง TensorFlow Graph ที่นี่ เพราะ TF Runtime ที่ถูก Init แล้วจะค้างใน Child Process
+    """
+    global preloaded_model_bytes, preloaded_scaler_bytes
+    with open(Config.MODEL_PATH, 'rb') as f:
+        preloaded_model_bytes = f.read()
+    with open(Config.SCALER_PATH, 'rb') as f:
+        preloaded_scaler_bytes = f.read()
+    if not Config.STAGED_STARTUP:
+        pickle.loads(preloaded_scaler_bytes) # (ตรวจว่าไฟล์ใช้ได้ก่อน fork / Staged: Worker ตรวจเองตอน Load -> Master ไม่ต้อง Import sklearn)
+    print(f"✅ Preloaded {Config.MODEL_PATH} ({len(preloaded_model_bytes) / 1024:.0f} KB) + {Config.SCALER_PATH}")
+
+def warm_imports():
+    """Startup Stage: Import ของหนักฝั่ง Inference ล่วงหน้า (TensorFlow + sklearn สำหรับ unpickle Scaler)"""
+    import_tensorflow()
+    import sklearn.preprocessing
+
+def start_staged_startup(model_bytes=None, scaler_bytes=None, background=True):
+    """Import TensorFlow -> Load Model -> News Scheduler เรียงกันใน Background (สถานะที่ /status['startup'])"""
+    return startup.start([
+        ('imports', warm_imports, True),
+        ('model', lambda: load_assets(model_bytes=model_bytes, scaler_bytes=scaler_bytes), True),
+        ('news_scheduler', start_news_scheduler, False),
+    ], background=background)
+
+def init_worker():
+    """รันในแต่ละ Worker หลัง fork: สร้าง Inference Backend + Batcher Thread และเริ่ม News Scheduler (Leader เดียว)"""
+    if Config.STAGED_STARTUP:
+        start_staged_startup(preloaded_model_bytes, preloaded_scaler_bytes)
+        return
+    if not load_assets(model_bytes=preloaded_model_bytes, scaler_bytes=preloaded_scaler_bytes):
+        raise RuntimeError("Could not load v7.1 model/scaler in worker.")
+    start_news_scheduler()
+
+def create_app():
+    """App Factory สำหรับ gunicorn: gunicorn -c gunicorn.conf.py (ดู gunicorn.conf.py)"""
+    preload_assets()
+    return app
+
 # --- JSON Parsing Helper ---
 def parse_mql_json(req):
     """Helper to safely parse JSON from MQL5."""
@@ -334,186 +532,412 @@ def parse_mql_json(req):
             return None
     return None
 
-def preprocess_and_predict(raw_data):
+def parse_bar_payload(req):
+    """
+    /predict: เหมือน parse_mql_json แต่ m5_data / usd_m5 ถูก Decode เป็น Column Arrays ตรง ๆ (linux_ingest)
+    Content-Type: application/x-obot-bars -> Binary Record (np.frombuffer) แทน JSON
+    """
+    body = req.get_data()
+    if not body:
+        return None
+    if req.mimetype == WIRE_CONTENT_TYPE:
+        try:
+            return decode_wire_payload(body)
+        except ValueError as e:
+            print(f"❌ Binary Payload Error: {e}")
+            return None
+    try:
+        return decode_bar_payload(body)
+    except ValueError as e:
+        print(f"❌ JSON Decode Error: {e}")
+        return None
+
+def sort_bar_frame(df):
+    """เรียง DataFrame ของแท่ง (index = time) จากเก่าไปใหม่ + ตัด time ซ้ำ (เก็บแท่งหลังสุด)"""
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep='last')]
+    return df
+
+def get_streaming_window(symbol, df_m5, df_usd, seq_len):
+    """
+    ป้อนเฉพาะแท่งใหม่เข้า StreamingFeatureEngine ของ Symbol นั้น
+    (Seed ใหม่จาก Payload ถ้าต่อจาก State เดิมไม่ได้ เช่น มี Gap หรือแท่งเก่าถูกแก้)
+    df_m5 / df_usd ต้องผ่าน sort_bar_frame แล้ว (can_extend ไม่รับ Index ที่ไม่เรียง)
+    """
+    with feature_engines_lock:
+        engine = feature_engines.get(symbol)
+        if engine is None or not engine.can_extend(df_m5, df_usd):
+            print(f"STREAM: Seeding feature engine for {symbol} ({len(df_m5)} bars)")
+            engine = StreamingFeatureEngine.from_frames(df_m5, df_usd, max_rows=Config.STREAM_MAX_ROWS)
+            feature_engines[symbol] = engine
+        else:
+            engine.extend(df_m5, df_usd)
+
+        X_window = engine.feature_window(seq_len)
+        if X_window is None:
+            raise ValueError(f"Not enough data: {engine.row_count}/{seq_len}")
+        indicators = engine.indicators()
+    return X_window, indicators
+
+def select_feature_window(df_features, seq_len):
+    """เลือก Feature ล่าสุดเท่ากับ Seq Length จากผลของ compute_features_lite"""
+    # Check Length
+    if len(df_features) < seq_len:
+        raise ValueError(f"Not enough data: {len(df_features)}/{seq_len}")
+        
+    # เลือกข้อมูลล่าสุดเท่ากับ Seq Length
+    return df_features.iloc[-seq_len:]
+
+def columnar_window(m5_columns, usd_columns, seq_len):
+    """
+    Batch Features แบบ Columnar: Column Arrays -> FeatureBuffer ของ Thread นี้ (ไม่สร้าง DataFrame)
+    คืน (float32 Window (seq_len, 18) ที่ copy ออกจาก Buffer แล้ว, indicators)
+    """
+    buffer = getattr(feature_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = feature_buffers.buffer = FeatureBuffer(Config.RING_BUFFER_BARS)
+
+    m5 = sort_columns(m5_columns)
+    if not bar_count(m5):
+        raise ValueError("Empty XAUUSD data")
+    usd = sort_columns(usd_columns) if bar_count(usd_columns) else None
+    X = buffer.compute(
+        m5['time'], m5['open'], m5['high'], m5['low'], m5['close'], m5['tick_volume'],
+        usd['time'] if usd else None, usd['close'] if usd else None, indicators=True
+    )
+    if len(X) < seq_len:
+        raise ValueError(f"Not enough data: {len(X)}/{seq_len}")
+    # copy: Buffer ถูกเขียนทับใน Request ถัดไป (Window นี้อาจอยู่ใน Feature Cache)
+    return X[-seq_len:].copy(), buffer.indicators()
+
+def last_indicators(df_features):
+    """ค่า INDICATOR_COLUMNS ของแถวล่าสุด จาก compute_features_lite(indicators=True)"""
+    row = df_features.iloc[-1]
+    return {col: float(row[col]) for col in INDICATOR_COLUMNS}
+
+def preprocess_and_predict(raw_data, route, bundle, cache_key=None):
     """
     Lite Logic:
     1. Parse M5 & USD
     2. Compute 18 Features
-    3. Scale & Predict (Single Model)
+    3. Scale & Predict (Model ของ Route นี้)
+    cache_key = Key ของแท่งชุดนี้ (ถ้ามี Feature Window ใน Cache จะข้ามข้อ 1-2)
     """
-    global lite_model, scaler
-    
+    # Feature Window ใช้ร่วมกันได้ทุก Route ที่ Seq Length เท่ากัน (Feature เลือกตอน predict_from_features)
+    feature_key = cache_key + (route.seq_len,) if cache_key is not None else None
+    cached = feature_cache.get(feature_key) if feature_key is not None else None
+    if feature_key is not None:
+        metrics.inc('cache_hits' if cached is not None else 'cache_misses', 'features')
+    if cached is not None:
+        df_input, indicators = cached
+        return predict_from_features(df_input, indicators, route, bundle)
+
     try:
+        if Config.USE_COLUMNAR_FEATURES and not Config.USE_STREAMING_FEATURES:
+            # 1-2. Column Arrays จาก parse_bar_payload -> float32 Buffer ตรง ๆ (ข้ามการสร้าง DataFrame)
+            with metrics.stage('features'):
+                df_input, indicators = columnar_window(
+                    bars_to_columns(raw_data['m5_data']), bars_to_columns(raw_data.get('usd_m5') or []), route.seq_len)
+            if feature_key is not None:
+                feature_cache.put(feature_key, (df_input, indicators))
+            return predict_from_features(df_input, indicators, route, bundle)
+
         # 1. Parse Data
-        df_m5 = pd.DataFrame(raw_data['m5_data'])
-        
-        # USD Data Handling (Fail-safe)
-        usd_raw = raw_data.get('usd_m5', [])
-        df_usd = pd.DataFrame(usd_raw) if usd_raw else None
-        
-        if df_m5.empty: raise ValueError("Empty XAUUSD data")
+        with metrics.stage('dataframe'):
+            # (m5_data / usd_m5 เป็น Column Arrays จาก parse_bar_payload -> สร้าง DataFrame จาก Column ได้เร็ว)
+            df_m5 = pd.DataFrame(bars_to_columns(raw_data['m5_data']))
+            
+            # USD Data Handling (Fail-safe)
+            usd_raw = bars_to_columns(raw_data.get('usd_m5') or [])
+            df_usd = pd.DataFrame(usd_raw) if bar_count(usd_raw) else None
+            
+            if df_m5.empty: raise ValueError("Empty XAUUSD data")
 
-        # Convert Time
-        df_m5['time'] = pd.to_datetime(df_m5['time'], unit='s')
-        df_m5.set_index('time', inplace=True)
-        
-        if df_usd is not None and not df_usd.empty:
-            df_usd['time'] = pd.to_datetime(df_usd['time'], unit='s')
-            df_usd.set_index('time', inplace=True)
+            # Convert Time (EA ส่งแท่งล่าสุดก่อน -> เรียงเก่าไปใหม่ + ตัดแท่งซ้ำ ไม่งั้น Streaming Engine ต่อไม่ได้)
+            df_m5['time'] = pd.to_datetime(df_m5['time'], unit='s')
+            df_m5 = sort_bar_frame(df_m5.set_index('time'))
+            
+            if df_usd is not None and not df_usd.empty:
+                df_usd['time'] = pd.to_datetime(df_usd['time'], unit='s')
+                df_usd = sort_bar_frame(df_usd.set_index('time'))
 
         # 2. Compute Features (ใช้ฟังก์ชันจาก linux_model_lite)
-        df_features = compute_features_lite(df_m5, df_usd=df_usd)
-        
-        # Check Length
-        if len(df_features) < Config.SEQUENCE_LENGTH:
-            raise ValueError(f"Not enough data: {len(df_features)}/{Config.SEQUENCE_LENGTH}")
-            
-        # 3. Prepare for Scaling
-        # เลือกข้อมูลล่าสุดเท่ากับ Seq Length
-        df_input = df_features.iloc[-Config.SEQUENCE_LENGTH:].copy()
-        
+        with metrics.stage('features'):
+            if Config.USE_STREAMING_FEATURES:
+                symbol = raw_data.get('symbol', 'XAUUSD')
+                X_window, indicators = get_streaming_window(symbol, df_m5, df_usd, route.seq_len)
+                df_input = pd.DataFrame(X_window, columns=REQUIRED_FEATURES)
+            else:
+                df_features = compute_features_lite(df_m5, df_usd=df_usd, indicators=True)
+                df_input = select_feature_window(df_features, route.seq_len)
+                indicators = last_indicators(df_features)
+
+        if feature_key is not None:
+            feature_cache.put(feature_key, (df_input, indicators))
+
+        return predict_from_features(df_input, indicators, route, bundle)
+
+    except Exception as e:
+        raise ValueError(f"Preprocessing Error: {e}")
+
+def ingest_session_payload(raw_data):
+    """
+    Delta Ingestion (EA ส่ง mode = 'full' | 'delta'):
+    - full  : สร้าง Session ใหม่จาก Snapshot (แทน Session เดิมของ Terminal นี้)
+    - delta : ต่อเฉพาะแท่งที่ time >= แท่งที่ Ack ไปแล้ว เข้า Ring Buffer ของ Session
+    Raise ResyncRequired ถ้าต่อไม่ได้ (EA จะส่ง Full Snapshot ใหม่)
+    """
+    symbol = raw_data.get('symbol', 'XAUUSD')
+    m5_columns = bars_to_columns(raw_data['m5_data'])
+    usd_columns = bars_to_columns(raw_data['usd_m5'])
+
+    if raw_data.get('mode') == 'full':
+        session = bar_sessions.create(symbol, replaces=raw_data.get('session') or None)
+        with session.lock:
+            session.load_snapshot(m5_columns, usd_columns)
+        print(f"STREAM: New session {session.session_id[:8]} for {symbol} ({len(session.m5)} bars)")
+        return session
+
+    session = bar_sessions.get(raw_data.get('session'), symbol)
+    with session.lock:
+        session.apply_delta(m5_columns, usd_columns)
+    return session
+
+def predict_from_session(session, route, bundle):
+    """Features จาก Ring Buffer ของ Session (ไม่ต้อง Parse/สร้าง DataFrame 1000 แท่งทุกครั้ง)"""
+    try:
+        with session.lock, metrics.stage('features'):
+            if Config.USE_STREAMING_FEATURES:
+                engine = session.sync_engine()
+                X_window = engine.feature_window(route.seq_len)
+                if X_window is None:
+                    raise ValueError(f"Not enough data: {engine.row_count}/{route.seq_len}")
+                df_input = pd.DataFrame(X_window, columns=REQUIRED_FEATURES)
+                indicators = engine.indicators()
+            elif Config.USE_COLUMNAR_FEATURES:
+                m5 = {field: session.m5.view(field) for field in BAR_FIELDS}
+                usd = {field: session.usd.view(field) for field in BAR_FIELDS} if session.has_usd else None
+                df_input, indicators = columnar_window(m5, usd, route.seq_len)
+            else:
+                df_m5, df_usd = session.frames()
+                df_features = compute_features_lite(df_m5, df_usd=df_usd, indicators=True)
+                df_input = select_feature_window(df_features, route.seq_len)
+                indicators = last_indicators(df_features)
+
+        return predict_from_features(df_input, indicators, route, bundle)
+
+    except Exception as e:
+        raise ValueError(f"Preprocessing Error: {e}")
+
+def payload_cache_key(data, session=None):
+    """Cache Key จากทุกแท่งใน Window (Session: จาก Ring Buffer / Legacy: จาก Column Arrays ของ Payload) + Feature Set Version"""
+    symbol = data.get('symbol', 'XAUUSD')
+    if session is not None:
+        m5 = {field: session.m5.view(field) for field in BAR_FIELDS}
+        usd = {field: session.usd.view(field) for field in BAR_FIELDS} if session.has_usd else None
+    else:
+        m5 = bars_to_columns(data['m5_data'])
+        usd = bars_to_columns(data.get('usd_m5') or [])
+    return bars_fingerprint(symbol, m5, usd if usd and bar_count(usd) else None, fields=BAR_FIELDS) + (FEATURE_SET_VERSION,)
+
+def predict_from_features(df_input, indicators, route, bundle):
+    """
+    3. Scale & Predict + Signal Filters ของ Route (EMA200 / Min ATR / Threshold -> ดู linux_filters)
+    df_input = Feature ล่าสุด route.seq_len แถว (DataFrame หรือ float32 Array ตามลำดับ REQUIRED_FEATURES จาก columnar_window)
+    indicators = close / ema200 ของแท่งล่าสุด (จาก Feature Engine)
+    คืน (signal, probability, atr, dynamic_risk, regime)
+    route / bundle = Route ที่เลือก + Model/Scaler ชุดที่ Request นี้ถืออยู่ (จาก model_router.use())
+    """
+    if isinstance(df_input, np.ndarray):
+        # Columnar Window มีครบ 18 Feature เสมอ -> เลือก Column ตาม Route ด้วย Index
+        latest_atr = float(df_input[-1, REQUIRED_FEATURES.index('atr_14')])
+        if route.features != REQUIRED_FEATURES:
+            df_input = df_input[:, [REQUIRED_FEATURES.index(col) for col in route.features]]
+    else:
         latest_atr = df_input['atr_14'].iloc[-1]
 
         # Feature Validation
-        final_features = [col for col in REQUIRED_FEATURES if col in df_input.columns]
-        if len(final_features) != len(REQUIRED_FEATURES):
-            missing = set(REQUIRED_FEATURES) - set(final_features)
+        final_features = [col for col in route.features if col in df_input.columns]
+        if len(final_features) != len(route.features):
+            missing = set(route.features) - set(final_features)
             # Fallback: ถ้าขาด Feature ใหม่ (เช่น USD ไม่มีข้อมูล) ให้เติม 0 เพื่อไม่ให้ระบบล่ม
             print(f"⚠️ Warning: Missing features {missing}. Filling with 0.")
-            for col in missing:
-                df_input[col] = 0.0
-            df_input = df_input[REQUIRED_FEATURES] # Reorder
-        
-        # Scale (ใช้ฟังก์ชันจาก linux_model)
-        X_scaled = scale_features(df_input, scaler)
-        
-        if X_scaled is None: raise ValueError("Scaling returned None")
-        
-        # Reshape for LSTM (1, 50, 18)
-        X_pred = np.array([X_scaled])
+            # assign คืน Frame ใหม่ -> ไม่แก้ Frame ที่อยู่ใน Feature Cache
+            df_input = df_input.assign(**{col: 0.0 for col in missing})
+    
+    # Scale ครั้งเดียวเป็น float32 Matrix ตามลำดับ route.features แล้วใช้ Window ล่าสุดแบบ View (ไม่ Copy ซ้ำก่อนเข้า Model)
+    with metrics.stage('scale'):
+        X_scaled = FeatureWindows.from_features(df_input, bundle.scaler, route.seq_len, features=route.features).latest()
+    
+    # 4. Predict (ผ่านคิว Micro-Batch ถ้าเปิดไว้ ไม่งั้น Reshape เป็น (1, 50, 18) แล้วเรียกตรง)
+    with metrics.stage('model'):
+        probs = bundle.predict(X_scaled)
 
-        # 4. Predict
-        probs = lite_model.predict(X_pred, verbose=0)[0]
-        cls = np.argmax(probs)
-        probability = np.max(probs)
-        
-        signal = 'NONE'
-        if cls == 1: signal = 'BUY'
-        elif cls == 2: signal = 'SELL'
-        elif cls == 0: signal = 'HOLD'
-        
-        # A. ดึงราคาปัจจุบัน
-        current_close = df_m5['close'].iloc[-1]
-        
-        # B. คำนวณ EMA 200 (ใช้ TA-Lib)
-        # ต้องคำนวณจากข้อมูล M5 ที่ส่งมา
-        real_close = df_m5['close'].astype(float).values
-        ema200 = talib.EMA(real_close, timeperiod=200)[-1] # เอาค่าล่าสุด
-        
-        # C. กรอง Trend (EMA 200 Filter)
-        if Config.USE_EMA_FILTER and not np.isnan(ema200):
-            if signal == 'BUY' and current_close < ema200:
-                print(f"filter: Blocked BUY (Price {current_close:.2f} < EMA {ema200:.2f})")
-                signal = 'HOLD' # เปลี่ยนเป็น Hold
-            elif signal == 'SELL' and current_close > ema200:
-                print(f"filter: Blocked SELL (Price {current_close:.2f} > EMA {ema200:.2f})")
-                signal = 'HOLD'
-
-        # D. กรอง Min ATR
-        if latest_atr < Config.MIN_ATR:
-            print(f"filter: Low Volatility (ATR {latest_atr:.4f} < {Config.MIN_ATR})")
-            signal = 'HOLD'
-
-        return signal, probability, latest_atr, "ACTIVE"
+    # 5. Signal Filters ตามลำดับของ Route (ใช้ Indicator ที่คำนวณมาแล้ว ไม่คำนวณ EMA ซ้ำ)
+    with metrics.stage('filters'):
+        decision = run_pipeline(route.pipeline, SignalDecision(probs, latest_atr, indicators), route)
+    for note in decision.notes:
+        print(f"filter: {note}")
 
-    except Exception as e:
-        raise ValueError(f"Preprocessing Error: {e}")
+    return decision.signal, decision.probability, decision.atr, decision.dynamic_risk, decision.regime
     
 # --- [Dynamic Risk Manager] ---
-def calculate_dynamic_risk(probability):
-    if probability > 0.75: # ⬅️ (ต้องปรับใหม่)
-        return 2.0  
-    elif probability > 0.65: # ⬅️ (ต้องปรับใหม่)
-        return 1.5  
-    elif probability > Config.PREDICTION_THRESHOLD: 
-        return 1.0  
-    else:
-        return 0.5 
+def calculate_dynamic_risk(probability, threshold=None):
+    if threshold is None:
+        threshold = Config.PREDICTION_THRESHOLD
+    return dynamic_risk(probability, threshold)
 
 # --- API Endpoints ---
 
 @app.route('/status', methods=['GET']) 
 def get_status():
-    global account_status, lite_model, scaler
-
-    current = account_status.copy()
-    current['model_loaded'] = (lite_model is not None)
-    current['scaler_loaded'] = (scaler is not None)
-    with news_lock: current['news_status'] = news_lockdown['message']
+    bundle = model_registry.current
+
+    current = state_store.get('account')
+    current['model_loaded'] = (bundle is not None)
+    current['inference_backend'] = bundle.inference.backend if bundle is not None else None
+    current['fast_scaler'] = bundle.info()['fast_scaler'] if bundle is not None else None
+    current['model_version'] = bundle.version if bundle is not None else None
+    current['model_checksum'] = bundle.checksum if bundle is not None else None
+    current['scaler_loaded'] = (bundle is not None)
+    current['cache'] = {'features': feature_cache.stats(), 'results': result_cache.stats()}
+    current['metrics'] = metrics.summary()
+    current['startup'] = startup.status()
+    current['models'] = model_router.info()
+    current['news_status'] = get_news_status()
+    current['news_calendar'] = state_store.get('news')['message']
     return jsonify(current), 200
 
 @app.route('/predict', methods=['POST']) 
 def predict_signal():
+    with metrics.stage('total'):
+        return handle_predict()
+
+def handle_predict():
     # 1. News Check
-    with news_lock:
-        if news_lockdown['active']:
-            return jsonify({
-                'signal': 'HOLD', 'probability': 0.0, 'atr': 0.0,
-                'dynamic_risk': 0.0, 'regime': 'NEWS_LOCKDOWN', 'message': news_lockdown['message']
-            }), 200
+    news_event = news_index.active_event()
+    if news_event:
+        metrics.inc('requests', 'news_lockdown')
+        return jsonify({
+            'signal': 'HOLD', 'probability': 0.0, 'atr': 0.0,
+            'dynamic_risk': 0.0, 'regime': 'NEWS_LOCKDOWN', 'message': f"LOCKDOWN: {news_event}"
+        }), 200
 
     # 2. Bot Status Check
-    if lite_model is None: return jsonify({'signal': 'ERROR', 'message': 'Model not loaded'}), 503
-    if account_status['bot_status'] != 'RUNNING':
+    if state_store.get('account')['bot_status'] != 'RUNNING':
+        metrics.inc('requests', 'bot_stopped')
         return jsonify({'signal': 'NONE', 'message': 'Bot STOPPED'}), 200
 
-    # 3. Process
+    # Model ใหม่จาก /retrain หรือ /fix ที่รันใน Worker อื่น
+    sync_model_version()
+
+    with metrics.stage('parse'):
+        data = parse_bar_payload(request)
+    if not data:
+        metrics.inc('errors', 'invalid_json')
+        return jsonify({'signal': 'ERROR', 'probability': 0.0, 'message': 'Invalid JSON data received.'}), 400
+
+    # 3. Model Route: (symbol, model) จาก Payload หรือ ?model= -> Route ใน Routing Table
     try:
-        data = parse_mql_json(request)
-        if not data: return jsonify({'signal': 'ERROR', 'probability': 0.0, 'message': 'Invalid JSON data received.'}), 400
-        
-        signal, prob, atr, regime = preprocess_and_predict(data)
-        
-        # Threshold Check
-        dynamic_risk_pct = 0.5 
+        route = model_router.resolve(data.get('symbol', Config.DEFAULT_SYMBOL), data.get('model') or request.args.get('model'))
+    except KeyError as e:
+        metrics.inc('errors', 'unknown_route')
+        return jsonify({'signal': 'ERROR', 'message': str(e.args[0])}), 404
+
+    # (ถือ Bundle ไว้ตลอด Request -> Hot Swap / LRU Unload ระหว่างนี้ไม่กระทบ Request ที่กำลังทำงาน)
+    with model_router.use(route) as bundle:
+        if bundle is None:
+            metrics.inc('errors', 'model_not_loaded')
+            if route.pinned:
+                message = 'Model not loaded' if startup.finished else f"Starting up ({startup.stage or 'pending'})"
+            elif model_router.error(route) and not model_router.loading(route):
+                message = f"Model route {route.name} unavailable: {model_router.error(route)}"
+            else:
+                message = f"Loading model route {route.name}"
+            return jsonify({'signal': 'ERROR', 'message': message}), 503
 
-        if prob < Config.PREDICTION_THRESHOLD: 
-            signal = 'HOLD' 
+        metrics.inc('routes', route.name)
+        return run_prediction(data, route, bundle)
+
+def run_prediction(data, route, bundle):
+    # 4. Process
+    try:
+        session = None
+        if data.get('mode') in ('full', 'delta'):
+            with metrics.stage('ingest'):
+                session = ingest_session_payload(data)
+
+        # Request ซ้ำของแท่งเดิม (Retry / หลาย Terminal) -> ตอบจาก Cache
+        cache_key = payload_cache_key(data, session) if Config.USE_PREDICTION_CACHE else None
+        result_key = cache_key + (route.name, bundle.version) if cache_key is not None else None
+        cached = result_cache.get(result_key) if result_key is not None else None
+        if result_key is not None:
+            metrics.inc('cache_hits' if cached is not None else 'cache_misses', 'results')
+
+        if cached is not None:
+            signal, prob, atr, dynamic_risk_pct, regime = cached
         else:
-            dynamic_risk_pct = calculate_dynamic_risk(prob)
+            # (Threshold / Dynamic Risk อยู่ใน Filter Pipeline ของ Route แล้ว)
+            if session is not None:
+                result = predict_from_session(session, route, bundle)
+            else:
+                result = preprocess_and_predict(data, route, bundle, cache_key=cache_key)
+            signal, prob, atr, dynamic_risk_pct, regime = result
+            if result_key is not None:
+                result_cache.put(result_key, result)
         
-        # --- [START FIX] อัปเดตสถานะลง Global Variable ---
-        account_status.update({
-            'last_signal': signal,
-            'last_regime': regime
-        })
+        # --- [START FIX] อัปเดตสถานะลง Shared State ---
+        state_store.update('account', last_signal=signal, last_regime=regime)
         # --- [END FIX] ----------------------------------
         
-        return jsonify({
+        response = {
             'signal': signal,
             'probability': float(prob),
             'atr': float(atr),
             'dynamic_risk': float(dynamic_risk_pct),
             'regime': regime,
+            'model': route.name,
             'message': 'Prediction successful.'
-        }), 200
+        }
+        if session is not None:
+            # Ack: EA ส่ง Delta ครั้งต่อไปตั้งแต่แท่งเหล่านี้ (รวมแท่งนี้ที่ยังไม่ปิด)
+            response.update({
+                'session_id': session.session_id,
+                'ack_m5': session.m5.last_time,
+                'ack_usd': session.usd.last_time or 0
+            })
+        metrics.inc('requests', 'cached' if cached is not None else 'predicted')
+        return jsonify(response), 200
         
+    except ResyncRequired as e:
+        print(f"🔄 Resync required: {e}")
+        metrics.inc('errors', 'resync')
+        return jsonify({'signal': 'RESYNC', 'message': str(e)}), 409
+
     except Exception as e:
         print(f"❌ Predict Error: {e}")
+        metrics.inc('errors', 'preprocessing' if isinstance(e, ValueError) else 'internal')
         traceback.print_exc()
         return jsonify({'signal': 'ERROR', 'message': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus Text Format: Latency ต่อขั้น (Histogram) + Request/Error/Cache Counter ของทุก Worker"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/update_status', methods=['POST'])
 def update_status():
     try:
         data = parse_mql_json(request)
         if data:
-            account_status.update({
-                'balance': data.get('balance', 0),
-                'equity': data.get('equity', 0),
-                'margin_free': data.get('margin_free', 0),
-                'open_trades': data.get('open_trades', 0)
-            })
+            state_store.update('account',
+                balance=data.get('balance', 0),
+                equity=data.get('equity', 0),
+                margin_free=data.get('margin_free', 0),
+                open_trades=data.get('open_trades', 0)
+            )
 
         return jsonify({'status': 'SUCCESS'})
     except: return jsonify({'status': 'ERROR'}), 500
@@ -525,11 +949,11 @@ def execute_command():
         command = request.json.get('command')
         
         if command == 'START':
-            account_status['bot_status'] = 'RUNNING'
+            state_store.update('account', bot_status='RUNNING')
             return jsonify({'status': 'SUCCESS', 'message': 'Bot set to RUNNING.'})
         
         elif command == 'STOP':
-            account_status['bot_status'] = 'STOPPED'
+            state_store.update('account', bot_status='STOPPED')
             return jsonify({'status': 'SUCCESS', 'message': 'Bot set to STOPPED.'})
         
         else:
@@ -538,54 +962,6 @@ def execute_command():
     except Exception as e:
         return jsonify({'status': 'ERROR', 'message': str(e)}), 500
 
-@app.route('/retrain', methods=['POST'])
-def retrain_model_async():
-    if account_status['bot_status'] != 'STOPPED':
-        return jsonify({'status': 'FAIL', 'message': '❌ This command requires the bot to be STOPPED.'}), 400
-
-    try:
-        download_model_assets() 
-        if load_assets():
-            return jsonify({'status': 'SUCCESS', 'message': '✅ Retraining completed and model (v7.1) loaded.'}), 200
-        else:
-            return jsonify({'status': 'FAIL', 'message': '⚠️ Model (v7.1) or scaler could not be loaded after download.'}), 500
-
-    except Exception as e:
-        print(f"❌ Error in retrain_model_async: {e}")
-        traceback.print_exc()
-        return jsonify({'status': 'FAIL', 'message': f'Error during retraining: {str(e)}'}), 500
-
-@app.route('/update_ea', methods=['POST'])
-def update_expert_advisor():
-    """
-    [NEW VERSION] Downloads the EA and creates a trigger file.
-    """
-    EA_URL = 'https://raw.githubusercontent.com/bookhub10/models/main/linux_OBot.mq5' 
-    EA_PATH = "/home/hp/.mt5/drive_c/Program Files/MetaTrader 5/MQL5/Experts/OBotTrading.mq5"
-    TRIGGER_FILE = "/home/hp/Downloads/bot/COMPILE_NOW.trigger" 
-
-    try:
-        print(f"⬇️ Downloading new EA from {EA_URL}...")
-        response = requests.get(EA_URL)
-        response.raise_for_status()
-        with open(EA_PATH, 'wb') as f:
-            f.write(response.content)
-        print("✅ EA Downloaded.")
-
-        with open(TRIGGER_FILE, 'w') as f:
-            f.write('triggered') 
-        print(f"✅ Trigger file created at {TRIGGER_FILE}")
-
-        return jsonify({
-            'status': 'SUCCESS', 
-            'message': f'✅ EA Downloaded. Compile trigger issued to GUI watcher.'
-        }), 200
-
-    except Exception as e:
-        print(f"❌ Error in /update_ea: {e}")
-        traceback.print_exc()
-        return jsonify({'status': 'FAIL', 'message': f'Error during EA update: {str(e)}'}), 500
-    
 @app.route('/restart', methods=['POST'])
 def restart_service():
     """Endpoint to restart the service via systemd."""
@@ -603,16 +979,106 @@ def restart_service():
         print(f"❌ Error in /restart: {e}")
         return jsonify({'status': 'FAIL', 'message': str(e)}), 500
 
-@app.route('/fix', methods=['POST'])
-def fix_system_files():
+# --- Maintenance Jobs (รันใน Background ผ่าน job_manager) ---
+def run_retrain_job(progress):
+    if os.path.exists(Config.TRAIN_M5_PATH):
+        return run_local_training(progress)
+    progress(10, 'Downloading model assets...')
+    download_model_assets() 
+    progress(60, 'Loading model (v7.1) and scaler...')
+    if load_assets():
+        publish_model_version()
+        return True, '✅ Retraining completed and model (v7.1) loaded.'
+    return False, '⚠️ Model (v7.1) or scaler could not be loaded after download.'
+
+def run_local_training(progress):
+    """
+    เทรน Version ใหม่ด้วย linux_train.py (Process แยก, nice / Thread / Memory จำกัดตาม Config)
+    -> Load + Validate จาก Directory ของ Version -> ผ่านแล้วค่อยคัดลอกทับ MODEL_PATH / SCALER_PATH
+    """
+    version_dir = os.path.join(Config.TRAIN_VERSIONS_DIR, time.strftime('%Y%m%d-%H%M%S'))
+    command = [
+        sys.executable, os.path.join(current_dir, 'linux_train.py'),
+        '--m5', Config.TRAIN_M5_PATH, '--out-dir', version_dir, '--epochs', str(Config.TRAIN_EPOCHS),
+        '--seq-len', str(Config.SEQUENCE_LENGTH), '--nice', str(Config.TRAIN_NICE),
+        '--threads', str(Config.TRAIN_THREADS), '--max-memory-mb', str(Config.TRAIN_MAX_MEMORY_MB)
+    ]
+    if os.path.exists(Config.TRAIN_USD_PATH):
+        command += ['--usd', Config.TRAIN_USD_PATH]
+    if Config.TRAIN_FINE_TUNE and os.path.exists(Config.MODEL_PATH):
+        command += ['--init', Config.MODEL_PATH]
+
+    progress(5, f'Training {version_dir} from {Config.TRAIN_M5_PATH}...')
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    timer = threading.Timer(Config.TRAIN_TIMEOUT_SECONDS, proc.kill)
+    timer.start()
+    last_message = ''
+    try:
+        for line in proc.stdout:
+            if not line.startswith('TRAIN:'):
+                continue
+            print(line.rstrip())
+            last_message = line[len('TRAIN:'):].strip()
+            if last_message.startswith('[') and '%]' in last_message:
+                percent, message = last_message[1:].split('%]', 1)
+                progress(5 + int(percent) * 85 // 100, message.strip())
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+
+    if returncode != 0:
+        reason = 'timed out' if returncode == -9 else f'exit code {returncode}'
+        return False, f'❌ Local training failed ({reason}): {last_message}'
+
+    progress(92, f'Loading and validating {version_dir}...')
+    with open(os.path.join(version_dir, 'model.h5'), 'rb') as f:
+        model_bytes = f.read()
+    with open(os.path.join(version_dir, 'scaler.pkl'), 'rb') as f:
+        scaler_bytes = f.read()
+    if not load_assets(model_bytes=model_bytes, scaler_bytes=scaler_bytes):
+        return False, f'⚠️ {version_dir} failed validation. The previous model is still in service.'
+    promote_model_version(version_dir, Config.MODEL_PATH, Config.SCALER_PATH)
+    publish_model_version()
+
+    with open(os.path.join(version_dir, 'metadata.json')) as f:
+        metrics_summary = json.load(f)['metrics']
+    return True, f'✅ Retrained locally ({os.path.basename(version_dir)}) and loaded. {metrics_summary}'
+
+def run_update_ea_job(progress):
+    """
+    [NEW VERSION] Downloads the EA and creates a trigger file.
+    """
+    EA_URL = 'https://raw.githubusercontent.com/bookhub10/models/main/linux_OBot.mq5' 
+    EA_PATH = "/home/hp/.mt5/drive_c/Program Files/MetaTrader 5/MQL5/Experts/OBotTrading.mq5"
+    TRIGGER_FILE = "/home/hp/Downloads/bot/COMPILE_NOW.trigger" 
+
+    progress(10, f'Downloading new EA from {EA_URL}...')
+    import requests
+    response = requests.get(EA_URL, timeout=60)
+    response.raise_for_status()
+    with open(EA_PATH, 'wb') as f:
+        f.write(response.content)
+    print("✅ EA Downloaded.")
+
+    progress(80, 'Issuing compile trigger...')
+    with open(TRIGGER_FILE, 'w') as f:
+        f.write('triggered') 
+    print(f"✅ Trigger file created at {TRIGGER_FILE}")
+
+    return True, '✅ EA Downloaded. Compile trigger issued to GUI watcher.'
+
+def run_fix_job(progress):
     """Downloads updated Python scripts and reloads model assets."""
+    progress(10, 'Downloading Python files...')
     python_downloaded = download_python_files()
 
+    progress(50, 'Downloading model assets...')
     try:
         download_model_assets()
     except Exception as e:
-        return jsonify({'status': 'FAIL', 'message': f'❌ Failed to download model assets: {str(e)}. Python files may be updated.'}), 500
+        return False, f'❌ Failed to download model assets: {str(e)}. Python files may be updated.'
         
+    progress(80, 'Loading model (v7.1) and scaler...')
     assets_loaded = load_assets()
     
     message = "✅ System files and assets (v7.1) updated successfully."
@@ -621,20 +1087,52 @@ def fix_system_files():
         message = "⚠️ Python files update failed for one or more files. Assets (v7.1) reloaded."
 
     if not assets_loaded:
-        return jsonify({'status': 'FAIL', 'message': '⚠️ Assets (v7.1) downloaded but failed to load. System files updated. **Please manually restart.**'}), 500
+        return False, '⚠️ Assets (v7.1) downloaded but failed to load. System files updated. **Please manually restart.**'
+    publish_model_version()
+
+    return True, f'{message} **Requires Server Restart** for new Python files to take effect.'
 
-    return jsonify({
-        'status': 'SUCCESS', 
-        'message': f'{message} **Requires Server Restart** for new Python files to take effect.'
-    }), 200
+def submit_job(kind, func):
+    """สร้าง Job แล้วตอบ 202 + job_id ทันที (ติดตามผลที่ /jobs/<job_id>)"""
+    job, created = job_manager.submit(kind, func)
+    message = f'⏳ {kind} job queued.' if created else f'⏳ {kind} job is already {job["status"]}.'
+    return jsonify({'status': 'ACCEPTED', 'job_id': job['id'], 'created': created, 'job': job, 'message': message}), 202
+
+@app.route('/retrain', methods=['POST'])
+def retrain_model_async():
+    if state_store.get('account')['bot_status'] != 'STOPPED':
+        return jsonify({'status': 'FAIL', 'message': '❌ This command requires the bot to be STOPPED.'}), 400
+    return submit_job('retrain', run_retrain_job)
+
+@app.route('/update_ea', methods=['POST'])
+def update_expert_advisor():
+    return submit_job('update_ea', run_update_ea_job)
+
+@app.route('/fix', methods=['POST'])
+def fix_system_files():
+    return submit_job('fix', run_fix_job)
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({'jobs': job_manager.list()}), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'FAIL', 'message': f'Unknown job {job_id}.'}), 404
+    return jsonify(job), 200
 
 if __name__ == '__main__':
-    if load_assets():
-        print("Starting background news scheduler (Playwright + FXVerify Scraper)...") # ⬅️ [แก้ไข]
-        scheduler_thread = threading.Thread(target=run_news_scheduler, daemon=True)
-        scheduler_thread.start()
+    # Development Server (Process เดียว) - Production ใช้: gunicorn -c gunicorn.conf.py
+    if Config.STAGED_STARTUP:
+        start_staged_startup()
+        print("💡 NOTE: Remember to start the separate telegram_bot.py script.")
+        app.run(host='0.0.0.0', port=5000, threaded=True)
+    elif load_assets():
+        start_news_scheduler()
 
         print("💡 NOTE: Remember to start the separate telegram_bot.py script.")
-        app.run(host='0.0.0.0', port=5000)
+        app.run(host='0.0.0.0', port=5000, threaded=True)
     else:
         print("❌ FATAL: Could not load v7.1 model/scaler. API not starting.")
\ No newline at end of file
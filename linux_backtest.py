@@ -0,0 +1,191 @@
+import sys
+import time
+import pickle
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from linux_model import compute_features_lite, FeatureWindows, FastScaler, REQUIRED_FEATURES, INDICATOR_COLUMNS
+from linux_inference import InferenceBackend
+from linux_ingest import load_bars
+from linux_config import Config, default_route
+from linux_filters import SignalDecision, run_pipeline
+
+# ==============================================================================
+# OFFLINE BACKTEST (ประเมิน model.h5 บน History โดยไม่ต้องผ่าน MT5 Tester / HTTP)
+#   python linux_backtest.py --m5 xauusd_m5.csv --usd usd_m5.csv --out backtest.csv
+# Feature คำนวณครั้งเดียวทั้ง History -> Window 50 แท่งเป็น Strided View -> ทำนายเป็น Batch
+# -> Filter Pipeline ชุดเดียวกับ Default Route (linux_config.default_route: EMA200 / MIN_ATR / Threshold + Dynamic Risk) -> จำลองเทรดแบบ EA
+# ==============================================================================
+
+# ==============================================================================
+# PART 1: DATA LOADING
+# ==============================================================================
+
+# (load_bars อยู่ที่ linux_ingest ใช้ร่วมกับ linux_train)
+
+# ==============================================================================
+# PART 2: BATCH PREDICTION
+# ==============================================================================
+
+def predict_history(df_m5, df_usd, inference, scaler, batch_size=2048):
+    """
+    ทำนายทุกแท่งที่มี Feature ครบ SEQUENCE_LENGTH แถว
+    คืน DataFrame (index = เวลาแท่ง) พร้อม signal / probability / dynamic_risk หลังผ่าน Filter ของ linux_api
+    """
+    seq_len = Config.SEQUENCE_LENGTH
+
+    t0 = time.time()
+    features = compute_features_lite(df_m5, df_usd=df_usd, indicators=True)
+    if len(features) < seq_len:
+        raise ValueError(f"Not enough feature rows: {len(features)}/{seq_len}")
+    windows = FeatureWindows.from_features(features[REQUIRED_FEATURES], scaler, seq_len)
+    print(f"✅ Features + scaling: {len(features)} rows, {len(windows)} windows ({time.time() - t0:.1f}s)")
+
+    t0 = time.time()
+    probs = np.empty((len(windows), 3), dtype=np.float32)
+    for start, batch in windows.batches(batch_size):
+        probs[start:start + len(batch)] = inference.predict(batch)
+    print(f"✅ Predictions: {len(windows)} windows ({time.time() - t0:.1f}s)")
+
+    times = features.index[seq_len - 1:]
+    out = pd.DataFrame({
+        'prob_hold': probs[:, 0], 'prob_buy': probs[:, 1], 'prob_sell': probs[:, 2],
+        'atr': features['atr_14'].values[seq_len - 1:],
+        **{col: features[col].values[seq_len - 1:] for col in INDICATOR_COLUMNS},
+    }, index=times)
+    return apply_signal_logic(out, probs)
+
+
+def apply_signal_logic(out, probs, route=default_route):
+    """
+    Filter Pipeline เดียวกับ linux_api (predict_from_features) ทีละแท่ง ตาม route.filters
+    หมายเหตุ: Live คำนวณ EMA200 จากแท่งที่ EA ส่งมา ส่วนที่นี่ใช้ทั้ง History (ค่าลู่เข้าหากัน)
+    """
+    atr = out['atr'].values
+    indicators = out[INDICATOR_COLUMNS].to_dict('records')
+    decisions = [
+        run_pipeline(route.pipeline, SignalDecision(probs[i], atr[i], indicators[i]), route)
+        for i in range(len(out))
+    ]
+    out['raw_signal'] = [d.raw_signal for d in decisions]
+    out['signal'] = [d.signal for d in decisions]
+    out['probability'] = [d.probability for d in decisions]
+    out['dynamic_risk'] = [d.dynamic_risk for d in decisions]
+    return out
+
+# ==============================================================================
+# PART 3: TRADE SIMULATION (SL/TP ตาม ATR แบบ EA)
+# ==============================================================================
+
+def simulate_trades(pred, df_m5, sl_mult=1.5, tp_mult=2.0, max_hold_bars=12, cooldown_bars=3):
+    """
+    เข้า Open ของแท่งถัดไป, SL = ATR x sl_mult, TP = ATR x tp_mult, ปิดที่ Close เมื่อครบ max_hold_bars
+    แท่งที่โดนทั้ง SL และ TP นับเป็น SL (มองแง่ร้าย), ถือได้ทีละ 1 Position + Cooldown หลังปิด
+    """
+    bar_pos = df_m5.index.get_indexer(pred.index)
+    open_p, high_p = df_m5['open'].values, df_m5['high'].values
+    low_p, close_p = df_m5['low'].values, df_m5['close'].values
+    n_bars = len(df_m5)
+
+    trades = []
+    next_free = 0
+    for t, row_pos, signal, atr in zip(pred.index, bar_pos, pred['signal'].values, pred['atr'].values):
+        if signal not in ('BUY', 'SELL') or row_pos < next_free or row_pos + 1 >= n_bars:
+            continue
+        entry_pos = row_pos + 1
+        end_pos = min(entry_pos + max_hold_bars, n_bars)
+        entry = open_p[entry_pos]
+        direction = 1.0 if signal == 'BUY' else -1.0
+        sl = entry - direction * atr * sl_mult
+        tp = entry + direction * atr * tp_mult
+
+        highs, lows = high_p[entry_pos:end_pos], low_p[entry_pos:end_pos]
+        hit_sl = (lows <= sl) if direction > 0 else (highs >= sl)
+        hit_tp = (highs >= tp) if direction > 0 else (lows <= tp)
+        first_sl = np.argmax(hit_sl) if hit_sl.any() else len(highs)
+        first_tp = np.argmax(hit_tp) if hit_tp.any() else len(highs)
+
+        if first_sl <= first_tp and first_sl < len(highs):
+            exit_pos, exit_price, reason = entry_pos + first_sl, sl, 'SL'
+        elif first_tp < len(highs):
+            exit_pos, exit_price, reason = entry_pos + first_tp, tp, 'TP'
+        else:
+            exit_pos, exit_price, reason = end_pos - 1, close_p[end_pos - 1], 'TIME'
+
+        pnl = direction * (exit_price - entry)
+        trades.append({
+            'signal_time': t, 'entry_time': df_m5.index[entry_pos], 'exit_time': df_m5.index[exit_pos],
+            'signal': signal, 'entry': entry, 'exit': exit_price, 'reason': reason,
+            'pnl': pnl, 'r_multiple': pnl / (atr * sl_mult)
+        })
+        next_free = exit_pos + 1 + cooldown_bars
+
+    return pd.DataFrame(trades)
+
+
+def summarize(pred, trades):
+    counts = pred['signal'].value_counts().to_dict()
+    summary = {
+        'bars': len(pred), 'buy_signals': counts.get('BUY', 0), 'sell_signals': counts.get('SELL', 0),
+        'trades': len(trades)
+    }
+    if len(trades):
+        wins = trades['pnl'] > 0
+        gross_win = trades.loc[wins, 'pnl'].sum()
+        gross_loss = -trades.loc[~wins, 'pnl'].sum()
+        summary.update({
+            'win_rate': round(float(wins.mean()), 4),
+            'total_pnl': round(float(trades['pnl'].sum()), 2),
+            'total_r': round(float(trades['r_multiple'].sum()), 2),
+            'profit_factor': round(float(gross_win / gross_loss), 3) if gross_loss > 0 else float('inf'),
+        })
+    return summary
+
+# ==============================================================================
+# PART 4: CLI
+# ==============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline backtest of the OBot Lite model.")
+    parser.add_argument('--m5', required=True, help="XAUUSD M5 bars (CSV/Parquet)")
+    parser.add_argument('--usd', help="USD index M5 bars (CSV/Parquet)")
+    parser.add_argument('--model', default=Config.MODEL_PATH)
+    parser.add_argument('--scaler', default=Config.SCALER_PATH)
+    parser.add_argument('--batch-size', type=int, default=2048)
+    parser.add_argument('--sl-mult', type=float, default=1.5)
+    parser.add_argument('--tp-mult', type=float, default=2.0)
+    parser.add_argument('--max-hold-bars', type=int, default=12)
+    parser.add_argument('--cooldown-bars', type=int, default=3)
+    parser.add_argument('--out', help="Per-bar predictions CSV")
+    parser.add_argument('--trades-out', help="Trades CSV")
+    args = parser.parse_args(argv)
+
+    df_m5 = load_bars(args.m5)
+    df_usd = load_bars(args.usd) if args.usd else None
+    print(f"📈 Loaded {len(df_m5)} M5 bars ({df_m5.index[0]} -> {df_m5.index[-1]})")
+
+    inference = InferenceBackend.from_path(args.model, Config.SEQUENCE_LENGTH, len(REQUIRED_FEATURES))
+    with open(args.scaler, 'rb') as f:
+        scaler = pickle.load(f)
+    if Config.USE_FAST_SCALER:
+        scaler = FastScaler(scaler)
+
+    pred = predict_history(df_m5, df_usd, inference, scaler, batch_size=args.batch_size)
+    trades = simulate_trades(pred, df_m5, args.sl_mult, args.tp_mult, args.max_hold_bars, args.cooldown_bars)
+
+    if args.out:
+        pred.to_csv(args.out)
+        print(f"💾 Predictions saved: {args.out}")
+    if args.trades_out:
+        trades.to_csv(args.trades_out, index=False)
+        print(f"💾 Trades saved: {args.trades_out}")
+
+    for key, value in summarize(pred, trades).items():
+        print(f"   {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import os
+import sys
+import io
+import json
+import time
+import platform
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+# ไม่ให้ Benchmark ไปอ่าน/เขียน State หรือปฏิทินข่าวของ Service ที่รันอยู่จริง
+os.environ.setdefault('OBOT_STATE_BACKEND', 'memory')
+os.environ.setdefault('OBOT_NEWS_INDEX', os.path.join(tempfile.mkdtemp(prefix='obot_bench_'), 'news_index.json'))
+
+import linux_api as api
+from linux_model import (
+    compute_features_lite, resample_context, columnar_parity, FeatureBuffer, FeatureWindows, StreamingFeatureEngine,
+    REQUIRED_FEATURES
+)
+from linux_ingest import decode_bar_payload, decode_wire_payload, encode_wire_payload, WIRE_CONTENT_TYPE
+
+# ==============================================================================
+# BENCHMARK SUITE (Feature / Scaling / Inference / /predict ทั้งเส้น) - Offline, CPU
+#   python linux_bench.py --sizes 100,1000,10000,100000 --out bench.json
+#   python linux_bench.py --baseline bench_baseline.json --fail-on-regression
+# รันจาก Directory เดียวกับ linux_api.py (ใช้ models/model.h5 + models/scaler.pkl ตาม Config)
+# ผลเป็น JSON (Latency p50/p95/p99, Throughput, Peak Memory จาก tracemalloc) เทียบกับ Baseline ได้
+# หมายเหตุ: tracemalloc เห็นเฉพาะ Memory ที่จองผ่าน Python/NumPy (ไม่รวม Buffer ภายใน TensorFlow)
+# ==============================================================================
+
+# ==============================================================================
+# PART 1: SYNTHETIC PAYLOADS (XAUUSD + USD Index M5, Seed คงที่)
+# ==============================================================================
+
+def synthetic_bars(n, seed=0, start='2024-01-01 00:00'):
+    """คืน (df_m5, df_usd) n แท่ง M5 แบบ Random Walk (ข้ามเสาร์-อาทิตย์เหมือนตลาดจริง)"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, periods=int(n * 1.5) + 600, freq='5min')
+    times = times[times.dayofweek < 5][:n]
+
+    close = 2000.0 + np.cumsum(rng.normal(0.0, 1.0, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0.0, 0.2, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0.0, 0.8, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0.0, 0.8, n))
+    df_m5 = pd.DataFrame({
+        'open': open_.round(2), 'high': high.round(2), 'low': low.round(2), 'close': close.round(2),
+        'tick_volume': rng.integers(50, 500, n).astype(float)
+    }, index=pd.DatetimeIndex(times, name='time'))
+
+    usd = 100.0 + np.cumsum(rng.normal(0.0, 0.05, n))
+    df_usd = pd.DataFrame({
+        'open': usd.round(3), 'high': (usd + 0.01).round(3), 'low': (usd - 0.01).round(3),
+        'close': usd.round(3), 'tick_volume': 1.0
+    }, index=pd.DatetimeIndex(times, name='time'))
+    return df_m5, df_usd
+
+
+def to_records(df):
+    """DataFrame -> List ของ Bar (time เป็น Unix seconds) เรียงเก่า -> ใหม่ (ใช้ [::-1] ให้ได้ลำดับแบบ GetRatesJSON ของ EA)"""
+    times = df.index.asi8 // 1_000_000_000
+    return [
+        {'time': int(t), 'open': o, 'high': h, 'low': l, 'close': c, 'tick_volume': int(v), 'real_volume': 0}
+        for t, o, h, l, c, v in zip(times, df['open'], df['high'], df['low'], df['close'], df['tick_volume'])
+    ]
+
+
+def to_columns(df):
+    """DataFrame -> Column Arrays (time เป็น Unix seconds) สำหรับ Binary Payload"""
+    columns = {field: df[field].values for field in ('open', 'high', 'low', 'close', 'tick_volume')}
+    columns['time'] = df.index.asi8 // 1_000_000_000
+    return columns
+
+# ==============================================================================
+# PART 2: MEASUREMENT
+# ==============================================================================
+
+def measure(func, setup=None, warmup=2, min_iters=3, max_iters=50, budget_s=10.0, track_memory=True):
+    """
+    เรียก func(arg) ซ้ำ (arg = setup(i) ถ้ามี) จนครบ max_iters หรือหมดเวลา budget_s (อย่างน้อย min_iters)
+    คืน Latency (ms) p50/p95/p99 + Throughput + Peak Memory ของการเรียก 1 ครั้ง
+    """
+    i = 0
+    for _ in range(warmup):
+        func(setup(i) if setup else None)
+        i += 1
+
+    samples = []
+    deadline = time.perf_counter() + budget_s
+    while len(samples) < max_iters and (len(samples) < min_iters or time.perf_counter() < deadline):
+        arg = setup(i) if setup else None
+        i += 1
+        t0 = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - t0)
+
+    peak_mb = None
+    if track_memory:
+        arg = setup(i) if setup else None
+        tracemalloc.start()
+        func(arg)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    ms = np.array(samples) * 1000.0
+    return {
+        'n': len(samples),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'throughput_per_s': round(1000.0 / float(ms.mean()), 2),
+        'peak_mem_mb': round(peak_mb, 3) if peak_mb is not None else None
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """ปิด print ระหว่างวัด (compute_features_lite / filter log พิมพ์ทุกครั้ง)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+# ==============================================================================
+# PART 3: STAGES
+# ==============================================================================
+
+def resample_context_pandas(df):
+    """สูตร pandas เดิมของ compute_features_lite (resample + reindex ffill) -> Reference ของ resample_context"""
+    import talib
+    df_h1 = df.resample('1H').agg({'close': 'last'}).dropna()
+    df_h1['ema50_h1'] = talib.EMA(df_h1['close'].astype(float).values, timeperiod=50)
+    ema50_h1 = df_h1['ema50_h1'].reindex(df.index, method='ffill')
+
+    df_day = df.resample('D').agg({'high': 'max', 'low': 'min', 'close': 'last'}).shift(1).dropna()
+    df_day['Pivot'] = (df_day['high'] + df_day['low'] + df_day['close']) / 3
+    df_day['R1'] = (2 * df_day['Pivot']) - df_day['low']
+    df_day['S1'] = (2 * df_day['Pivot']) - df_day['high']
+    return (ema50_h1.values, *(df_day[col].reindex(df.index, method='ffill').values for col in ('Pivot', 'R1', 'S1')))
+
+
+def resample_arrays(df):
+    """resample_context (Array Bucketing ที่ compute_features_lite ใช้จริง)"""
+    return resample_context(df.index, *(df[col].values.astype(float) for col in ('high', 'low', 'close')))
+
+
+def bench_size(size, args, bundle):
+    """วัดทุก Stage ที่ขนาด History = size แท่ง -> {stage: result}"""
+    extra = args.warmup + args.max_iters + 2
+    df_m5, df_usd = synthetic_bars(size + extra, seed=args.seed)
+    base_m5, base_usd = df_m5.iloc[:size], df_usd.iloc[:size]
+    opts = dict(warmup=args.warmup, min_iters=args.min_iters, max_iters=args.max_iters, budget_s=args.budget)
+    results = {}
+
+    def run(stage, func, setup=None, **kw):
+        try:
+            with quiet():
+                results[stage] = measure(func, setup, **{**opts, **kw})
+        except Exception as e:
+            results[stage] = {'error': str(e)}
+        print(f"   {stage:<22} {format_result(results[stage])}")
+
+    # JSON Payload แบบ Legacy (EA ส่ง History ทั้งก้อน แท่งล่าสุดก่อน)
+    payload = json.dumps({'symbol': 'XAUUSD', 'm5_data': to_records(base_m5)[::-1], 'usd_m5': to_records(base_usd)[::-1]}).encode()
+    run('json_parse', lambda _: json.loads(payload))
+    run('payload_decode', lambda _: decode_bar_payload(payload))
+    wire = encode_wire_payload({'symbol': 'XAUUSD'}, to_columns(base_m5), to_columns(base_usd))
+    run('wire_decode', lambda _: decode_wire_payload(wire))
+
+    # H1 EMA + Daily Pivots: Array Bucketing เทียบกับ pandas resample เดิม (ผลเท่ากันทุก bit -> tests/test_features.py)
+    run('resample_pandas', lambda _: resample_context_pandas(base_m5))
+    run('resample_arrays', lambda _: resample_arrays(base_m5))
+    run('features_batch', lambda _: compute_features_lite(base_m5, df_usd=base_usd))
+
+    # Columnar float32 Buffer (ใช้ Buffer เดิมซ้ำทุกรอบเหมือนใน API) เทียบกับ DataFrame Path
+    with quiet():
+        parity = columnar_parity(base_m5, base_usd)
+    if not parity <= 1e-5:
+        print(f"   ⚠️ FeatureBuffer differs from compute_features_lite (max diff {parity:.2e})")
+    buffer = FeatureBuffer(size)
+    m5_cols, usd_cols = to_columns(base_m5), to_columns(base_usd)
+    run('features_columnar', lambda _: buffer.compute(
+        m5_cols['time'], m5_cols['open'], m5_cols['high'], m5_cols['low'], m5_cols['close'], m5_cols['tick_volume'],
+        usd_cols['time'], usd_cols['close'], indicators=True))
+    run('features_stream_seed', lambda _: StreamingFeatureEngine.from_frames(
+        base_m5, base_usd, max_rows=api.Config.STREAM_MAX_ROWS), max_iters=min(args.max_iters, 10))
+
+    engine = StreamingFeatureEngine.from_frames(base_m5, base_usd, max_rows=api.Config.STREAM_MAX_ROWS)
+    times = df_m5.index.asi8 // 1_000_000_000
+    cols = [df_m5[c].values.astype(float) for c in ('open', 'high', 'low', 'close', 'tick_volume')]
+    usd_close = df_usd['close'].values.astype(float)
+
+    def stream_bar(i):
+        k = size + i
+        return (times[k:k + 1], *(c[k:k + 1] for c in cols), times[k:k + 1], usd_close[k:k + 1])
+
+    run('features_stream_bar', lambda a: engine.extend_arrays(*a), setup=stream_bar, track_memory=False)
+
+    try:
+        with quiet():
+            features = compute_features_lite(base_m5, df_usd=base_usd)
+    except Exception:
+        features = None
+    if features is None or len(features) < api.Config.SEQUENCE_LENGTH or bundle is None:
+        print(f"   (skip scale/model/predict: needs a loaded model and >= {api.Config.SEQUENCE_LENGTH} feature rows)")
+        return results
+
+    window_df = features[REQUIRED_FEATURES].iloc[-api.Config.SEQUENCE_LENGTH:]
+    run('scale', lambda _: FeatureWindows.from_features(window_df, bundle.scaler, api.Config.SEQUENCE_LENGTH).latest())
+    window = FeatureWindows.from_features(window_df, bundle.scaler, api.Config.SEQUENCE_LENGTH).latest()
+    run('model', lambda _: bundle.predict(window), track_memory=False)
+
+    # /predict ทั้งเส้นผ่าน Flask Test Client: แต่ละรอบเลื่อน Window ไป 1 แท่ง (เหมือนแท่งใหม่ปิด -> Cache Miss)
+    client = api.app.test_client()
+    m5_records, usd_records = to_records(df_m5), to_records(df_usd)
+
+    # Legacy / Full Snapshot: GetRatesJSON ของ EA ส่งแท่งล่าสุดก่อน (Binary / Delta เรียงเก่า -> ใหม่)
+    def legacy_payload(i):
+        body = {'symbol': 'XAUUSD', 'm5_data': m5_records[i:i + size][::-1], 'usd_m5': usd_records[i:i + size][::-1]}
+        return json.dumps(body).encode() + b'\x00'
+
+    def wire_payload(i):
+        return encode_wire_payload(
+            {'symbol': 'XAUUSD'}, to_columns(df_m5.iloc[i:i + size]), to_columns(df_usd.iloc[i:i + size]))
+
+    def post(data, content_type=None):
+        r = client.post('/predict', data=data, content_type=content_type)
+        if r.status_code != 200:
+            raise RuntimeError(f"/predict returned {r.status_code}: {r.get_json()}")
+        return r.get_json()
+
+    api.feature_engines.clear()
+    run('predict_legacy', post, setup=legacy_payload)
+    api.feature_engines.clear()
+    run('predict_wire', lambda data: post(data, WIRE_CONTENT_TYPE), setup=wire_payload)
+
+    with quiet():
+        session = post(json.dumps({
+            'symbol': 'XAUUSD', 'mode': 'full', 'session': '',
+            'm5_data': m5_records[:size][::-1], 'usd_m5': usd_records[:size][::-1]
+        }).encode())
+    state = {'ack': size - 1}
+
+    def delta_payload(i):
+        ack, k = state['ack'], size + i
+        state['ack'] = k
+        return json.dumps({
+            'symbol': 'XAUUSD', 'mode': 'delta', 'session': session['session_id'],
+            'm5_data': m5_records[ack:k + 1], 'usd_m5': usd_records[ack:k + 1]
+        }).encode()
+
+    run('predict_delta', post, setup=delta_payload)
+    return results
+
+# ==============================================================================
+# PART 4: REPORT / BASELINE
+# ==============================================================================
+
+def format_result(result):
+    if 'error' in result:
+        return f"ERROR {result['error']}"
+    mem = f", peak {result['peak_mem_mb']:.2f} MB" if result.get('peak_mem_mb') is not None else ''
+    return (f"p50 {result['p50_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, "
+            f"{result['throughput_per_s']:.1f}/s (n={result['n']}{mem})")
+
+
+def compare(results, baseline, tolerance):
+    """เทียบ p50 กับ Baseline -> List ของ (key, base_ms, now_ms, ratio, status)"""
+    rows = []
+    for key, now in sorted(results.items()):
+        base = baseline.get(key)
+        if not base or 'error' in base or 'error' in now:
+            continue
+        ratio = now['p50_ms'] / base['p50_ms'] if base['p50_ms'] > 0 else float('inf')
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'FASTER' if ratio < 1 - tolerance else 'OK'
+        rows.append((key, base['p50_ms'], now['p50_ms'], ratio, status))
+    return rows
+
+
+def environment():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    for module in ('talib', 'sklearn', 'tensorflow', 'flask'):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    return {
+        'platform': platform.platform(), 'machine': platform.machine(),
+        'cpu_count': os.cpu_count(), 'versions': versions
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OBot feature / inference benchmark suite.")
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help="Comma-separated history sizes (bars)")
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--min-iters', type=int, default=3)
+    parser.add_argument('--max-iters', type=int, default=50)
+    parser.add_argument('--budget', type=float, default=10.0, help="Seconds per stage (after min-iters)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--no-model', action='store_true', help="Skip stages that need model.h5 / scaler.pkl")
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p50 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    # Config ให้ /predict วัดงานจริงทุกรอบ (ไม่ตอบจาก Cache / ไม่ถูก Bot STOPPED กั้น)
+    api.Config.USE_PREDICTION_CACHE = False
+    api.state_store.update('account', bot_status='RUNNING')
+    bundle = None
+    if not args.no_model:
+        with quiet():
+            loaded = api.load_assets()
+        bundle = api.model_registry.current if loaded else None
+        if bundle is None:
+            print("⚠️ Model/scaler could not be loaded. Model-dependent stages will be skipped.")
+
+    started = time.time()
+    results = {}
+    for size in sizes:
+        print(f"📊 Size {size} bars")
+        for stage, result in bench_size(size, args, bundle).items():
+            results[f"{stage}@{size}"] = result
+
+    report = {
+        'created': started,
+        'duration_s': round(time.time() - started, 1),
+        'environment': environment(),
+        'settings': vars(args),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'results': results
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved: {args.out}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        print(f"--- Compared with {args.baseline} (p50, tolerance {args.tolerance:.0%}) ---")
+        for key, base_ms, now_ms, ratio, status in compare(results, baseline, args.tolerance):
+            print(f"   {key:<30} {base_ms:>10.3f} -> {now_ms:>10.3f} ms  x{ratio:.2f}  {status}")
+            if status == 'REGRESSION':
+                regressions.append(key)
+
+    if regressions and args.fail_on_regression:
+        print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
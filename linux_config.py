@@ -0,0 +1,124 @@
+import os
+
+from linux_model import REQUIRED_FEATURES
+from linux_inference import ModelRoute, load_routes
+
+# ==============================================================================
+# CONFIGURATION (ใช้ร่วมกัน: linux_api / linux_backtest)
+# ==============================================================================
+# Module นี้ไม่มี Side Effect ตอน Import (ไม่สร้าง State Store / ไม่อ่าน routes.json / ไม่เริ่ม News Scraper)
+# -> เครื่องมือ Offline (linux_backtest) Import ได้โดยไม่กระทบ Server ที่รันอยู่
+
+class Config:
+    # Path Config for LITE Model
+    MODEL_PATH = 'models/model.h5'
+    SCALER_PATH = 'models/scaler.pkl'
+
+    SEQUENCE_LENGTH = 50
+    PREDICTION_THRESHOLD = 0.55 
+    NEWS_LOCKDOWN_MINUTES = 30
+    MIN_ATR = 1.0
+    USE_EMA_FILTER = True
+
+    # Filter หลัง Model ของ Default Route ตามลำดับ (Route อื่นกำหนด "filters" เองใน routes.json, ดู linux_filters)
+    SIGNAL_FILTERS = ('ema200_trend', 'min_atr', 'threshold')
+
+    # Incremental Feature Engine (คำนวณเฉพาะแท่งใหม่ แทนการคำนวณ 1000 แท่งทุกครั้ง)
+    USE_STREAMING_FEATURES = True
+    STREAM_MAX_ROWS = 200
+
+    # Batch Path (เมื่อปิด Streaming): คำนวณ Feature จาก Column Arrays ลง float32 Buffer ที่ใช้ซ้ำ แทน DataFrame
+    USE_COLUMNAR_FEATURES = True
+
+    # Delta Ingestion (EA ส่ง Snapshot ครั้งเดียว แล้วส่งเฉพาะแท่งใหม่)
+    RING_BUFFER_BARS = 1000
+    SESSION_TTL_SECONDS = 3600
+    MAX_SESSIONS = 64
+    # Directory ของ Session ที่ทุก gunicorn Worker ใช้ร่วมกัน ('' = Session อยู่ใน Process เดียว, gunicorn.conf.py ตั้งให้)
+    SESSION_DIR = os.environ.get('OBOT_SESSION_DIR', '')
+
+    # Inference Backend ('tflite' | 'tf_function' | 'keras') + ค่าต่างสูงสุดที่ยอมรับเทียบกับ Keras
+    INFERENCE_BACKEND = 'tf_function'
+    INFERENCE_PARITY_ATOL = 1e-4
+
+    # Scaler แบบ float32 In-place (center_/scale_ จาก scaler.pkl) แทน sklearn transform ทุก Request
+    USE_FAST_SCALER = True
+
+    # Micro-Batching (รวม /predict ที่มาพร้อมกันภายใน Window เป็น Forward Pass เดียว)
+    USE_MICRO_BATCHING = True
+    BATCH_WINDOW_MS = 3.0
+    MAX_BATCH_SIZE = 16
+
+    # Production Serving (gunicorn -c gunicorn.conf.py): มีเพียง Process เดียวที่ถือ Lock นี้ได้ -> News Scheduler รันที่เดียว
+    SCHEDULER_LOCK_FILE = os.environ.get('OBOT_SCHEDULER_LOCK', '/tmp/obot_news_scheduler.lock')
+    # Background Job: flock ต่อชนิดงาน ({kind} = retrain / fix / update_ea) -> ไม่มี 2 Worker สร้างงานชนิดเดียวกันซ้อนกัน
+    JOB_LOCK_FILE = os.environ.get('OBOT_JOB_LOCK', '/tmp/obot_job_{kind}.lock')
+
+    # Shared State ('memory' = Process เดียว, 'sqlite' = ใช้ร่วมกันหลาย Worker ผ่านไฟล์ WAL)
+    STATE_BACKEND = os.environ.get('OBOT_STATE_BACKEND', 'memory')
+    STATE_DB_PATH = os.environ.get('OBOT_STATE_DB', '/tmp/obot_state.db')
+
+    # ปฏิทินข่าวแดง USD (Scraper เขียน, /predict อ่านด้วย bisect)
+    NEWS_INDEX_PATH = os.environ.get('OBOT_NEWS_INDEX', '/tmp/obot_news_index.json')
+
+    # Cache ของ Request ซ้ำสำหรับแท่งเดิม (Key = Hash ของทุกแท่งใน Window -> แท่งไหนเปลี่ยนก็ Miss เอง)
+    USE_PREDICTION_CACHE = True
+    CACHE_MAX_ENTRIES = 256
+    CACHE_MAX_MB = 64
+    CACHE_TTL_SECONDS = 900
+
+    # Latency Metrics ของ /predict (ส่ง Snapshot ต่อ Worker ลง State Store ทุก N วินาที -> /metrics รวมทุก Worker)
+    METRICS_FLUSH_SECONDS = 5.0
+    # (ไฟล์แยกจาก STATE_DB_PATH: Commit ของ Metrics ไม่ทำให้ Cache ของ bot_status / News ทุก Worker ต้องอ่านใหม่)
+    METRICS_DB_PATH = os.environ.get('OBOT_METRICS_DB', '/tmp/obot_metrics.db')
+
+    # Staged Startup: Bind Port ทันที แล้ว Import TensorFlow + Load Model + News Scheduler ใน Background
+    # (ระหว่างนี้ /predict ตอบ 503, /status บอกขั้นที่กำลังทำใน 'startup') / '0' = โหลดครบก่อนเปิด Port แบบเดิม
+    STAGED_STARTUP = os.environ.get('OBOT_STAGED_STARTUP', '1') != '0'
+
+    # Model Routing (หลาย Symbol / Model Version ใน Process เดียว)
+    # Default Route = (DEFAULT_SYMBOL, 'default') จาก MODEL_PATH / SCALER_PATH / ค่าด้านบน (ใช้กับ Symbol ที่ไม่มี Route)
+    # Route อื่นอ่านจาก MODEL_ROUTES_PATH (ดู linux_inference.load_routes) -> EA เลือกด้วย "model" ใน Payload หรือ ?model=
+    DEFAULT_SYMBOL = 'XAUUSD'
+    MODEL_ROUTES_PATH = os.environ.get('OBOT_MODEL_ROUTES', 'models/routes.json')
+    MAX_LOADED_MODELS = 4
+    MAX_MODELS_MB = 1024
+
+    # Local Retrain (/retrain): เทรนจาก History ในเครื่องด้วย linux_train.py เป็น Process แยก -> Version ใหม่ใน TRAIN_VERSIONS_DIR
+    # (ไม่มีไฟล์ TRAIN_M5_PATH -> ดาวน์โหลด model.h5 / scaler.pkl จาก GitHub แบบเดิม)
+    TRAIN_M5_PATH = os.environ.get('OBOT_TRAIN_M5', 'data/xauusd_m5.csv')
+    TRAIN_USD_PATH = os.environ.get('OBOT_TRAIN_USD', 'data/usd_m5.csv')
+    TRAIN_VERSIONS_DIR = 'models/versions'
+    TRAIN_FINE_TUNE = True  # เริ่มจาก Model ปัจจุบัน (False = เทรนใหม่ทั้งหมด)
+    TRAIN_EPOCHS = 20
+    # ไม่ให้แย่ง /predict: nice ต่ำสุด + จำกัด Thread + จำกัด Memory (RLIMIT_AS) + Timeout
+    TRAIN_NICE = 19
+    TRAIN_THREADS = 1
+    TRAIN_MAX_MEMORY_MB = 3072
+    TRAIN_TIMEOUT_SECONDS = 4 * 3600
+
+
+# Routing Table: Default Route ใช้ model_registry ของ linux_api (โหลดผ่าน load_assets, ไม่ถูก Unload)
+# Route อื่นโหลดเมื่อถูกเรียกครั้งแรก และถูก Unload แบบ LRU เมื่อเกิน MAX_LOADED_MODELS / MAX_MODELS_MB
+default_route = ModelRoute(
+    Config.DEFAULT_SYMBOL, 'default', Config.MODEL_PATH, Config.SCALER_PATH, REQUIRED_FEATURES,
+    seq_len=Config.SEQUENCE_LENGTH, threshold=Config.PREDICTION_THRESHOLD,
+    min_atr=Config.MIN_ATR, pinned=True,
+    filters=[name for name in Config.SIGNAL_FILTERS if Config.USE_EMA_FILTER or name != 'ema200_trend']
+)
+
+
+def configured_routes(path=None, base_route=default_route):
+    """
+    Route เพิ่มเติมจาก MODEL_ROUTES_PATH (ดู linux_inference.load_routes) ทีละ Route หลัง Validate
+    Raise ValueError เมื่อเจอ Route ที่ใช้ไม่ได้ (Route ก่อนหน้าที่ Yield ไปแล้วใช้ได้ตามปกติ)
+    """
+    path = Config.MODEL_ROUTES_PATH if path is None else path
+    for route in load_routes(path, base_route):
+        if not set(route.features) <= set(REQUIRED_FEATURES):
+            raise ValueError(f"Route {route.name}: unknown features {sorted(set(route.features) - set(REQUIRED_FEATURES))}")
+        if route.seq_len > Config.STREAM_MAX_ROWS:
+            raise ValueError(f"Route {route.name}: seq_len {route.seq_len} > STREAM_MAX_ROWS {Config.STREAM_MAX_ROWS}")
+        # (Scaler ของ Route ถูกตรวจตอน ModelRouter โหลดใน Worker: n_features_in_ / feature_names_in_ ต้องตรงกับ route.features)
+        yield route
+
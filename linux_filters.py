@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+
+# ==============================================================================
+# PART 1: SIGNAL FILTER PIPELINE (หลัง Model: EMA200 Trend / Min ATR / Threshold + Dynamic Risk)
+# ==============================================================================
+# Filter แต่ละตัว = ฟังก์ชัน filter(decision, settings) ที่แก้ SignalDecision ตัวเดียวกันตามลำดับ
+#   settings  = ModelRoute ของ Request (threshold / min_atr ของโมเดลนั้น)
+#   indicators = ค่าจาก Feature Engine / compute_features_lite(indicators=True) -> ไม่คำนวณ Indicator ซ้ำ
+# แต่ละ Route เลือกชุด Filter เองได้ (ModelRoute.filters) -> build_pipeline() แปลงชื่อเป็นฟังก์ชันครั้งเดียวตอนสร้าง Route
+# เพิ่ม Filter ใหม่: @register_filter('ชื่อ') แล้วใส่ชื่อใน "filters" ของ Route
+
+SIGNALS = ('HOLD', 'BUY', 'SELL')
+DEFAULT_FILTERS = ('ema200_trend', 'min_atr', 'threshold')
+
+FILTERS = {}
+
+
+def register_filter(name):
+    def decorator(func):
+        FILTERS[name] = func
+        return func
+    return decorator
+
+
+def build_pipeline(names):
+    """ชื่อ Filter -> Tuple ของฟังก์ชัน (Raise ValueError ถ้ามีชื่อที่ไม่รู้จัก)"""
+    unknown = [name for name in names if name not in FILTERS]
+    if unknown:
+        raise ValueError(f"Unknown signal filters {unknown}. Available: {sorted(FILTERS)}")
+    return tuple(FILTERS[name] for name in names)
+
+
+def dynamic_risk(probability, threshold):
+    """% Risk ต่อไม้ตามความมั่นใจของ Model"""
+    if probability > 0.75: # ⬅️ (ต้องปรับใหม่)
+        return 2.0
+    elif probability > 0.65: # ⬅️ (ต้องปรับใหม่)
+        return 1.5
+    elif probability > threshold:
+        return 1.0
+    else:
+        return 0.5
+
+
+class SignalDecision:
+    """ผลของ Model 1 ครั้ง ที่ Filter แต่ละตัวปรับต่อ (notes = เหตุผลที่ถูก Block สำหรับ Log)"""
+    __slots__ = ('raw_signal', 'signal', 'probability', 'atr', 'dynamic_risk', 'regime', 'indicators', 'notes')
+
+    def __init__(self, probs, atr, indicators):
+        cls = int(np.argmax(probs))
+        self.raw_signal = SIGNALS[cls] if cls < len(SIGNALS) else 'NONE'
+        self.signal = self.raw_signal
+        self.probability = float(np.max(probs))
+        self.atr = float(atr)
+        self.dynamic_risk = 0.5
+        self.regime = 'ACTIVE'
+        self.indicators = indicators
+        self.notes = []
+
+    def block(self, note):
+        self.signal = 'HOLD'
+        self.notes.append(note)
+
+
+def run_pipeline(pipeline, decision, settings):
+    for f in pipeline:
+        f(decision, settings)
+    return decision
+
+
+@register_filter('ema200_trend')
+def ema200_trend(decision, settings):
+    """BUY ใต้ EMA200 / SELL เหนือ EMA200 -> HOLD (ข้ามถ้ายังไม่มี EMA200)"""
+    close, ema200 = decision.indicators.get('close', math.nan), decision.indicators.get('ema200', math.nan)
+    if math.isnan(ema200):
+        return
+    if decision.signal == 'BUY' and close < ema200:
+        decision.block(f"Blocked BUY (Price {close:.2f} < EMA {ema200:.2f})")
+    elif decision.signal == 'SELL' and close > ema200:
+        decision.block(f"Blocked SELL (Price {close:.2f} > EMA {ema200:.2f})")
+
+
+@register_filter('min_atr')
+def min_atr(decision, settings):
+    if decision.atr < settings.min_atr:
+        decision.block(f"Low Volatility (ATR {decision.atr:.4f} < {settings.min_atr})")
+
+
+@register_filter('threshold')
+def threshold(decision, settings):
+    """ความมั่นใจต่ำกว่า Threshold -> HOLD (Risk 0.5%) / ผ่าน -> Dynamic Risk ตามความมั่นใจ"""
+    if decision.probability < settings.threshold:
+        decision.signal = 'HOLD'
+        decision.dynamic_risk = 0.5
+    else:
+        decision.dynamic_risk = dynamic_risk(decision.probability, settings.threshold)
@@ -0,0 +1,616 @@
+import io
+import os
+import json
+import queue
+import pickle
+import hashlib
+import threading
+import time
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import h5py
+import numpy as np
+
+from linux_model import FastScaler
+from linux_filters import DEFAULT_FILTERS, build_pipeline
+
+# TensorFlow Import ~3 วินาที -> Import ครั้งแรกที่ต้องใช้ (linux_api Bind Port ได้ก่อน ดู linux_startup)
+tf = None
+
+
+def import_tensorflow(threads=None):
+    """Import TensorFlow ครั้งแรกที่เรียก (threads = จำกัด intra/inter-op Thread ได้เฉพาะตอน Import ครั้งแรก)"""
+    global tf
+    if tf is None:
+        import tensorflow
+        if threads:
+            tensorflow.config.threading.set_intra_op_parallelism_threads(threads)
+            tensorflow.config.threading.set_inter_op_parallelism_threads(threads)
+        tf = tensorflow
+    return tf
+
+
+def load_model(source):
+    return import_tensorflow().keras.models.load_model(source)
+
+# ==============================================================================
+# PART 1: LOW-LATENCY INFERENCE BACKEND (แทน model.predict ทีละ Request)
+# ==============================================================================
+# model.predict() สร้าง Data Adapter / Callbacks / Step Function ใหม่ทุกครั้ง (~หลายสิบ ms)
+# ที่นี่ Trace โมเดลเป็น Graph ครั้งเดียวตอน Load แล้วเรียกตรง ๆ
+#   - 'tf_function' : tf.function + input_signature คงที่ (ผลลัพธ์ตรงกับ Keras)
+#   - 'tflite'      : แปลงเป็น TFLite (XNNPACK บน CPU, เร็วสุดแต่ต่างจาก Keras ระดับ 1e-5)
+#   - 'keras'       : model.predict เดิม (Fallback)
+
+BACKENDS = ('tflite', 'tf_function', 'keras')
+
+
+class InferenceBackend:
+    """
+    โหลด model.h5 ครั้งเดียว -> Compile เป็น Backend ที่เลือก -> Parity Check กับ Keras -> Warmup
+    ถ้า Backend ที่เลือกใช้ไม่ได้ / ผลไม่ตรง จะถอยไป Backend ถัดไปใน BACKENDS
+    """
+
+    def __init__(self, keras_model, seq_len, n_features, backend='tf_function', parity_atol=1e-4, parity_samples=8):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}'. Use one of {BACKENDS}.")
+        import_tensorflow()
+        self.keras_model = keras_model
+        self.seq_len = seq_len
+        self.n_features = n_features
+        self.parity_atol = parity_atol
+        self.parity_max_diff = None
+        self.backend = None
+        self._predict_fn = None
+        self._lock = threading.Lock()
+
+        probe = self._parity_inputs(parity_samples)
+        expected = keras_model.predict(probe, verbose=0)
+
+        for name in BACKENDS[BACKENDS.index(backend):]:
+            try:
+                predict_fn = getattr(self, f"_build_{name}")()
+                got = np.concatenate([predict_fn(probe[i:i + 1]) for i in range(len(probe))])
+                max_diff = float(np.max(np.abs(got - expected)))
+            except Exception as e:
+                print(f"⚠️ Inference backend '{name}' unavailable: {e}")
+                continue
+            if max_diff > parity_atol:
+                print(f"⚠️ Inference backend '{name}' failed parity check (max diff {max_diff:.2e} > {parity_atol:.0e})")
+                continue
+            self.backend = name
+            self.parity_max_diff = max_diff
+            self._predict_fn = predict_fn
+            break
+
+        if self._predict_fn is None:
+            raise ValueError("No inference backend passed the parity check.")
+
+        # Warmup: ให้ Graph/Interpreter จัดสรร Buffer ให้เรียบร้อยก่อนรับ Request จริง
+        for _ in range(3):
+            self.predict(probe[:1])
+        print(f"✅ Inference backend: {self.backend} (parity max diff {self.parity_max_diff:.2e})")
+
+    @classmethod
+    def from_path(cls, model_path, seq_len, n_features, **kwargs):
+        return cls(load_model(model_path), seq_len, n_features, **kwargs)
+
+    def _parity_inputs(self, n):
+        # Input หลัง RobustScaler อยู่แถว ๆ 0 +/- ไม่กี่หน่วย
+        rng = np.random.default_rng(0)
+        return rng.normal(size=(n, self.seq_len, self.n_features)).astype(np.float32)
+
+    # --- Backends ---
+
+    def _build_tf_function(self):
+        model = self.keras_model
+        spec = tf.TensorSpec([None, self.seq_len, self.n_features], tf.float32)
+
+        @tf.function(input_signature=[spec])
+        def serve(x):
+            return model(x, training=False)
+
+        return lambda X: serve(tf.constant(X)).numpy()
+
+    def _build_tflite(self):
+        # LSTM ต้องใช้ Batch คงที่ = 1 (TensorList ของ TFLite ต้องรู้ Shape ตอน Convert)
+        model = self.keras_model
+        spec = tf.TensorSpec([1, self.seq_len, self.n_features], tf.float32)
+        serve = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+        interpreter = tf.lite.Interpreter(model_content=converter.convert())
+        interpreter.allocate_tensors()
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        def predict(X):
+            out = []
+            with self._lock:  # Interpreter ใช้ Buffer ร่วมกัน -> ห้ามเรียกพร้อมกันหลาย Thread
+                for i in range(len(X)):
+                    interpreter.set_tensor(input_index, X[i:i + 1])
+                    interpreter.invoke()
+                    out.append(interpreter.get_tensor(output_index).copy())
+            return np.concatenate(out)
+
+        return predict
+
+    def _build_keras(self):
+        model = self.keras_model
+        return lambda X: model.predict(X, verbose=0)
+
+    # --- Public ---
+
+    def predict(self, X):
+        """X: (B, seq_len, n_features) -> Probabilities (B, n_classes)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 3 or X.shape[1:] != (self.seq_len, self.n_features):
+            raise ValueError(f"Expected input shape (B, {self.seq_len}, {self.n_features}), got {X.shape}")
+        return self._predict_fn(X)
+
+    def info(self):
+        return {'backend': self.backend, 'parity_max_diff': self.parity_max_diff}
+
+
+# ==============================================================================
+# PART 2: MICRO-BATCHING (รวม Request ที่มาพร้อมกันตอนปิดแท่ง M5 เป็น Batch เดียว)
+# ==============================================================================
+
+class MicroBatcher:
+    """
+    Request แต่ละตัวส่ง 1 Sample (seq_len, n_features) เข้าคิว -> Worker Thread รอเก็บเพิ่ม
+    ไม่เกิน window_ms หรือจนครบ max_batch แล้ว Stack เป็น (B, seq_len, n_features)
+    เรียก Backend ครั้งเดียว แล้วคืนผลให้แต่ละ Request
+    """
+
+    _STOP = object()
+
+    def __init__(self, backend, window_ms=3.0, max_batch=16):
+        self.backend = backend
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+
+    def predict(self, sample, timeout=10.0):
+        """sample: (seq_len, n_features) -> Probabilities (n_classes,) (Block จนกว่า Batch จะเสร็จ)"""
+        future = Future()
+        self._queue.put((np.asarray(sample, dtype=np.float32), future))
+        return future.result(timeout=timeout)
+
+    def stop(self):
+        self._queue.put(self._STOP)
+        self._thread.join(timeout=5)
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is self._STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                self._queue.put(self._STOP)  # ทำ Batch นี้ให้เสร็จก่อน แล้วค่อยหยุด
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                probs = self.backend.predict(np.stack([sample for sample, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, p in zip(futures, probs):
+                future.set_result(p)
+
+
+# ==============================================================================
+# PART 3: MODEL REGISTRY (Hot Swap แบบ Double Buffer - ไม่มีช่วง "Model not loaded")
+# ==============================================================================
+
+class ModelBundle:
+    """
+    Model + Scaler + Inference Backend (+ Batcher) 1 ชุด ที่ไม่เปลี่ยนหลังสร้าง
+    Request ที่ถือ Bundle อยู่ใช้ต่อได้จนจบ แม้จะมี Version ใหม่มาแทนแล้ว
+    (Batcher ของ Bundle เก่าหยุดเมื่อ Request สุดท้ายคืน Bundle)
+    """
+
+    def __init__(self, version, keras_model, inference, scaler, batcher=None, checksum=None, size_bytes=0):
+        self.version = version
+        self.keras_model = keras_model
+        self.inference = inference
+        self.scaler = scaler
+        self.batcher = batcher
+        self.checksum = checksum
+        self.size_bytes = size_bytes  # ประมาณจาก Weight (float32) ใช้คุมงบหน่วยความจำของ ModelRouter
+        self.loaded_at = time.time()
+        self._refs = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def predict(self, sample):
+        """sample: (seq_len, n_features) ที่ Scale แล้ว -> Probabilities (n_classes,)"""
+        if self.batcher is not None:
+            return self.batcher.predict(sample)
+        return self.inference.predict(np.asarray(sample)[None, ...])[0]
+
+    def _acquire(self):
+        with self._lock:
+            self._refs += 1
+
+    def _release(self):
+        with self._lock:
+            self._refs -= 1
+            done = self._retired and self._refs == 0
+        if done:
+            self._close()
+
+    def _retire(self):
+        with self._lock:
+            self._retired = True
+            done = self._refs == 0
+        if done:
+            self._close()
+
+    def _close(self):
+        if self.batcher is not None:
+            self.batcher.stop()
+        print(f"♻️ Model v{self.version} retired.")
+
+    def info(self):
+        return {
+            'version': self.version, 'checksum': self.checksum,
+            'loaded_at': self.loaded_at, 'fast_scaler': isinstance(self.scaler, FastScaler),
+            'size_mb': round(self.size_bytes / (1024 * 1024), 2),
+            **self.inference.info()
+        }
+
+
+class ModelRegistry:
+    """
+    load(): สร้าง Bundle ใหม่ทั้งชุดแยกจากของเดิม -> Validate + Warmup -> สลับ Reference เดียวแบบ Atomic
+    ถ้า Bundle ใหม่ใช้ไม่ได้ ของเดิมยังให้บริการต่อ
+    """
+
+    def __init__(self, name=None):
+        self.name = name  # ชื่อ Route (ใช้ใน Log เมื่อมีหลาย Registry)
+        self._current = None
+        self._version = 0
+        self._lock = threading.Lock()       # ป้องกันการสลับ/หยิบ Bundle พร้อมกัน
+        self._load_lock = threading.Lock()  # โหลดทีละชุด
+
+    @property
+    def current(self):
+        return self._current
+
+    @contextlib.contextmanager
+    def use(self):
+        """with registry.use() as bundle: ... (bundle = None ถ้ายังไม่มีโมเดล)"""
+        with self._lock:
+            bundle = self._current
+            if bundle is not None:
+                bundle._acquire()
+        try:
+            yield bundle
+        finally:
+            if bundle is not None:
+                bundle._release()
+
+    def load(self, model_source, scaler_source, seq_len, n_features, backend='tf_function',
+             parity_atol=1e-4, batch_window_ms=None, max_batch=16, fast_scaler=True, feature_names=None):
+        """
+        model_source / scaler_source: Path หรือ Bytes ของ model.h5 / scaler.pkl
+        feature_names = ลำดับ Column ที่ Model ได้รับ (ถ้า Scaler ถูก Fit จาก DataFrame ต้องตรงกับ feature_names_in_)
+        batch_window_ms = None -> ไม่ใช้ Micro-Batching
+        fast_scaler = True -> ใช้ FastScaler (float32 In-place) ถ้า Scaler รองรับและผ่าน Parity Check
+        Raise ValueError ถ้า Validate ไม่ผ่าน (Bundle เดิมไม่ถูกแตะ)
+        """
+        with self._load_lock:
+            model_bytes = _read_bytes(model_source)
+            scaler = pickle.loads(_read_bytes(scaler_source))
+
+            n_scaler = getattr(scaler, 'n_features_in_', n_features)
+            if n_scaler != n_features:
+                raise ValueError(f"Scaler expects {n_scaler} features, config has {n_features}.")
+            scaler_columns = getattr(scaler, 'feature_names_in_', None)
+            if feature_names is not None and scaler_columns is not None and list(scaler_columns) != list(feature_names):
+                raise ValueError(f"Scaler was fit on {list(scaler_columns)}, features are {list(feature_names)}.")
+            if fast_scaler:
+                try:
+                    scaler = FastScaler(scaler)
+                    print(f"✅ Fast scaler ready (parity max diff {scaler.parity_max_diff:.2e})")
+                except ValueError as e:
+                    print(f"⚠️ Fast scaler disabled, using sklearn transform: {e}")
+
+            keras_model = load_model(h5py.File(io.BytesIO(model_bytes), 'r'))
+            if tuple(keras_model.input_shape[1:]) != (seq_len, n_features):
+                raise ValueError(f"Model input shape {keras_model.input_shape} != (None, {seq_len}, {n_features}).")
+
+            # Compile + Parity Check + Warmup
+            inference = InferenceBackend(keras_model, seq_len, n_features, backend=backend, parity_atol=parity_atol)
+
+            # Smoke Test ทั้ง Pipeline (Scaler -> Model)
+            probe = scaler.transform(np.zeros((seq_len, n_features)))
+            probs = inference.predict(probe[None, ...])[0]
+            if not np.all(np.isfinite(probs)) or abs(float(np.sum(probs)) - 1.0) > 1e-3:
+                raise ValueError(f"Model smoke test failed: {probs}")
+
+            batcher = None
+            if batch_window_ms is not None:
+                batcher = MicroBatcher(inference, window_ms=batch_window_ms, max_batch=max_batch)
+
+            with self._lock:
+                self._version += 1
+                bundle = ModelBundle(
+                    self._version, keras_model, inference, scaler, batcher=batcher,
+                    checksum=hashlib.sha1(model_bytes).hexdigest()[:10],
+                    size_bytes=keras_model.count_params() * 4
+                )
+                old, self._current = self._current, bundle
+
+            label = f"{self.name} " if self.name else ''
+            print(f"✅ Model {label}v{bundle.version} ({bundle.checksum}) is live.")
+            if old is not None:
+                old._retire()
+            return bundle
+
+    def unload(self):
+        """ถอด Bundle ปัจจุบันออก (Request ที่ถืออยู่ใช้ต่อจนจบ แล้ว Bundle ถูก Retire)"""
+        with self._lock:
+            old, self._current = self._current, None
+        if old is not None:
+            old._retire()
+
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+# ==============================================================================
+# PART 4: MODEL ROUTER (หลาย Symbol / หลาย Model Version ใน Process เดียว)
+# ==============================================================================
+# Routing Table: (symbol, model) -> ModelRoute (ไฟล์ Model/Scaler, Feature ที่ใช้, Seq Length, Threshold, Filter)
+# แต่ละ Route มี ModelRegistry ของตัวเอง (Hot Swap แยกกัน) และถูกโหลดใน Background เมื่อมี Request ครั้งแรก
+# จำนวน Route ที่โหลดอยู่เกิน max_models หรือขนาดรวมเกิน max_mb -> Unload Route ที่ไม่ได้ใช้นานที่สุด (LRU)
+# (Route ที่ pinned เช่น Default ไม่ถูก Router โหลด/Unload เอง, Request ที่ถือ Bundle อยู่ใช้ต่อได้จนจบ)
+
+class ModelRoute:
+    """1 รายการใน Routing Table"""
+
+    FIELDS = ('model_path', 'scaler_path', 'features', 'seq_len', 'threshold', 'min_atr', 'filters')
+
+    def __init__(self, symbol, model, model_path, scaler_path, features, seq_len=50,
+                 threshold=0.55, min_atr=1.0, filters=DEFAULT_FILTERS, pinned=False):
+        if not features:
+            raise ValueError(f"Route {symbol}/{model}: features must not be empty.")
+        self.symbol = symbol
+        self.model = model
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.features = list(features)
+        self.seq_len = int(seq_len)
+        self.threshold = float(threshold)
+        self.min_atr = float(min_atr)
+        self.filters = tuple(filters)
+        self.pipeline = build_pipeline(self.filters)  # Filter หลัง Model (ดู linux_filters)
+        self.pinned = pinned
+
+    @property
+    def key(self):
+        return (self.symbol, self.model)
+
+    @property
+    def name(self):
+        return f"{self.symbol}/{self.model}"
+
+    def info(self):
+        return {
+            'symbol': self.symbol, 'model': self.model, 'model_path': self.model_path,
+            'n_features': len(self.features), 'seq_len': self.seq_len, 'threshold': self.threshold,
+            'min_atr': self.min_atr, 'filters': list(self.filters), 'pinned': self.pinned
+        }
+
+
+def load_routes(path, base_route):
+    """
+    routes.json: [{"symbol": "EURUSD", "model": "default", "model_path": "...", "scaler_path": "...", ...}, ...]
+    ต้องระบุ symbol / model_path / scaler_path, Field อื่นที่ไม่ระบุใช้ค่าของ base_route (Default Route)
+    ไม่มีไฟล์ -> [] (มีแค่ Default Route)
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        entries = json.load(f)
+
+    routes = []
+    for entry in entries:
+        unknown = set(entry) - set(ModelRoute.FIELDS) - {'symbol', 'model'}
+        if unknown:
+            raise ValueError(f"{path}: unknown route fields {sorted(unknown)}")
+        missing = {'symbol', 'model_path', 'scaler_path'} - set(entry)
+        if missing:
+            raise ValueError(f"{path}: route {entry} is missing {sorted(missing)}")
+        params = {field: getattr(base_route, field) for field in ModelRoute.FIELDS}
+        params.update(entry)
+        params.setdefault('model', 'default')
+        route = ModelRoute(**params)
+        if route.key == base_route.key:
+            raise ValueError(f"{path}: route {route.name} would replace the built-in default route.")
+        routes.append(route)
+    return routes
+
+
+class ModelRouter:
+    """
+    resolve(symbol, model) -> ModelRoute, use(route) -> Bundle ของ Route นั้น
+    load_kwargs = Argument ของ ModelRegistry.load (backend, parity_atol, batch_window_ms, ...)
+    """
+
+    def __init__(self, load_kwargs=None, max_models=4, max_mb=1024, retry_seconds=60.0):
+        self.load_kwargs = dict(load_kwargs or {})
+        self.max_models = max_models
+        self.max_bytes = max_mb * 1024 * 1024
+        self.retry_seconds = retry_seconds
+        self.routes = {}
+        self.default_key = None       # Route แรกที่เพิ่ม (ใช้กับ Symbol ที่ไม่มีใน Routing Table)
+        self._symbol_defaults = {}    # symbol -> key ของ Route 'default' (หรือ Route แรก) ของ Symbol นั้น
+        self._registries = OrderedDict()  # key -> ModelRegistry (ใช้ล่าสุดอยู่ท้าย)
+        self._load_locks = {}
+        self._failed = {}             # key -> (เวลาที่ล้มเหลว, Error)
+        self._lock = threading.Lock()
+
+    def add(self, route, registry=None):
+        """registry = Registry ที่โหลดจากภายนอกอยู่แล้ว (เช่น Default ผ่าน load_assets)"""
+        self.routes[route.key] = route
+        self._load_locks[route.key] = threading.Lock()
+        if self.default_key is None:
+            self.default_key = route.key
+        if route.symbol not in self._symbol_defaults or route.model == 'default':
+            self._symbol_defaults[route.symbol] = route.key
+        if registry is not None:
+            with self._lock:
+                self._registries[route.key] = registry
+
+    def resolve(self, symbol, model=None):
+        """
+        model ระบุมา -> ต้องมี (symbol, model) ใน Routing Table ไม่งั้น Raise KeyError
+        ไม่ระบุ -> Route 'default' ของ Symbol นั้น -> Default Route ของ Process (พฤติกรรมเดิมแบบ Model เดียว)
+        """
+        if model:
+            route = self.routes.get((symbol, model))
+            if route is None:
+                raise KeyError(f"No model route '{model}' for {symbol}.")
+            return route
+        return self.routes[self._symbol_defaults.get(symbol, self.default_key)]
+
+    @contextlib.contextmanager
+    def use(self, route, wait=False):
+        """
+        with router.use(route) as bundle: ...
+        bundle = None ถ้ายังโหลดไม่เสร็จ (wait=False: เริ่มโหลดใน Background แล้วคืนทันที)
+        """
+        with self._lock:
+            registry = self._registries.get(route.key)
+            if registry is not None:
+                self._registries.move_to_end(route.key)
+
+        if (registry is None or registry.current is None) and not route.pinned:
+            if wait:
+                registry = self._load(route)
+            else:
+                self._load_async(route)
+                registry = None
+
+        if registry is None:
+            yield None
+            return
+        with registry.use() as bundle:
+            yield bundle
+
+    def loading(self, route):
+        return self._load_locks[route.key].locked()
+
+    def error(self, route):
+        """Error ของการโหลดครั้งล่าสุด (None ถ้าไม่เคยล้มเหลว / โหลดสำเร็จแล้ว)"""
+        failed = self._failed.get(route.key)
+        return failed[1] if failed is not None else None
+
+    def _load_async(self, route):
+        if self.loading(route):
+            return
+        failed = self._failed.get(route.key)
+        if failed is not None and time.monotonic() - failed[0] < self.retry_seconds:
+            return
+        threading.Thread(target=self._load, args=(route,), name=f"route-load-{route.name}", daemon=True).start()
+
+    def _load(self, route):
+        with self._load_locks[route.key]:
+            with self._lock:
+                registry = self._registries.get(route.key)
+            if registry is not None and registry.current is not None:
+                return registry
+
+            print(f"--- Loading model route {route.name} ({route.model_path}) ---")
+            registry = ModelRegistry(name=route.name)
+            try:
+                # Scaler ถูก Unpickle ที่นี่ (Worker / Background Thread) ไม่ใช่ตอนอ่าน routes.json ใน gunicorn Master
+                registry.load(route.model_path, route.scaler_path, route.seq_len, len(route.features),
+                              feature_names=route.features, **self.load_kwargs)
+            except Exception as e:
+                print(f"❌ Model route {route.name} could not be loaded: {e}")
+                self._failed[route.key] = (time.monotonic(), str(e))
+                return None
+            self._failed.pop(route.key, None)
+
+            with self._lock:
+                self._registries[route.key] = registry
+                self._registries.move_to_end(route.key)
+            self._evict(keep=route.key)
+            return registry
+
+    def _evict(self, keep=None):
+        """Unload Route ที่ใช้ล่าสุดนานที่สุด (ไม่รวม pinned / keep) จนจำนวนและขนาดรวมอยู่ในงบ"""
+        evicted = []
+        with self._lock:
+            while True:
+                loaded = [(key, reg) for key, reg in self._registries.items() if reg.current is not None]
+                total = sum(reg.current.size_bytes for _, reg in loaded)
+                if len(loaded) <= self.max_models and total <= self.max_bytes:
+                    break
+                victim = next((key for key, _ in loaded if key != keep and not self.routes[key].pinned), None)
+                if victim is None:
+                    break
+                evicted.append((victim, self._registries.pop(victim)))
+
+        for key, registry in evicted:
+            print(f"♻️ Model route {self.routes[key].name} unloaded (LRU).")
+            registry.unload()
+
+    def unload(self, symbol, model):
+        """Unload Route ทันที (โหลดใหม่อัตโนมัติเมื่อมี Request)"""
+        key = (symbol, model)
+        if key in self.routes and self.routes[key].pinned:
+            raise ValueError(f"Route {symbol}/{model} is pinned.")
+        with self._lock:
+            registry = self._registries.pop(key, None)
+        if registry is not None:
+            registry.unload()
+        return registry is not None
+
+    def info(self):
+        """สำหรับ /status: ทุก Route + สถานะการโหลด (เรียงจากใช้ล่าสุดนานที่สุด -> ล่าสุด)"""
+        with self._lock:
+            registries = dict(self._registries)
+            order = list(self._registries)
+        routes = []
+        for key in order + [key for key in self.routes if key not in registries]:
+            route = self.routes[key]
+            bundle = registries[key].current if key in registries else None
+            entry = {'name': route.name, **route.info(), 'loaded': bundle is not None, 'loading': self.loading(route)}
+            if bundle is not None:
+                entry.update({'version': bundle.version, 'checksum': bundle.checksum, 'size_mb': bundle.info()['size_mb']})
+            if key in self._failed:
+                entry['error'] = self._failed[key][1]
+            routes.append(entry)
+        loaded_bytes = sum(reg.current.size_bytes for reg in registries.values() if reg.current is not None)
+        return {
+            'routes': routes, 'max_models': self.max_models,
+            'loaded_mb': round(loaded_bytes / (1024 * 1024), 2), 'max_mb': round(self.max_bytes / (1024 * 1024), 2)
+        }
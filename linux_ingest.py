@@ -0,0 +1,536 @@
+import os
+import re
+import json
+import fcntl
+import struct
+import contextlib
+import warnings
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from linux_model import StreamingFeatureEngine
+
+# ==============================================================================
+# PART 1: BAR RING BUFFER (Server-side History ต่อ Symbol)
+# ==============================================================================
+
+BAR_FIELDS = ('time', 'open', 'high', 'low', 'close', 'tick_volume')
+_FIELD_DTYPES = {'time': np.int64, 'tick_volume': np.float64}
+
+
+class ResyncRequired(Exception):
+    """Delta ต่อจาก History ฝั่ง Server ไม่ได้ (Gap / แท่งเก่าถูกแก้ / Session หาย) -> EA ต้องส่ง Full Snapshot ใหม่"""
+
+
+def sort_columns(columns):
+    """เรียง Column Arrays ตามเวลา (คืนตามเดิมถ้าเรียงอยู่แล้ว)"""
+    times = columns['time']
+    if len(times) < 2 or np.all(np.diff(times) > 0):
+        return columns
+    order = np.argsort(times, kind='stable')
+    return {field: np.asarray(values)[order] for field, values in columns.items()}
+
+
+def bars_to_columns(bars):
+    """แปลง List ของ Bar dict (จาก JSON ของ EA) เป็น Column Arrays (ถ้าเป็น Column อยู่แล้วคืนตามเดิม)"""
+    if isinstance(bars, dict):
+        return bars
+    columns = {}
+    for field in BAR_FIELDS:
+        dtype = _FIELD_DTYPES.get(field, np.float64)
+        columns[field] = np.array([bar[field] for bar in bars], dtype=dtype)
+    return columns
+
+
+class BarRingBuffer:
+    """
+    เก็บแท่งล่าสุดไม่เกิน capacity แท่งเป็น Column Arrays ต่อเนื่องในหน่วยความจำ
+    (Buffer ขนาด 2x capacity -> append เป็น O(1) และ view() ไม่ต้อง copy)
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._data = {
+            field: np.empty(capacity * 2, dtype=_FIELD_DTYPES.get(field, np.float64))
+            for field in BAR_FIELDS
+        }
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_time(self):
+        if self._end == self._start:
+            return None
+        return int(self._data['time'][self._end - 1])
+
+    def view(self, field):
+        return self._data[field][self._start:self._end]
+
+    def _append(self, columns, i):
+        if self._end == len(self._data['time']):
+            # Buffer เต็ม -> ย้ายแท่งล่าสุด (capacity - 1 แท่ง) กลับไปต้น Buffer
+            keep = self.capacity - 1
+            for arr in self._data.values():
+                arr[:keep] = arr[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        for field in BAR_FIELDS:
+            self._data[field][self._end] = columns[field][i]
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def _overwrite_last(self, columns, i):
+        for field in BAR_FIELDS:
+            self._data[field][self._end - 1] = columns[field][i]
+
+    def load(self, columns):
+        """Full Snapshot: ล้าง Buffer แล้วใส่ใหม่ทั้งหมด"""
+        times = columns['time']
+        if len(times) > 1 and np.any(np.diff(times) <= 0):
+            raise ValueError("Snapshot bars are not sorted by time.")
+        n = min(len(times), self.capacity)
+        for field in BAR_FIELDS:
+            self._data[field][:n] = columns[field][len(times) - n:]
+        self._start, self._end = 0, n
+
+    def apply_delta(self, columns):
+        """
+        Delta: แท่งที่ time >= แท่งล่าสุดที่ Ack ไปแล้ว
+        - แท่งล่าสุดเดิม (Forming) ถูกแทนที่ได้
+        - แท่งที่เก่ากว่านั้นต้องตรงกับที่เก็บไว้ทุกค่า ไม่งั้นถือว่ามีการแก้ย้อนหลัง
+        คืนค่าจำนวนแท่งใหม่ที่เพิ่มเข้ามา
+        """
+        times = columns['time']
+        if len(times) == 0:
+            return 0
+        if len(times) > 1 and np.any(np.diff(times) <= 0):
+            raise ResyncRequired("Delta bars are not sorted by time.")
+
+        last_time = self.last_time
+        if last_time is None:
+            raise ResyncRequired("No snapshot on server.")
+        if times[0] > last_time:
+            raise ResyncRequired(f"Gap: first delta bar {int(times[0])} > last acknowledged bar {last_time}.")
+
+        # แท่งที่เก่ากว่าแท่งล่าสุด -> ต้องตรงกับของเดิม
+        n_old = int(np.searchsorted(times, last_time, side='left'))
+        if n_old:
+            stored_times = self.view('time')
+            pos = np.searchsorted(stored_times, times[:n_old])
+            if np.any(pos >= len(stored_times)) or np.any(stored_times[np.minimum(pos, len(stored_times) - 1)] != times[:n_old]):
+                raise ResyncRequired("Delta contains bars unknown to the server.")
+            for field in BAR_FIELDS[1:]:
+                if not np.array_equal(self.view(field)[pos], columns[field][:n_old]):
+                    raise ResyncRequired(f"Revised history detected in '{field}'.")
+
+        added = 0
+        for i in range(n_old, len(times)):
+            if times[i] == last_time:
+                self._overwrite_last(columns, i)
+            else:
+                self._append(columns, i)
+                added += 1
+        return added
+
+    def to_frame(self):
+        """DataFrame แบบเดียวกับที่ preprocess_and_predict สร้างจาก JSON (index = time)"""
+        df = pd.DataFrame({field: self.view(field).copy() for field in BAR_FIELDS[1:]})
+        df.index = pd.to_datetime(self.view('time'), unit='s')
+        df.index.name = 'time'
+        return df
+
+
+# ==============================================================================
+# PART 2: INGESTION SESSIONS (Full Snapshot ครั้งแรก แล้วส่งเฉพาะ Delta)
+# ==============================================================================
+
+class BarSession:
+    """
+    History ของ 1 Terminal/Symbol: Ring Buffer ของ M5 + USD และ Feature Engine ของมันเอง
+    path = ไฟล์ของ Session ที่ใช้ร่วมกันทุก Worker (None = อยู่ใน Process นี้เท่านั้น)
+    -> load_snapshot / apply_delta ทำภายใต้ flock: โหลด Generation ล่าสุดจากไฟล์ -> แก้ -> บันทึกกลับ
+    (Feature Engine ยังเป็นของแต่ละ Worker: ต่อจากแท่งที่ Worker อื่นเพิ่มไว้ได้ด้วย extend_arrays)
+    """
+
+    def __init__(self, symbol, capacity=1000, max_rows=200, session_id=None, path=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.symbol = symbol
+        self.m5 = BarRingBuffer(capacity)
+        self.usd = BarRingBuffer(capacity)
+        self.max_rows = max_rows
+        self.engine = None
+        self.last_seen = time.time()
+        self.lock = threading.Lock()
+        self.path = path
+        self.generation = 0  # Generation ของไฟล์ที่ Buffer ใน Process นี้ตรงกับ (-1 = ต้องโหลดใหม่)
+
+    @property
+    def has_usd(self):
+        return len(self.usd) > 0
+
+    @contextlib.contextmanager
+    def _shared(self, reload=True):
+        """Shared Session: ถือ flock ของ Session ระหว่าง โหลด -> แก้ -> บันทึก (ไม่บันทึกถ้าแก้ไม่สำเร็จ)"""
+        if self.path is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if reload:
+                self.refresh()
+            try:
+                yield
+            except BaseException:
+                self.generation = -1  # Buffer อาจถูกแก้ไปครึ่งทาง -> ครั้งหน้าโหลดจากไฟล์ใหม่
+                raise
+            self.save()
+
+    # ไฟล์ Session: Header JSON (symbol / generation / จำนวนแท่ง) ยาว _SESSION_HEADER Bytes
+    # แล้วตามด้วย float64 (6, n_m5) + (6, n_usd) ตามลำดับ BAR_FIELDS (time เก็บเป็น float64 ได้ตรงทุกค่า)
+    _SESSION_HEADER = 256
+
+    def save(self):
+        """บันทึก Ring Buffers ลงไฟล์ของ Session (เขียนไฟล์ชั่วคราวแล้ว rename -> Worker อื่นไม่เห็นไฟล์ครึ่ง ๆ)"""
+        header = json.dumps({
+            'symbol': self.symbol, 'generation': self.generation + 1, 'm5': len(self.m5), 'usd': len(self.usd)
+        }).encode().ljust(self._SESSION_HEADER)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for buffer in (self.m5, self.usd):
+                f.write(np.stack([buffer.view(field).astype(np.float64) for field in BAR_FIELDS]).tobytes())
+        os.replace(tmp_path, self.path)
+        self.generation += 1
+
+    def refresh(self):
+        """โหลด Ring Buffers จากไฟล์ ถ้า Worker อื่นแก้ Session นี้หลังจากครั้งล่าสุดที่ Process นี้เห็น"""
+        try:
+            with open(self.path, 'rb') as f:
+                meta = json.loads(f.read(self._SESSION_HEADER))
+                if meta['generation'] == self.generation:
+                    return False
+                values = np.frombuffer(f.read(), dtype=np.float64)
+        except FileNotFoundError:
+            raise ResyncRequired(f"Unknown or expired session '{self.session_id}'.")
+        n_m5, n_usd = meta['m5'], meta['usd']
+        if len(values) != len(BAR_FIELDS) * (n_m5 + n_usd):
+            raise ResyncRequired(f"Session '{self.session_id}' file is corrupt.")
+        for buffer, block in ((self.m5, values[:6 * n_m5].reshape(6, n_m5)), (self.usd, values[6 * n_m5:].reshape(6, n_usd))):
+            buffer.load({field: block[i].astype(_FIELD_DTYPES.get(field, np.float64)) for i, field in enumerate(BAR_FIELDS)})
+        self.symbol = meta['symbol']
+        if self.generation <= 0:
+            self.engine = None  # (ไม่รู้ว่า Engine เดิมตรงกับ History ชุดไหน -> Seed ใหม่)
+        self.generation = meta['generation']
+        return True
+
+    def load_snapshot(self, m5_columns, usd_columns):
+        if len(m5_columns['time']) == 0:
+            raise ValueError("Empty XAUUSD data")
+        # GetRatesJSON ของ EA ส่งแท่งใหม่สุดก่อน -> เรียงตามเวลาก่อนเข้า Buffer
+        m5_columns, usd_columns = sort_columns(m5_columns), sort_columns(usd_columns)
+        with self._shared(reload=False):
+            self.m5.load(m5_columns)
+            self.usd.load(usd_columns)
+            self.engine = None
+
+    def apply_delta(self, m5_columns, usd_columns):
+        with self._shared():
+            self.m5.apply_delta(m5_columns)
+            if len(usd_columns['time']):
+                if not self.has_usd:
+                    # USD เพิ่งมี -> Feature ต้องคำนวณใหม่ทั้งชุด
+                    raise ResyncRequired("USD series appeared mid-session.")
+                self.usd.apply_delta(usd_columns)
+
+    def sync_engine(self):
+        """ป้อนแท่งใหม่ใน Ring Buffer เข้า StreamingFeatureEngine (Seed ครั้งแรก)"""
+        m5 = self.m5
+        args = [m5.view(field) for field in BAR_FIELDS]
+        usd_args = (self.usd.view('time'), self.usd.view('close')) if self.has_usd else (None, None)
+        if self.engine is not None and self.engine.last_time is not None and self.engine.last_time < args[0][0]:
+            self.engine = None  # (Engine ของ Worker นี้ตามหลังเกิน Ring Buffer -> ต่อไม่ได้)
+        if self.engine is None:
+            self.engine = StreamingFeatureEngine.from_arrays(*args, *usd_args, max_rows=self.max_rows)
+        else:
+            self.engine.extend_arrays(*args, *usd_args)
+        return self.engine
+
+    def frames(self):
+        """DataFrames สำหรับ Batch Path (compute_features_lite)"""
+        return self.m5.to_frame(), (self.usd.to_frame() if self.has_usd else None)
+
+
+_SESSION_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class SessionStore:
+    """
+    เก็บ BarSession ตาม session_id (หมดอายุเมื่อไม่ถูกใช้ตาม ttl / เกิน max_sessions)
+    shared_dir = Directory ที่ทุก gunicorn Worker เห็น -> Ring Buffer ของ Session อยู่ในไฟล์ <session_id>.bars
+    Delta ที่ไปตก Worker อื่นจะโหลด Session จากไฟล์แทนการตอบ RESYNC (None = Session อยู่ใน Process นี้เท่านั้น)
+    """
+
+    def __init__(self, ttl_seconds=3600, max_sessions=64, capacity=1000, max_rows=200, shared_dir=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self.shared_dir = shared_dir
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _path(self, session_id):
+        if not self.shared_dir:
+            return None
+        return os.path.join(self.shared_dir, f"{session_id}.bars")
+
+    def _remove_files(self, session_id):
+        for path in (self._path(session_id), self._path(session_id) + '.lock'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def _expire(self, now):
+        expired = [sid for sid, s in self._sessions.items() if now - s.last_seen > self.ttl_seconds]
+        for sid in expired:
+            del self._sessions[sid]
+        while len(self._sessions) >= self.max_sessions:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+            del self._sessions[oldest.session_id]
+        if self.shared_dir:
+            # ไฟล์ของ Session ที่ไม่มี Worker ไหนแก้เกิน ttl (mtime = Delta ล่าสุด)
+            for name in os.listdir(self.shared_dir):
+                sid, ext = os.path.splitext(name)
+                if ext == '.bars' and _SESSION_ID.fullmatch(sid):
+                    with contextlib.suppress(FileNotFoundError):
+                        if now - os.path.getmtime(self._path(sid)) > self.ttl_seconds:
+                            self._remove_files(sid)
+
+    def create(self, symbol, replaces=None):
+        session = BarSession(symbol, capacity=self.capacity, max_rows=self.max_rows)
+        session.path = self._path(session.session_id)
+        with self._lock:
+            if replaces:
+                self._sessions.pop(replaces, None)
+                if self.shared_dir and _SESSION_ID.fullmatch(replaces):
+                    self._remove_files(replaces)
+            self._expire(time.time())
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id, symbol):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None and self.shared_dir and _SESSION_ID.fullmatch(session_id or ''):
+                # Session ที่ Worker อื่นสร้าง -> โหลดจากไฟล์ (ไม่มีไฟล์ = Raise ResyncRequired)
+                session = BarSession(symbol, capacity=self.capacity, max_rows=self.max_rows,
+                                     session_id=session_id, path=self._path(session_id))
+                session.refresh()
+                self._sessions[session_id] = session
+            if session is None or session.symbol != symbol:
+                raise ResyncRequired(f"Unknown or expired session '{session_id}'.")
+            session.last_seen = time.time()
+            return session
+
+
+# ==============================================================================
+# PART 3: FAST PAYLOAD DECODER (JSON ของ EA -> Column Arrays โดยไม่สร้าง dict ต่อแท่ง)
+# ==============================================================================
+# EA เขียน Bar ด้วย StringFormat รูปแบบตายตัว: {"time":%d, "open":%.5f, ..., "real_volume":%d}
+# -> ตัด Array ของ m5_data / usd_m5 ออกมาเป็น Bytes, เช็คว่าทุกแท่งมี Key ชุดเดียวกันเรียงเหมือนกัน
+#    แล้วลบทุกอย่างที่ไม่ใช่ตัวเลข -> np.fromstring (C) -> reshape (n_bars, n_keys)
+# Payload ที่ไม่ตรงรูปแบบ (ค่า null / string / Key สลับที่) -> Fallback เป็น json.loads ปกติ
+
+BAR_ARRAY_KEYS = ('m5_data', 'usd_m5')
+_NUMBER_BYTES = b'0123456789.-+'
+_WHITESPACE = b' \t\r\n'
+_NON_NUMERIC = bytes(c for c in range(256) if c not in set(_NUMBER_BYTES + b','))
+_KEY_PATTERN = re.compile(rb'"([A-Za-z_]+)"\s*:')
+
+
+def empty_columns():
+    return {field: np.empty(0, dtype=_FIELD_DTYPES.get(field, np.float64)) for field in BAR_FIELDS}
+
+
+def bar_count(columns):
+    return len(columns['time']) if columns else 0
+
+
+def _find_array(body, key):
+    """(start, end) ของ Array หลัง "key": ใน body (end ไม่รวม) หรือ None"""
+    pos = body.find(b'"' + key.encode() + b'"')
+    if pos < 0:
+        return None
+    start = body.find(b'[', pos)
+    if start < 0 or body[pos + len(key) + 2:start].strip(_WHITESPACE) != b':':
+        return None
+    end = body.find(b']', start)
+    return (start, end + 1) if end >= 0 else None
+
+
+def _decode_bar_array(array):
+    """Bytes ของ Array แท่ง -> Column Arrays (None ถ้ารูปแบบไม่ตรง ให้ไปใช้ json.loads)"""
+    if array.strip(b'[]' + _WHITESPACE) == b'':
+        return empty_columns()
+
+    first = array[array.find(b'{'):array.find(b'}') + 1]
+    keys = _KEY_PATTERN.findall(first)
+    if not set(field.encode() for field in BAR_FIELDS).issubset(keys):
+        return None
+
+    # โครงสร้าง (ตัดตัวเลข/ช่องว่างออก) ต้องเป็น {"key":,"key":,...} ของ Object แรกซ้ำ n ครั้งพอดี
+    # (ค่าที่มีตัวอักษร เช่น null / string / 1e-05 ทำให้ไม่ตรง -> Fallback)
+    skeleton = array.translate(None, _NUMBER_BYTES + _WHITESPACE)
+    object_skeleton = b'{' + b','.join(b'"' + key + b'":' for key in keys) + b'}'
+    n_bars = skeleton.count(b'{')
+    if skeleton != b'[' + b','.join([object_skeleton] * n_bars) + b']':
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)  # อ่านไม่จบ String -> จำนวนไม่ตรง -> Fallback
+        values = np.fromstring(array.translate(None, _NON_NUMERIC), dtype=np.float64, sep=',')
+    if values.size != n_bars * len(keys):
+        return None
+    keys = [key.decode() for key in keys]
+    values = values.reshape(n_bars, len(keys))
+    return {
+        field: values[:, keys.index(field)].astype(_FIELD_DTYPES.get(field, np.float64))
+        for field in BAR_FIELDS
+    }
+
+
+def decode_bar_payload(body):
+    """
+    body = Bytes ของ Request จาก EA (อาจมี NUL ต่อท้ายจาก MQL5)
+    คืน dict ของ Payload โดย m5_data / usd_m5 เป็น Column Arrays เสมอ (ไม่มี = Array ว่าง)
+    Raise ValueError ถ้า JSON เสีย
+    """
+    body = body.rstrip(b'\x00').strip()
+    arrays = {}
+    for key in BAR_ARRAY_KEYS:
+        span = _find_array(body, key)
+        if span is None:
+            continue
+        columns = _decode_bar_array(body[span[0]:span[1]])
+        if columns is None:
+            arrays = None
+            break
+        arrays[key] = (span, columns)
+
+    if arrays is None:
+        data = json.loads(body.decode('utf-8', errors='ignore'))
+        for key in BAR_ARRAY_KEYS:
+            data[key] = bars_to_columns(data.get(key) or [])
+        return data
+
+    # ส่วนที่เหลือ (symbol / mode / session / Array ว่างอื่น ๆ) เล็กมาก -> json.loads ได้เลย
+    rest, cursor = [], 0
+    for span, _ in sorted(arrays.values(), key=lambda item: item[0]):
+        rest.append(body[cursor:span[0]])
+        rest.append(b'[]')
+        cursor = span[1]
+    rest.append(body[cursor:])
+    data = json.loads(b''.join(rest).decode('utf-8', errors='ignore'))
+    for key in BAR_ARRAY_KEYS:
+        data[key] = arrays[key][1] if key in arrays else bars_to_columns(data.get(key) or [])
+    return data
+
+
+# ==============================================================================
+# PART 4: BINARY WIRE FORMAT (Content-Type: application/x-obot-bars)
+# ==============================================================================
+# Little-endian ทั้งหมด (ต้องตรงกับ GetMultiAssetDataBinary ใน linux_OBot.mq5)
+#   [0:16)  Header: magic 'OBB1' | uint32 meta_len | uint32 n_m5 | uint32 n_usd
+#   [16:..) Meta JSON (symbol / mode / session) ยาว meta_len Bytes แล้วเติม 0 ให้ครบ 8 Bytes
+#   ต่อด้วย Record 48 Bytes ต่อแท่ง: int64 time | float64 open, high, low, close | int64 tick_volume
+#           (M5 n_m5 แท่ง ตามด้วย USD n_usd แท่ง)
+# Server อ่านด้วย np.frombuffer -> Column เป็น View ของ Request Body (ไม่ Parse / ไม่ Copy)
+
+WIRE_CONTENT_TYPE = 'application/x-obot-bars'
+WIRE_MAGIC = b'OBB1'
+WIRE_RECORD = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('tick_volume', '<i8')
+])
+_WIRE_HEADER = struct.Struct('<4sIII')
+
+
+def _wire_columns(records):
+    columns = {field: records[field] for field in BAR_FIELDS}
+    columns['tick_volume'] = columns['tick_volume'].astype(_FIELD_DTYPES['tick_volume'])
+    return columns
+
+
+def decode_wire_payload(body):
+    """Bytes ของ Binary Payload -> dict แบบเดียวกับ decode_bar_payload (Raise ValueError ถ้ารูปแบบผิด)"""
+    if len(body) < _WIRE_HEADER.size:
+        raise ValueError(f"Binary payload too short ({len(body)} bytes).")
+    magic, meta_len, n_m5, n_usd = _WIRE_HEADER.unpack_from(body, 0)
+    if magic != WIRE_MAGIC:
+        raise ValueError(f"Bad binary payload magic {magic!r}.")
+
+    meta_end = _WIRE_HEADER.size + meta_len
+    offset = (meta_end + 7) // 8 * 8
+    expected = offset + (n_m5 + n_usd) * WIRE_RECORD.itemsize
+    if len(body) < expected or body[expected:].strip(b'\x00'):
+        raise ValueError(f"Binary payload size {len(body)} does not match header ({expected} bytes).")
+
+    data = json.loads(body[_WIRE_HEADER.size:meta_end].decode('utf-8')) if meta_len else {}
+    m5 = np.frombuffer(body, dtype=WIRE_RECORD, count=n_m5, offset=offset)
+    usd = np.frombuffer(body, dtype=WIRE_RECORD, count=n_usd, offset=offset + n_m5 * WIRE_RECORD.itemsize)
+    data['m5_data'] = _wire_columns(m5)
+    data['usd_m5'] = _wire_columns(usd)
+    return data
+
+
+def encode_wire_payload(meta, m5_columns, usd_columns=None):
+    """สร้าง Binary Payload จาก Column Arrays (ฝั่ง Python: Benchmark / Client อื่นนอกจาก EA)"""
+    meta_bytes = json.dumps(meta).encode('utf-8')
+    parts = [_WIRE_HEADER.pack(WIRE_MAGIC, len(meta_bytes), bar_count(m5_columns), bar_count(usd_columns)), meta_bytes]
+    parts.append(b'\x00' * (-(_WIRE_HEADER.size + len(meta_bytes)) % 8))
+    for columns in (m5_columns, usd_columns):
+        records = np.zeros(bar_count(columns), dtype=WIRE_RECORD)
+        for field in BAR_FIELDS:
+            if len(records):
+                records[field] = columns[field]
+        parts.append(records.tobytes())
+    return b''.join(parts)
+
+# ==============================================================================
+# PART 5: HISTORY FILES (CSV / Parquet ที่ Export จาก MT5 สำหรับ Backtest / Training)
+# ==============================================================================
+
+def load_bars(path):
+    """CSV/Parquet ของแท่ง M5 (time, open, high, low, close, tick_volume) -> DataFrame index = time"""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df.columns = [str(c).strip().strip('<>').lower() for c in df.columns]
+    if 'tick_volume' not in df.columns:
+        if 'tickvol' in df.columns:
+            df = df.rename(columns={'tickvol': 'tick_volume'})
+        elif 'volume' in df.columns:
+            df = df.rename(columns={'volume': 'tick_volume'})
+
+    missing = {'time', 'open', 'high', 'low', 'close', 'tick_volume'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path}: missing columns {sorted(missing)}")
+
+    if pd.api.types.is_numeric_dtype(df['time']):
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+    else:
+        df['time'] = pd.to_datetime(df['time'])
+    df = df.set_index('time').sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+    return df[['open', 'high', 'low', 'close', 'tick_volume']].astype(float)
@@ -0,0 +1,177 @@
+import os
+import time
+import fcntl
+import contextlib
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================================
+# PART 1: BACKGROUND JOBS (/retrain, /fix, /update_ea ไม่ผูก Request Thread)
+# ==============================================================================
+# Endpoint สร้าง Job แล้วตอบ job_id ทันที -> Worker Thread (ทีละงาน) ทำงานจริง
+# สถานะ/ความคืบหน้าเก็บใน State Store namespace 'jobs' -> ทุก gunicorn Worker ตอบ /jobs/<id> ได้
+# Job ที่ยังไม่จบเก็บ pid + owner (Token ของ Process) + heartbeat -> Process ที่ถือ Job ตาย (Crash / OOM / /restart)
+# หรือ Heartbeat ไม่ขยับเกิน stale_seconds = Job ค้าง -> ถูกเปลี่ยนเป็น FAIL ไม่ Block งานชนิดเดียวกันตลอดไป
+# submit: เช็คงานค้าง + บันทึกงานใหม่ภายใต้ flock ต่อชนิดงาน (lock_path) -> 2 Worker ส่ง /retrain พร้อมกันได้ Job เดียว
+
+JOB_QUEUED = 'QUEUED'
+JOB_RUNNING = 'RUNNING'
+JOB_SUCCESS = 'SUCCESS'
+JOB_FAIL = 'FAIL'
+JOB_DONE = (JOB_SUCCESS, JOB_FAIL)
+
+
+class JobManager:
+    """
+    func ของแต่ละ Job รับ progress(percent, message) และคืน (ok, message)
+    งานรันทีละงาน (Download/Reload Model พร้อมกันหลายงานไม่ปลอดภัย)
+    """
+
+    def __init__(self, state_store, keep=50, heartbeat_seconds=15.0, stale_seconds=120.0, lock_path=None):
+        """lock_path = Path ของ Lock File ต่อชนิดงาน เช่น '/tmp/obot_job_{kind}.lock' (None = Lock แค่ใน Process)"""
+        self.state_store = state_store
+        self.lock_path = lock_path
+        self.keep = keep
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='obot-job')
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._pending = {}        # job_id -> job ของ Process นี้ที่ยังไม่จบ
+        self._owner_pid = None    # Token / Heartbeat Thread ผูกกับ PID (สร้างใหม่หลัง fork)
+        self._owner = None
+        # Startup: Job ที่ค้างจาก Process ก่อนหน้า (RUNNING / QUEUED) -> FAIL
+        self.recover()
+
+    @property
+    def owner(self):
+        """Token ของ Process นี้ (ครั้งแรกหลัง fork: สร้าง Token ใหม่ + เริ่ม Heartbeat Thread)"""
+        if self._owner_pid != os.getpid():
+            self._owner_pid = os.getpid()
+            self._owner = uuid.uuid4().hex[:12]
+            self._pending = {}
+            threading.Thread(target=self._heartbeat_loop, name='obot-job-heartbeat', daemon=True).start()
+        return self._owner
+
+    def _save(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+            self.state_store.update('jobs', **{job['id']: dict(job)})
+
+    def get(self, job_id):
+        return self.state_store.get('jobs').get(job_id)
+
+    def list(self, limit=20):
+        jobs = sorted(self.state_store.get('jobs').values(), key=lambda j: j['created'], reverse=True)
+        return jobs[:limit]
+
+    def is_orphaned(self, job, now=None):
+        """Job ที่ยังไม่จบแต่ไม่มี Process ไหนทำต่อแล้ว (Process ตาย / PID ถูกใช้ซ้ำ / Heartbeat หยุด)"""
+        if job['status'] in JOB_DONE:
+            return False
+        if self._owner_pid == os.getpid() and job.get('owner') == self._owner:
+            return False
+        pid = job.get('pid')
+        if pid is None or pid == os.getpid() or not _pid_alive(pid):
+            return True
+        now = time.time() if now is None else now
+        return now - job.get('heartbeat', job['created']) > self.stale_seconds
+
+    def recover(self):
+        """เปลี่ยน Job ค้างของ Process ที่ตายไปแล้วเป็น FAIL (คืนจำนวน Job ที่ถูกเปลี่ยน)"""
+        orphaned = [job for job in self.state_store.get('jobs').values() if self.is_orphaned(job)]
+        for job in orphaned:
+            print(f"⚠️ Job {job['kind']} ({job['id']}) was left {job['status']} by PID {job.get('pid')}. Marking as failed.")
+            self._save(job, status=JOB_FAIL, finished=time.time(),
+                       message=f"Job was interrupted (PID {job.get('pid')} stopped reporting): {job['message']}")
+        return len(orphaned)
+
+    def active(self, kind):
+        for job in self.state_store.get('jobs').values():
+            if job['kind'] == kind and job['status'] not in JOB_DONE:
+                if self.is_orphaned(job):
+                    self.recover()
+                    continue
+                return job
+        return None
+
+    @contextlib.contextmanager
+    def _kind_lock(self, kind):
+        """Lock ของชนิดงาน: ทุก Thread ใน Process (threading.Lock) + ทุก Process ที่ใช้ lock_path เดียวกัน (flock)"""
+        with self._submit_lock:
+            if self.lock_path is None:
+                yield
+                return
+            with open(self.lock_path.format(kind=kind), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def submit(self, kind, func):
+        """คืน (job, created) - ถ้ามีงานชนิดเดียวกันค้างอยู่จะคืนงานเดิม"""
+        with self._kind_lock(kind):
+            existing = self.active(kind)
+            if existing is not None:
+                return existing, False
+
+            now = time.time()
+            job = {
+                'id': uuid.uuid4().hex[:12], 'kind': kind, 'status': JOB_QUEUED,
+                'progress': 0, 'message': 'Queued.', 'created': now,
+                'started': None, 'finished': None,
+                'pid': os.getpid(), 'owner': self.owner, 'heartbeat': now
+            }
+            self._pending[job['id']] = job
+            self._save(job)
+        self._prune()
+        self._executor.submit(self._run, job, func)
+        return job, True
+
+    def _run(self, job, func):
+        self._save(job, status=JOB_RUNNING, started=time.time(), message='Started.')
+
+        def progress(percent, message):
+            print(f"JOB [{job['kind']} {job['id']}] {percent}% {message}")
+            self._save(job, progress=int(percent), message=message)
+
+        try:
+            ok, message = func(progress)
+        except Exception as e:
+            print(f"❌ Job {job['kind']} ({job['id']}) failed: {e}")
+            traceback.print_exc()
+            ok, message = False, f"Error during {job['kind']}: {e}"
+
+        self._save(job, status=JOB_SUCCESS if ok else JOB_FAIL, progress=100, message=message, finished=time.time())
+        self._pending.pop(job['id'], None)
+
+    def _heartbeat_loop(self):
+        """Heartbeat ของ Job ที่ Process นี้ถืออยู่ (QUEUED / RUNNING) ทุก heartbeat_seconds"""
+        pid = os.getpid()
+        while self._owner_pid == pid:
+            time.sleep(self.heartbeat_seconds)
+            for job in list(self._pending.values()):
+                if job['status'] not in JOB_DONE:
+                    self._save(job, heartbeat=time.time())
+
+    def _prune(self):
+        finished = sorted(
+            (j for j in self.state_store.get('jobs').values() if j['status'] in JOB_DONE),
+            key=lambda j: j['created']
+        )
+        excess = len(finished) - self.keep
+        if excess > 0:
+            self.state_store.delete('jobs', *[j['id'] for j in finished[:excess]])
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # (มี Process อยู่ แต่เป็นของ User อื่น)
+    return True
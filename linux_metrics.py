@@ -0,0 +1,205 @@
+import os
+import time
+import bisect
+import threading
+import contextlib
+
+# ==============================================================================
+# PART 1: PIPELINE METRICS (เวลาแต่ละขั้นของ /predict + Counter ตามสาเหตุ)
+# ==============================================================================
+# Histogram แบบ Bucket คงที่ (บวกรวมข้าม Worker ได้ตรง ๆ) -> p50/p95/p99 ประมาณจาก Bucket แบบ Prometheus
+# แต่ละ gunicorn Worker ส่ง Snapshot ของตัวเองลง State Store (namespace 'metrics', key = PID) ทุก flush_seconds
+# -> /metrics และ /status รวมของทุก Worker ที่ยังมีชีวิตอยู่
+# Flush ทำใน Background Thread ของแต่ละ Worker (observe / inc บน Request Thread ไม่ต้องรอ SQLite Commit)
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _quantile(buckets, counts, q):
+    """ประมาณ Quantile จากจำนวนใน Bucket (Linear Interpolation ภายใน Bucket เหมือน histogram_quantile)"""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count > 0:
+            if i == len(buckets):  # Bucket +Inf -> ตอบขอบบนสุดที่รู้
+                return buckets[-1]
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+class PipelineMetrics:
+    """
+    stage(name)  : with metrics.stage('features'): ... -> จับเวลาลง Histogram ของขั้นนั้น
+    inc(name, label) : Counter เช่น inc('errors', 'resync'), inc('cache_hits', 'result')
+    """
+
+    def __init__(self, state_store=None, namespace='metrics', flush_seconds=5.0, buckets=DEFAULT_BUCKETS):
+        self.state_store = state_store
+        self.namespace = namespace
+        self.flush_seconds = flush_seconds
+        self.buckets = tuple(buckets)
+        self._hist = {}      # stage -> [counts..., +Inf]
+        self._sums = {}      # stage -> วินาทีรวม
+        self._counters = {}  # "name|label" -> int
+        self._lock = threading.Lock()
+        self._flusher_pid = None  # Flush Thread ผูกกับ PID (สร้างใหม่หลัง fork)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def observe(self, name, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._hist.get(name)
+            if counts is None:
+                counts = self._hist[name] = [0] * (len(self.buckets) + 1)
+                self._sums[name] = 0.0
+            counts[i] += 1
+            self._sums[name] += seconds
+        self._ensure_flusher()
+
+    def inc(self, name, label='', n=1):
+        key = f"{name}|{label}"
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+        self._ensure_flusher()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(), 'updated': time.time(),
+                'histograms': {name: {'counts': list(counts), 'sum': self._sums[name]} for name, counts in self._hist.items()},
+                'counters': dict(self._counters)
+            }
+
+    def _ensure_flusher(self):
+        """ครั้งแรกหลัง fork: เริ่ม Flush Thread ของ Process นี้"""
+        if self._flusher_pid == os.getpid() or self.state_store is None:
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='obot-metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.update(self.namespace, **{str(os.getpid()): self.snapshot()})
+        except Exception as e:
+            print(f"METRICS: (WARN) Could not publish snapshot: {e}")
+
+    def merged(self):
+        """รวม Snapshot ของ Worker นี้ (ค่าล่าสุด) กับ Worker อื่นที่ยังมีชีวิตใน State Store"""
+        snapshots = [self.snapshot()]
+        if self.state_store is not None:
+            own_pid = str(os.getpid())
+            dead = []
+            for pid, snap in self.state_store.get(self.namespace).items():
+                if pid == own_pid:
+                    continue
+                if _pid_alive(int(pid)):
+                    snapshots.append(snap)
+                else:
+                    dead.append(pid)
+            if dead:
+                self.state_store.delete(self.namespace, *dead)
+
+        hist, sums, counters = {}, {}, {}
+        for snap in snapshots:
+            for name, h in snap['histograms'].items():
+                counts = hist.setdefault(name, [0] * (len(self.buckets) + 1))
+                for i, count in enumerate(h['counts']):
+                    counts[i] += count
+                sums[name] = sums.get(name, 0.0) + h['sum']
+            for key, value in snap['counters'].items():
+                counters[key] = counters.get(key, 0) + value
+        return hist, sums, counters, len(snapshots)
+
+    # --- Output ---
+
+    def summary(self):
+        """สรุปสำหรับ /status: เวลาแต่ละขั้น (ms) + Counter + Cache Hit Rate"""
+        hist, sums, counters, workers = self.merged()
+        stages = {}
+        for name, counts in hist.items():
+            total = sum(counts)
+            stage = {'count': total, 'mean_ms': round(sums[name] / total * 1000, 3) if total else None}
+            for q in (0.5, 0.95, 0.99):
+                value = _quantile(self.buckets, counts, q)
+                stage[f"p{int(q * 100)}_ms"] = round(value * 1000, 3) if value is not None else None
+            stages[name] = stage
+
+        grouped = {}
+        for key, value in counters.items():
+            name, label = key.split('|', 1)
+            grouped.setdefault(name, {})[label or 'total'] = value
+
+        hit_rates = {}
+        for cache, hits in grouped.get('cache_hits', {}).items():
+            misses = grouped.get('cache_misses', {}).get(cache, 0)
+            hit_rates[cache] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+        return {'workers': workers, 'stages': stages, 'counters': grouped, 'cache_hit_rate': hit_rates}
+
+    def render_prometheus(self, prefix='obot'):
+        """Prometheus Text Exposition Format (version 0.0.4)"""
+        hist, sums, counters, workers = self.merged()
+        lines = [
+            f"# HELP {prefix}_workers Worker processes included in these metrics.",
+            f"# TYPE {prefix}_workers gauge",
+            f"{prefix}_workers {workers}",
+            f"# HELP {prefix}_stage_seconds Latency of each /predict pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name in sorted(hist):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), hist[name]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {sums[name]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {cumulative}')
+
+        label_names = {'requests': 'outcome', 'errors': 'cause', 'cache_hits': 'cache', 'cache_misses': 'cache', 'routes': 'route'}
+        by_name = {}
+        for key, value in counters.items():
+            name, label = key.split('|', 1)
+            by_name.setdefault(name, []).append((label, value))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            label_name = label_names.get(name, 'label')
+            for label, value in sorted(by_name[name]):
+                labels = f'{{{label_name}="{label}"}}' if label else ''
+                lines.append(f"{prefix}_{name}_total{labels} {value}")
+        return '\n'.join(lines) + '\n'
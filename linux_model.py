@@ -1,7 +1,10 @@
+import math
+from collections import deque
+from fractions import Fraction
+
 import pandas as pd
 import numpy as np
 import talib
-from sklearn.preprocessing import RobustScaler
 
 # ==============================================================================
 # CONFIG: Feature List
@@ -16,14 +19,83 @@ REQUIRED_FEATURES = [
     'usd_ret_5', 'usd_corr'
 ]
 
+# เปลี่ยนเมื่อสูตร/ลำดับ Feature เปลี่ยน (ใช้เป็นส่วนหนึ่งของ Cache Key)
+FEATURE_SET_VERSION = 'v7.1-18'
+
+# Indicator ที่ Filter หลัง Model ใช้ (ไม่ใช่ Input ของ Model) -> คำนวณพร้อม Feature ครั้งเดียว (ดู linux_filters)
+INDICATOR_COLUMNS = ['close', 'ema200']
+
 # ==============================================================================
 # PART 1: FEATURE ENGINEERING
 # ==============================================================================
 
-def compute_features_lite(df_m5, df_usd=None):
+def _time_buckets(times, seconds):
+    """
+    Unix วินาที (เรียงแล้ว) -> Bucket ละ seconds วินาที ด้วยเลขจำนวนเต็ม (แทน df.resample)
+    คืน (key ของทุกแถว, แถวแรกของแต่ละ Bucket, key ของแต่ละ Bucket)
+    """
+    keys = times // seconds
+    starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1))
+    return keys, starts, keys[starts]
+
+
+def _bucket_last(values, starts):
+    """ค่าสุดท้ายที่ไม่ใช่ NaN ของแต่ละ Bucket (= resample().last())"""
+    rows = np.where(np.isnan(values), -1, np.arange(len(values)))
+    last = np.maximum.reduceat(rows, starts) if len(starts) else rows[:0]
+    return np.where(last >= 0, values[np.maximum(last, 0)], np.nan)
+
+
+def _ffill_map(bucket_keys, bucket_values, keys):
+    """ค่าของ Bucket ล่าสุดที่ key <= key ของแต่ละแถว (= reindex(method='ffill')), ไม่มี -> NaN"""
+    pos = np.searchsorted(bucket_keys, keys, side='right') - 1
+    out = bucket_values[np.maximum(pos, 0)] if len(bucket_values) else np.full(len(keys), np.nan)
+    out[pos < 0] = np.nan
+    return out
+
+
+def resample_context(index, high_p, low_p, close_p):
+    """
+    H1 EMA50 + Daily Pivots แบบ Array (ผลตรงกับ df.resample('1H') / df.resample('D').shift(1) + reindex ffill เดิมทุก bit)
+    - H1: close สุดท้ายของแต่ละชั่วโมงที่มีแท่ง -> EMA50 -> แท่ง M5 ได้ค่าของชั่วโมงตัวเอง
+    - Day: shift(1) บน Grid รายวันที่ต่อเนื่อง + dropna + ffill
+      = High/Low/Close ของ "วันล่าสุดที่มีข้อมูลครบ ก่อนวันของแท่งนั้น" (วันจันทร์ได้ของวันศุกร์)
+    คืน (ema50_h1, pivot, r1, s1) เป็น Array ยาวเท่า index
+    """
+    times = np.asarray(index).astype('datetime64[s]').astype(np.int64)  # (DatetimeIndex หรือ Unix วินาที)
+    hour_keys, starts, h1_keys = _time_buckets(times, 3600)
+    h1_close = _bucket_last(close_p, starts)
+    valid = ~np.isnan(h1_close)
+    h1_ema = talib.EMA(h1_close[valid], timeperiod=50)
+    ema50_h1 = _ffill_map(h1_keys[valid], h1_ema, hour_keys)
+
+    day_keys, starts, d_keys = _time_buckets(times, 86400)
+    if len(starts):
+        d_high = np.fmax.reduceat(high_p, starts)  # (fmax/fmin ข้าม NaN เหมือน resample max/min)
+        d_low = np.fmin.reduceat(low_p, starts)
+    else:
+        d_high = d_low = np.empty(0)
+    d_close = _bucket_last(close_p, starts)
+    valid = ~(np.isnan(d_high) | np.isnan(d_low) | np.isnan(d_close))
+    d_keys, d_high, d_low, d_close = d_keys[valid], d_high[valid], d_low[valid], d_close[valid]
+
+    d_pivot = (d_high + d_low + d_close) / 3
+    d_r1 = (2 * d_pivot) - d_low
+    d_s1 = (2 * d_pivot) - d_high
+    prev_day = day_keys - 1
+    return (
+        ema50_h1,
+        _ffill_map(d_keys, d_pivot, prev_day),
+        _ffill_map(d_keys, d_r1, prev_day),
+        _ffill_map(d_keys, d_s1, prev_day),
+    )
+
+
+def compute_features_lite(df_m5, df_usd=None, indicators=False):
     """
     สร้าง 18 Features สำหรับ Lite Model (M5 Scalping)
     รองรับ Intermarket Analysis (USD)
+    indicators=True -> เพิ่ม Column ของ INDICATOR_COLUMNS ต่อท้าย (NaN ได้ ไม่ถูก dropna)
     """
     # 1. Prepare Data
     df = df_m5.sort_index().copy()
@@ -48,15 +120,13 @@ def compute_features_lite(df_m5, df_usd=None):
     # EMA 50 Dist (Trend M5)
     ema50 = talib.EMA(close_p, timeperiod=50)
     df['dist_ema50'] = (close_p - ema50) / close_p
+    if indicators:
+        df['ema200'] = talib.EMA(close_p, timeperiod=200)  # (EMA200 Trend Filter)
     
-    # H1 Trend Context (สร้าง H1 จาก M5)
-    # Resample 1H เพื่อดูเทรนด์ใหญ่
-    df_h1 = df.resample('1H').agg({'close': 'last'}).dropna()
-    df_h1['ema50_h1'] = talib.EMA(df_h1['close'].astype(float).values, timeperiod=50)
-    
-    # Map H1 EMA กลับมาใส่ M5 (ffill = ใช้ค่าล่าสุดที่มีอยู่)
-    df['ema50_h1'] = df_h1['ema50_h1'].reindex(df.index, method='ffill')
-    df['dist_h1_ema'] = (df['close'] - df['ema50_h1']) / df['close']
+    # H1 Trend Context + Daily Pivots (สร้าง H1 / Day จาก M5)
+    # Bucket ตามชั่วโมง/วันด้วย Array แล้ว Map กลับมาที่ M5 (แทน resample + reindex ffill 5 รอบ, ดู resample_context)
+    ema50_h1, pivot, r1, s1 = resample_context(df.index, high_p, low_p, close_p)
+    df['dist_h1_ema'] = (close_p - ema50_h1) / close_p
     
     # --- 2. Candle Psychology (Price Action) ---
     candle_range = (high_p - low_p) + 1e-9
@@ -73,25 +143,11 @@ def compute_features_lite(df_m5, df_usd=None):
     df['vol_force'] = (volume * np.sign(close_p - open_p)) / vol_sma
 
     # --- 4. Daily Pivots (Support/Resistance) ---
-    # Resample เป็นรายวัน (D)
-    # shift(1) สำคัญมาก! เพื่อใช้ราคาปิดเมื่อวานคำนวณ Pivot วันนี้
-    df_day = df.resample('D').agg({
-        'high': 'max', 'low': 'min', 'close': 'last'
-    }).shift(1).dropna()
-    
-    df_day['Pivot'] = (df_day['high'] + df_day['low'] + df_day['close']) / 3
-    df_day['R1'] = (2 * df_day['Pivot']) - df_day['low']
-    df_day['S1'] = (2 * df_day['Pivot']) - df_day['high']
-    
-    # Map กลับมาที่ M5
-    df['Pivot'] = df_day['Pivot'].reindex(df.index, method='ffill')
-    df['R1']    = df_day['R1'].reindex(df.index, method='ffill')
-    df['S1']    = df_day['S1'].reindex(df.index, method='ffill')
-    
+    # (Pivot / R1 / S1 ของเมื่อวาน จาก resample_context ด้านบน -> shift(1) สำคัญมาก! ห้ามใช้ราคาวันนี้)
     # Calculate Distances
-    df['dist_pivot'] = (close_p - df['Pivot']) / close_p
-    df['dist_r1']    = (close_p - df['R1']) / close_p
-    df['dist_s1']    = (close_p - df['S1']) / close_p
+    df['dist_pivot'] = (close_p - pivot) / close_p
+    df['dist_r1']    = (close_p - r1) / close_p
+    df['dist_s1']    = (close_p - s1) / close_p
 
     # --- 5. Volatility & Time ---
     df['atr_14'] = talib.ATR(high_p, low_p, close_p, timeperiod=14)
@@ -129,11 +185,11 @@ def compute_features_lite(df_m5, df_usd=None):
         if col not in df.columns:
             df[col] = 0.0
             
-    df = df[REQUIRED_FEATURES].copy()
+    df = df[REQUIRED_FEATURES + (INDICATOR_COLUMNS if indicators else [])].copy()
     
     # Clean NaN/Inf
     df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    df.dropna(inplace=True)
+    df.dropna(subset=REQUIRED_FEATURES, inplace=True)
     
     print(f"✅ Features computed (Lite). Rows: {len(df)}")
     return df
@@ -142,18 +198,21 @@ def compute_features_lite(df_m5, df_usd=None):
 # PART 2: SCALING (RobustScaler)
 # ==============================================================================
 
-def scale_features(df_features, scaler):
+def scale_features(df_features, scaler, features=None):
     """
     Scale ข้อมูลโดยใช้ Scaler ที่โหลดมาจากไฟล์ Pickle (.pkl)
+    features = ลำดับ Column ที่ Scaler ถูก Fit มา (Feature ของ Route, ค่าเริ่มต้น REQUIRED_FEATURES)
     """
     if scaler is None:
         raise ValueError("Scaler is None. Cannot transform features.")
+    if features is None:
+        features = REQUIRED_FEATURES
     
     # ตรวจสอบว่า Feature ครบไหม
-    if list(df_features.columns) != REQUIRED_FEATURES:
+    if list(df_features.columns) != list(features):
         # พยายาม Reorder ให้ตรง
         try:
-            df_features = df_features[REQUIRED_FEATURES]
+            df_features = df_features[list(features)]
         except KeyError as e:
              print(f"❌ Scaling Error: Missing columns {e}")
              return None
@@ -170,4 +229,1002 @@ def scale_features(df_features, scaler):
         
     except Exception as e:
         print(f"❌ Error during scaling: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+class FastScaler:
+    """
+    RobustScaler / StandardScaler ที่ Fit แล้ว -> center_ / scale_ เป็น float32 Vector
+    transform() = (X - center_) / scale_ แบบ In-place บน float32 Array เดียว
+    (ข้าม Input Validation / Feature-name Check ของ sklearn ที่แพงกว่าการคำนวณจริงสำหรับ 50x18)
+    ตอนสร้างจะเทียบผลกับ sklearn ก่อน -> ไม่ตรงเกิน parity_tol จะ Raise ValueError
+    """
+
+    def __init__(self, scaler, parity_tol=1e-5, parity_samples=64):
+        if hasattr(scaler, 'center_'):  # RobustScaler
+            center, scale = scaler.center_, scaler.scale_
+        elif hasattr(scaler, 'mean_'):  # StandardScaler
+            center, scale = scaler.mean_, scaler.scale_
+        else:
+            raise ValueError(f"Unsupported scaler type for fast path: {type(scaler).__name__}")
+
+        n_features = scaler.n_features_in_
+        self.scaler = scaler  # ตัวต้นฉบับ (sklearn)
+        self.n_features_in_ = n_features
+        self.center_ = np.zeros(n_features, dtype=np.float32) if center is None else np.asarray(center, dtype=np.float32)
+        self.scale_ = np.ones(n_features, dtype=np.float32) if scale is None else np.asarray(scale, dtype=np.float32)
+        self.parity_max_diff = self._check_parity(parity_tol, parity_samples)
+
+    def _check_parity(self, tol, n):
+        # Input รอบ ๆ ช่วงที่ Scaler เห็นตอน Fit (center ± หลายเท่าของ scale)
+        rng = np.random.default_rng(0)
+        center = self.center_.astype(np.float64)
+        scale = self.scale_.astype(np.float64)
+        X = center + scale * rng.normal(0.0, 3.0, size=(n, self.n_features_in_))
+        X = np.vstack([X, np.zeros((1, self.n_features_in_))])
+        expected = self.scaler.transform(X)
+        # Error สัมพัทธ์ต่อขนาดค่า (float32 มีความละเอียด ~1e-7)
+        max_diff = float(np.max(np.abs(self.transform(X) - expected) / (1.0 + np.abs(expected))))
+        if not max_diff <= tol:
+            raise ValueError(f"Fast scaler parity check failed (max diff {max_diff:.2e} > {tol:.0e}).")
+        return max_diff
+
+    def transform(self, X, copy=True):
+        """X: DataFrame (คอลัมน์ตามลำดับที่ Fit) หรือ Array (n, n_features) -> float32 Array"""
+        if isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype=np.float32)
+        elif copy or not (isinstance(X, np.ndarray) and X.dtype == np.float32 and X.flags['C_CONTIGUOUS']):
+            X = np.array(X, dtype=np.float32, order='C')
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected (n, {self.n_features_in_}) features, got {X.shape}")
+        np.subtract(X, self.center_, out=X)
+        np.divide(X, self.scale_, out=X)
+        return X
+
+
+class FeatureWindows:
+    """
+    Window (seq_len, n_features) ที่ซ้อนกันทั้งหมดของ Feature Matrix ที่ Scale แล้ว
+    - เก็บ Matrix เดียวเป็น float32 C-contiguous (n_rows, n_features)
+    - windows = Strided View (N, seq_len, n_features) ไม่ Copy -> Memory เท่ากับ Matrix เดียว ไม่ใช่ N ชุด
+    - View เป็น Read-only (Window ซ้อนกันใช้ Memory ร่วมกัน เขียนทับแล้วจะกระทบ Window อื่น)
+    Window i = แถว i .. i + seq_len - 1 (ทำนายให้แท่งของแถว i + seq_len - 1)
+    """
+
+    def __init__(self, matrix, seq_len):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"Feature matrix must be 2D, got shape {matrix.shape}")
+        if len(matrix) < seq_len:
+            raise ValueError(f"Not enough data: {len(matrix)}/{seq_len}")
+        self.matrix = matrix
+        self.seq_len = seq_len
+        row_stride, col_stride = matrix.strides
+        self.windows = np.lib.stride_tricks.as_strided(
+            matrix, shape=(len(matrix) - seq_len + 1, seq_len, matrix.shape[1]),
+            strides=(row_stride, row_stride, col_stride), writeable=False
+        )
+
+    @classmethod
+    def from_features(cls, df_features, scaler, seq_len, features=None):
+        """
+        Scale ทั้ง DataFrame ครั้งเดียว -> FeatureWindows
+        features = Column ตามลำดับของ Scaler/Model (Route) / Array (เช่นจาก FeatureBuffer) ต้องเรียงตามนี้อยู่แล้ว
+        """
+        if isinstance(df_features, np.ndarray):
+            if features is not None and df_features.shape[-1] != len(features):
+                raise ValueError(f"Expected {len(features)} feature columns, got {df_features.shape[-1]}")
+            return cls(scaler.transform(df_features), seq_len)
+        scaled = scale_features(df_features, scaler, features)
+        if scaled is None:
+            raise ValueError("Scaling returned None")
+        return cls(scaled, seq_len)
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __getitem__(self, i):
+        return self.windows[i]
+
+    def latest(self):
+        """Window ล่าสุด (seq_len, n_features) - View ต่อเนื่องใน Memory ส่งเข้า Model ได้เลย"""
+        return self.windows[-1]
+
+    def batches(self, batch_size):
+        """(start, View (B, seq_len, n_features)) ทีละ Batch สำหรับ Backtest / Batch Scoring"""
+        for start in range(0, len(self.windows), batch_size):
+            yield start, self.windows[start:start + batch_size]
+
+
+# ==============================================================================
+# PART 3: INCREMENTAL FEATURE ENGINE (Streaming, O(1) ต่อแท่ง)
+# ==============================================================================
+# ทุก Indicator ด้านล่างเลียนแบบ Algorithm ของ TA-Lib / pandas ทีละขั้น
+# (ลำดับการบวก/คูณเหมือนกัน) เพื่อให้ได้ค่าเท่ากับ compute_features_lite() ทุก bit
+# เมื่อรันบน History ชุดเดียวกัน
+
+_FEATURE_INDEX = {name: i for i, name in enumerate(REQUIRED_FEATURES)}
+_HOUR_SIN = np.sin(2 * np.pi * np.arange(24) / 24.0)
+_HOUR_COS = np.cos(2 * np.pi * np.arange(24) / 24.0)
+_NAN = float('nan')
+
+
+def _div(a, b):
+    """Division แบบ NumPy (หารศูนย์ได้ NaN แทน Exception) - แถวนั้นจะถูก dropna อยู่แล้ว"""
+    if b == 0.0 or a != a or b != b:
+        return _NAN
+    return a / b
+
+
+def _log(x):
+    """np.log บน Scalar (ให้ผลตรงกับ np.log บน Array ต่างจาก math.log)"""
+    if x != x or x <= 0.0:
+        return _NAN
+    return float(np.log(x))
+
+
+# TA-Lib แต่ละ Build ปัดเศษ Wilder/EMA ต่างกัน (0.4.x หาร n ตรง ๆ, 0.6+ ใช้ 1/n และ FMA
+# ตาม CPU) -> calibrate_talib_flavor() จะเลือกสูตรที่ตรงกับ talib ที่ติดตั้งอยู่จริง
+_TALIB_FLAVOR = None
+
+try:
+    _fma = math.fma  # Python 3.13+
+except AttributeError:
+    def _fma(a, b, c):
+        """Fused multiply-add (ปัดเศษครั้งเดียว) สำหรับ Python < 3.13"""
+        if not (math.isfinite(a) and math.isfinite(b) and math.isfinite(c)):
+            return a * b + c
+        return float(Fraction(a) * Fraction(b) + Fraction(c))
+
+
+def _ema_step(flavor, prev, x, k):
+    if flavor == 'fma':
+        return _fma(x - prev, k, prev)
+    return ((x - prev) * k) + prev
+
+
+def _atr_step(flavor, prev, tr, period):
+    if flavor == 'classic':
+        prev *= period - 1
+        prev += tr
+        return prev / period
+    a = float(period - 1) / float(period)
+    b = 1.0 - a
+    if flavor == 'blend_fma':
+        return _fma(prev, a, tr * b)
+    return prev * a + tr * b
+
+
+def _rsi_step(flavor, prev, x, period):
+    if flavor.endswith('_fma'):
+        total = _fma(prev, float(period - 1), x)
+    else:
+        total = prev * (period - 1) + x
+    if flavor.startswith('reciprocal'):
+        return total * (1.0 / period)
+    return total / period
+
+
+def _rsi_seed(flavor, total, period):
+    if flavor.startswith('reciprocal'):
+        return total * (1.0 / period)
+    return total / period
+
+
+class _TalibEMA:
+    """TA-Lib EMA: Seed ด้วย SMA ของ period แรก แล้ว ((x - prev) * k) + prev"""
+    __slots__ = ('period', 'k', 'count', 'seed_sum', 'value', 'flavor')
+
+    def __init__(self, period, flavor='classic'):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = _NAN
+        self.flavor = flavor
+
+    def copy(self):
+        other = _TalibEMA.__new__(_TalibEMA)
+        other.period, other.k, other.count = self.period, self.k, self.count
+        other.seed_sum, other.value, other.flavor = self.seed_sum, self.value, self.flavor
+        return other
+
+    def peek(self, x):
+        """ค่า EMA ถ้าใส่ x เป็นแท่งถัดไป (ไม่เปลี่ยน State)"""
+        if self.count + 1 < self.period:
+            return _NAN
+        if self.count + 1 == self.period:
+            return (self.seed_sum + x) / self.period
+        return _ema_step(self.flavor, self.value, x, self.k)
+
+    def push(self, x):
+        self.value = self.peek(x)
+        self.count += 1
+        if self.count <= self.period:
+            self.seed_sum += x
+        return self.value
+
+
+class _TalibSMA:
+    """TA-Lib SMA (INT_SMA): Running total แบบ บวกหัว-ลบท้าย"""
+    __slots__ = ('period', 'window', 'total')
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    def copy(self):
+        other = _TalibSMA.__new__(_TalibSMA)
+        other.period, other.total = self.period, self.total
+        other.window = deque(self.window, maxlen=self.period)
+        return other
+
+    def push(self, x):
+        self.total += x
+        self.window.append(x)
+        if len(self.window) < self.period:
+            return _NAN
+        tmp = self.total
+        self.total -= self.window[0]
+        return tmp / self.period
+
+
+class _TalibATR:
+    """TA-Lib ATR: SMA ของ True Range period แรก แล้ว Wilder Smoothing"""
+    __slots__ = ('period', 'prev_close', 'count', 'seed_sum', 'value', 'flavor')
+
+    def __init__(self, period, flavor='classic'):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = _NAN
+        self.flavor = flavor
+
+    def copy(self):
+        other = _TalibATR.__new__(_TalibATR)
+        other.period, other.prev_close, other.count = self.period, self.prev_close, self.count
+        other.seed_sum, other.value, other.flavor = self.seed_sum, self.value, self.flavor
+        return other
+
+    def push(self, high, low, close):
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return _NAN
+        tr = high - low
+        val2 = abs(prev_close - high)
+        if val2 > tr: tr = val2
+        val3 = abs(prev_close - low)
+        if val3 > tr: tr = val3
+
+        self.count += 1
+        if self.count < self.period:
+            self.seed_sum += tr
+            return _NAN
+        if self.count == self.period:
+            self.seed_sum += tr
+            self.value = self.seed_sum / self.period
+            return self.value
+        self.value = _atr_step(self.flavor, self.value, tr, self.period)
+        return self.value
+
+
+class _TalibRSI:
+    """TA-Lib RSI (Default Compatibility): เฉลี่ย Gain/Loss แบบ Wilder"""
+    __slots__ = ('period', 'prev_value', 'count', 'gain', 'loss', 'flavor')
+
+    def __init__(self, period, flavor='classic'):
+        self.period = period
+        self.prev_value = None
+        self.count = 0
+        self.gain = 0.0
+        self.loss = 0.0
+        self.flavor = flavor
+
+    def copy(self):
+        other = _TalibRSI.__new__(_TalibRSI)
+        other.period, other.prev_value, other.count = self.period, self.prev_value, self.count
+        other.gain, other.loss, other.flavor = self.gain, self.loss, self.flavor
+        return other
+
+    def _value(self):
+        total = self.gain + self.loss
+        if -0.00000001 < total < 0.00000001:
+            return 0.0
+        return 100.0 * (self.gain / total)
+
+    def push(self, x):
+        prev_value, self.prev_value = self.prev_value, x
+        if prev_value is None:
+            return _NAN
+        diff = x - prev_value
+        up = diff if diff > 0 else 0.0
+        down = up - diff
+        self.count += 1
+        if self.count <= self.period:
+            self.gain += up
+            self.loss += down
+            if self.count < self.period:
+                return _NAN
+            self.gain = _rsi_seed(self.flavor, self.gain, self.period)
+            self.loss = _rsi_seed(self.flavor, self.loss, self.period)
+            return self._value()
+        self.gain = _rsi_step(self.flavor, self.gain, up, self.period)
+        self.loss = _rsi_step(self.flavor, self.loss, down, self.period)
+        return self._value()
+
+
+def calibrate_talib_flavor():
+    """
+    เลือกสูตรปัดเศษ (EMA / ATR / RSI) ที่ให้ผลตรงกับ talib ที่ติดตั้งอยู่ทุก bit
+    รันครั้งเดียวต่อ Process (Probe 300 แท่ง) - ถ้าไม่มีสูตรไหนตรง จะใช้ 'classic'
+    และคืนค่า exact=False (ต่างกันระดับ 1 ulp)
+    """
+    global _TALIB_FLAVOR
+    if _TALIB_FLAVOR is not None:
+        return _TALIB_FLAVOR
+
+    rng = np.random.default_rng(20240601)
+    n = 300
+    close = 2000 + np.cumsum(rng.normal(0, 1.0, n))
+    high = close + np.abs(rng.normal(0, 1.0, n))
+    low = close - np.abs(rng.normal(0, 1.0, n))
+
+    def _matches(expected, produced):
+        produced = np.array(produced)
+        return bool(np.array_equal(expected, produced, equal_nan=True))
+
+    flavor = {'exact': True}
+    ref = talib.EMA(close, timeperiod=50)
+    for name in ('classic', 'fma'):
+        ema = _TalibEMA(50, name)
+        if _matches(ref, [ema.push(x) for x in close]):
+            flavor['ema'] = name
+            break
+    ref = talib.ATR(high, low, close, timeperiod=14)
+    for name in ('classic', 'blend', 'blend_fma'):
+        atr = _TalibATR(14, name)
+        if _matches(ref, [atr.push(high[i], low[i], close[i]) for i in range(n)]):
+            flavor['atr'] = name
+            break
+    ref = talib.RSI(close, timeperiod=14)
+    for name in ('classic', 'reciprocal', 'classic_fma', 'reciprocal_fma'):
+        rsi = _TalibRSI(14, name)
+        if _matches(ref, [rsi.push(x) for x in close]):
+            flavor['rsi'] = name
+            break
+
+    for key in ('ema', 'atr', 'rsi'):
+        if key not in flavor:
+            print(f"⚠️ Streaming: No exact {key.upper()} match for this TA-Lib build. Using 'classic'.")
+            flavor[key] = 'classic'
+            flavor['exact'] = False
+    _TALIB_FLAVOR = flavor
+    return flavor
+
+
+class _PandasRollingCorr:
+    """
+    Series.rolling(window).corr(other) แบบ Online
+    เลียนแบบ roll_mean / roll_var ของ pandas (Kahan + Welford, แยก compensation add/remove)
+    """
+    __slots__ = ('window', 'pairs', 'mean_xy', 'mean_x', 'mean_y', 'var_x', 'var_y')
+
+    def __init__(self, window):
+        self.window = window
+        self.pairs = deque()
+        self.mean_xy = _RollingMeanState()
+        self.mean_x = _RollingMeanState()
+        self.mean_y = _RollingMeanState()
+        self.var_x = _RollingVarState()
+        self.var_y = _RollingVarState()
+
+    def copy(self):
+        other = _PandasRollingCorr.__new__(_PandasRollingCorr)
+        other.window = self.window
+        other.pairs = deque(self.pairs)
+        other.mean_xy, other.mean_x, other.mean_y = self.mean_xy.copy(), self.mean_x.copy(), self.mean_y.copy()
+        other.var_x, other.var_y = self.var_x.copy(), self.var_y.copy()
+        return other
+
+    def push(self, x, y):
+        if len(self.pairs) == self.window:
+            old_x, old_y = self.pairs.popleft()
+            self.mean_xy.remove(old_x * old_y)
+            self.mean_x.remove(old_x)
+            self.mean_y.remove(old_y)
+            self.var_x.remove(old_x)
+            self.var_y.remove(old_y)
+        self.pairs.append((x, y))
+        self.mean_xy.add(x * y)
+        self.mean_x.add(x)
+        self.mean_y.add(y)
+        self.var_x.add(x)
+        self.var_y.add(y)
+
+        minp = self.window
+        mean_xy = self.mean_xy.value(minp)
+        mean_x = self.mean_x.value(minp)
+        mean_y = self.mean_y.value(minp)
+        count = float(sum(1 for px, py in self.pairs if (px + py) == (px + py)))
+        x_var = self.var_x.value(minp)
+        y_var = self.var_y.value(minp)
+        if mean_xy != mean_xy or x_var != x_var or y_var != y_var:
+            return _NAN
+        numerator = (mean_xy - mean_x * mean_y) * _div(count, count - 1)
+        var_prod = x_var * y_var
+        if var_prod < 0:
+            return _NAN
+        return _div(numerator, math.sqrt(var_prod))
+
+
+class _RollingMeanState:
+    __slots__ = ('nobs', 'sum_x', 'neg_ct', 'comp_add', 'comp_remove', 'same_ct', 'prev_value')
+
+    def __init__(self):
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = None
+
+    def copy(self):
+        other = _RollingMeanState.__new__(_RollingMeanState)
+        other.nobs, other.sum_x, other.neg_ct = self.nobs, self.sum_x, self.neg_ct
+        other.comp_add, other.comp_remove = self.comp_add, self.comp_remove
+        other.same_ct, other.prev_value = self.same_ct, self.prev_value
+        return other
+
+    def add(self, val):
+        if self.prev_value is None:
+            self.prev_value = val
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+
+    def remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self, minp):
+        if self.nobs >= minp and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.same_ct >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+        return _NAN
+
+
+class _RollingVarState:
+    __slots__ = ('nobs', 'mean_x', 'ssqdm_x', 'comp_add', 'comp_remove', 'same_ct', 'prev_value')
+
+    def __init__(self):
+        self.nobs = 0.0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = None
+
+    def copy(self):
+        other = _RollingVarState.__new__(_RollingVarState)
+        other.nobs, other.mean_x, other.ssqdm_x = self.nobs, self.mean_x, self.ssqdm_x
+        other.comp_add, other.comp_remove = self.comp_add, self.comp_remove
+        other.same_ct, other.prev_value = self.same_ct, self.prev_value
+        return other
+
+    def add(self, val):
+        if self.prev_value is None:
+            self.prev_value = val
+        if val != val:
+            return
+        self.nobs += 1
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+        prev_mean = self.mean_x - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = val - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def value(self, minp, ddof=1):
+        if self.nobs >= minp and self.nobs > ddof:
+            if self.nobs == 1 or self.same_ct >= self.nobs:
+                return 0.0
+            return self.ssqdm_x / (self.nobs - ddof)
+        return _NAN
+
+
+class _FeatureState:
+    """State ทั้งหมดของ Engine (copy ได้ถูก ๆ เพื่อ Rollback แท่งที่ยังไม่ปิด)"""
+    __slots__ = ('closes', 'ema50', 'ema200', 'h1_ema', 'h1_key', 'h1_close', 'vol_sma', 'atr', 'rsi',
+                 'day_key', 'day_high', 'day_low', 'day_close', 'pivots',
+                 'usd_vals', 'usd_corr')
+
+    def __init__(self, flavor):
+        self.closes = deque(maxlen=6)
+        self.ema50 = _TalibEMA(50, flavor['ema'])
+        self.ema200 = _TalibEMA(200, flavor['ema'])
+        self.h1_ema = _TalibEMA(50, flavor['ema'])
+        self.h1_key = None
+        self.h1_close = _NAN
+        self.vol_sma = _TalibSMA(20)
+        self.atr = _TalibATR(14, flavor['atr'])
+        self.rsi = _TalibRSI(14, flavor['rsi'])
+        self.day_key = None
+        self.day_high = self.day_low = self.day_close = _NAN
+        self.pivots = (_NAN, _NAN, _NAN)
+        self.usd_vals = deque(maxlen=6)
+        self.usd_corr = _PandasRollingCorr(12)
+
+    def copy(self):
+        other = _FeatureState.__new__(_FeatureState)
+        other.closes = deque(self.closes, maxlen=6)
+        other.ema50, other.ema200, other.h1_ema = self.ema50.copy(), self.ema200.copy(), self.h1_ema.copy()
+        other.h1_key, other.h1_close = self.h1_key, self.h1_close
+        other.vol_sma, other.atr, other.rsi = self.vol_sma.copy(), self.atr.copy(), self.rsi.copy()
+        other.day_key, other.day_high, other.day_low, other.day_close = (
+            self.day_key, self.day_high, self.day_low, self.day_close)
+        other.pivots = self.pivots
+        other.usd_vals = deque(self.usd_vals, maxlen=6)
+        other.usd_corr = self.usd_corr.copy()
+        return other
+
+
+class StreamingFeatureEngine:
+    """
+    Incremental Feature Engine (ต่อ 1 Symbol)
+    - push_bar() ทีละแท่ง: อัปเดต EMA50, H1 EMA50, ATR14, RSI14, Vol SMA20,
+      Daily Pivots และ USD Rolling Corr แบบ O(1) (+ EMA200 สำหรับ Filter -> indicators())
+    - แท่งที่ time ซ้ำกับแท่งล่าสุด = แท่งที่ยังไม่ปิด (Forming) -> Rollback แล้วคำนวณใหม่
+    - Rows ที่ได้ตรงกับ compute_features_lite() บน History เดียวกัน (ทุกแท่งตั้งแต่ Seed)
+    """
+
+    def __init__(self, use_usd=True, max_rows=200):
+        self.use_usd = use_usd
+        self.max_rows = max_rows
+        self.last_time = None
+        self.last_bar = None
+        self.prev_bar = None
+
+        self.exact = calibrate_talib_flavor()['exact']
+        self._state = _FeatureState(_TALIB_FLAVOR)
+        self._prev_state = None
+        self._last_emitted = False
+        self._rows = deque(maxlen=max_rows)
+        self._row_meta = deque(maxlen=max_rows)  # (time, close, hour_key)
+
+        # USD ล่าสุดที่ map ได้ (ffill) + ค่าแรกสุดไว้ bfill
+        self._usd_time = None
+        self._usd_close = _NAN
+
+    # --- Construction -------------------------------------------------------
+
+    @classmethod
+    def from_frames(cls, df_m5, df_usd=None, max_rows=200):
+        """Seed Engine จาก DataFrame (index = time) แบบเดียวกับที่ส่งเข้า compute_features_lite"""
+        use_usd = df_usd is not None and not df_usd.empty
+        engine = cls(use_usd=use_usd, max_rows=max_rows)
+        engine.extend(df_m5, df_usd)
+        return engine
+
+    @classmethod
+    def from_arrays(cls, times, o, h, l, c, v, usd_times=None, usd_close=None, max_rows=200):
+        """Seed Engine จาก Array (ดู extend_arrays)"""
+        use_usd = usd_times is not None and len(usd_times) > 0
+        engine = cls(use_usd=use_usd, max_rows=max_rows)
+        engine.extend_arrays(times, o, h, l, c, v, usd_times, usd_close)
+        return engine
+
+    # --- Bar Updates --------------------------------------------------------
+
+    def push_usd(self, t, close):
+        """อัปเดต USD Close ล่าสุด (ใช้ map ให้แท่ง Gold ที่ time >= t)"""
+        if self._usd_time is not None and t < self._usd_time:
+            return
+        self._usd_time = t
+        self._usd_close = float(close)
+
+    def push_bar(self, t, open_, high, low, close, volume, usd_close=None):
+        """
+        เพิ่มแท่ง M5 ใหม่ (t = Unix seconds)
+        คืนค่า True ถ้าแท่งนี้ได้ Feature Row ที่สมบูรณ์ (ไม่มี NaN/Inf)
+        """
+        t = int(t)
+        if self.last_time is not None and t < self.last_time:
+            raise ValueError(f"Out-of-order bar: {t} < {self.last_time}")
+
+        if self.last_time is not None and t == self.last_time:
+            # แท่ง Forming ถูกส่งมาใหม่ -> ย้อน State กลับไปก่อนแท่งนี้
+            self._state = self._prev_state.copy()
+            if self._last_emitted:
+                self._rows.pop()
+                self._row_meta.pop()
+        else:
+            self._prev_state = self._state.copy()
+            self.prev_bar = self.last_bar
+
+        bar = (t, float(open_), float(high), float(low), float(close), float(volume))
+        self.last_time = t
+        self.last_bar = bar
+        if usd_close is None:
+            usd_close = self._usd_close
+        self._last_emitted = self._apply(bar, float(usd_close))
+        return self._last_emitted
+
+    def _apply(self, bar, usd_close):
+        t, o, h, l, c, v = bar
+        s = self._state
+        row = np.empty(len(REQUIRED_FEATURES), dtype=np.float64)
+        idx = _FEATURE_INDEX
+
+        # --- 1. Basic Momentum & Trend ---
+        s.closes.append(c)
+        row[idx['log_ret_1']] = _log(_div(c, s.closes[-2])) if len(s.closes) >= 2 else _NAN
+        row[idx['log_ret_5']] = _log(_div(c, s.closes[0])) if len(s.closes) == 6 else _NAN
+
+        ema50 = s.ema50.push(c)
+        row[idx['dist_ema50']] = _div(c - ema50, c)
+        s.ema200.push(c)
+
+        # H1 EMA: ชั่วโมงใหม่ -> commit close ของชั่วโมงก่อนหน้า
+        hour_key = t // 3600
+        if s.h1_key is not None and hour_key != s.h1_key:
+            s.h1_ema.push(s.h1_close)
+        s.h1_key = hour_key
+        s.h1_close = c
+        h1_value = s.h1_ema.peek(c)
+        row[idx['dist_h1_ema']] = _div(c - h1_value, c)
+
+        # --- 2. Candle Psychology ---
+        candle_range = (h - l) + 1e-9
+        row[idx['body_pct']] = abs(c - o) / candle_range
+        row[idx['upper_wick_pct']] = (h - max(c, o)) / candle_range
+        row[idx['lower_wick_pct']] = (min(c, o) - l) / candle_range
+
+        # --- 3. Volume Force ---
+        vol_sma = s.vol_sma.push(v) + 1e-9
+        sign = (c - o > 0) - (c - o < 0)
+        row[idx['vol_force']] = _div(v * sign, vol_sma)
+
+        # --- 4. Daily Pivots (ใช้วันก่อนหน้าที่มีแท่งจริง) ---
+        day_key = t // 86400
+        if s.day_key is None or day_key != s.day_key:
+            if s.day_key is not None:
+                pivot = (s.day_high + s.day_low + s.day_close) / 3
+                s.pivots = (pivot, (2 * pivot) - s.day_low, (2 * pivot) - s.day_high)
+            s.day_key = day_key
+            s.day_high, s.day_low = h, l
+        else:
+            s.day_high = max(s.day_high, h)
+            s.day_low = min(s.day_low, l)
+        s.day_close = c
+        pivot, r1, s1 = s.pivots
+        row[idx['dist_pivot']] = _div(c - pivot, c)
+        row[idx['dist_r1']] = _div(c - r1, c)
+        row[idx['dist_s1']] = _div(c - s1, c)
+
+        # --- 5. Volatility & Time ---
+        atr = s.atr.push(h, l, c)
+        row[idx['atr_14']] = atr
+        row[idx['atr_pct']] = _div(atr, c)
+        row[idx['rsi_14']] = s.rsi.push(c)
+        hour = (t // 3600) % 24
+        row[idx['hour_sin']] = _HOUR_SIN[hour]
+        row[idx['hour_cos']] = _HOUR_COS[hour]
+
+        # --- 6. Intermarket (USD) ---
+        if self.use_usd:
+            s.usd_vals.append(usd_close)
+            if len(s.usd_vals) == 6:
+                row[idx['usd_ret_5']] = _log(_div(usd_close, s.usd_vals[0] + 1e-9))
+            else:
+                row[idx['usd_ret_5']] = _NAN
+            row[idx['usd_corr']] = s.usd_corr.push(c, usd_close)
+        else:
+            row[idx['usd_ret_5']] = 0.0
+            row[idx['usd_corr']] = -1.0
+
+        # H1 EMA ของชั่วโมงปัจจุบันเปลี่ยน -> อัปเดตแถวก่อนหน้าในชั่วโมงเดียวกัน
+        col = idx['dist_h1_ema']
+        for i in range(len(self._row_meta) - 1, -1, -1):
+            _, row_close, row_hour = self._row_meta[i]
+            if row_hour != hour_key:
+                break
+            self._rows[i][col] = _div(row_close - h1_value, row_close)
+
+        if not np.isfinite(row).all():
+            return False
+        self._rows.append(row)
+        self._row_meta.append((t, c, hour_key))
+        return True
+
+    def extend(self, df_m5, df_usd=None):
+        """
+        ป้อนแท่งจาก DataFrame (index = time) เฉพาะแท่งที่ใหม่กว่า/เท่ากับแท่งล่าสุด
+        USD ถูก map แบบ reindex(method='ffill') + bfill เหมือน compute_features_lite
+        """
+        df = df_m5.sort_index()
+        usd_times = usd_close = None
+        if df_usd is not None and not df_usd.empty:
+            df_u = df_usd.sort_index()
+            usd_times = df_u.index.asi8 // 1_000_000_000
+            usd_close = df_u['close'].astype(float).values
+
+        return self.extend_arrays(
+            df.index.asi8 // 1_000_000_000,
+            df['open'].astype(float).values,
+            df['high'].astype(float).values,
+            df['low'].astype(float).values,
+            df['close'].astype(float).values,
+            df['tick_volume'].astype(float).values,
+            usd_times, usd_close
+        )
+
+    def extend_arrays(self, times, o, h, l, c, v, usd_times=None, usd_close=None):
+        """เหมือน extend() แต่รับ Array เรียงตามเวลา (time = Unix seconds) ไม่ต้องสร้าง DataFrame"""
+        if not self.use_usd or usd_times is None or len(usd_times) == 0:
+            usd_times = usd_close = None
+        elif self._usd_time is None:
+            # bfill: แท่ง Gold ที่มาก่อน USD แท่งแรก ใช้ค่า USD แท่งแรก
+            self._usd_close = float(usd_close[0])
+
+        start = 0
+        if self.last_time is not None:
+            start = int(np.searchsorted(times, self.last_time, side='left'))
+        u = 0
+        if usd_times is not None and self._usd_time is not None:
+            u = int(np.searchsorted(usd_times, self._usd_time, side='left'))
+
+        for i in range(start, len(times)):
+            t = times[i]
+            if usd_times is not None:
+                while u < len(usd_times) and usd_times[u] <= t:
+                    self.push_usd(usd_times[u], usd_close[u])
+                    u += 1
+            self.push_bar(t, o[i], h[i], l[i], c[i], v[i])
+        return self
+
+    def can_extend(self, df_m5, df_usd=None):
+        """เช็คว่า Payload ต่อจาก State เดิมได้ (ไม่มี Gap / ไม่มีการแก้ย้อนหลัง)"""
+        if self.last_time is None or df_m5 is None or df_m5.empty:
+            return False
+        if not df_m5.index.is_monotonic_increasing:
+            return False
+        if self.use_usd != (df_usd is not None and not df_usd.empty):
+            return False
+        times = df_m5.index.asi8 // 1_000_000_000
+        if times[0] > self.last_time or times[-1] < self.last_time:
+            return False
+        if self.prev_bar is not None:
+            pos = int(np.searchsorted(times, self.prev_bar[0], side='left'))
+            if pos >= len(times) or times[pos] != self.prev_bar[0]:
+                return False
+            rec = df_m5.iloc[pos]
+            bar = (self.prev_bar[0], float(rec['open']), float(rec['high']), float(rec['low']),
+                   float(rec['close']), float(rec['tick_volume']))
+            if bar != self.prev_bar:
+                return False
+        return True
+
+    # --- Output -------------------------------------------------------------
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    def feature_window(self, length):
+        """คืน (length, 18) Array ของ Feature Rows ล่าสุด (None ถ้ามีไม่พอ)"""
+        if len(self._rows) < length:
+            return None
+        start = len(self._rows) - length
+        return np.array([self._rows[i] for i in range(start, len(self._rows))])
+
+    def indicators(self):
+        """ค่า INDICATOR_COLUMNS ของแท่งล่าสุด (EMA200 = NaN จนกว่าจะครบ 200 แท่งตั้งแต่ Seed)"""
+        if self.last_bar is None:
+            return {'close': _NAN, 'ema200': _NAN}
+        return {'close': self.last_bar[4], 'ema200': self._state.ema200.value}
+
+    def feature_frame(self):
+        """Rows ทั้งหมดที่เก็บไว้เป็น DataFrame (สำหรับ Debug / เทียบกับ Batch)"""
+        index = pd.to_datetime([m[0] for m in self._row_meta], unit='s')
+        return pd.DataFrame(list(self._rows), index=index, columns=REQUIRED_FEATURES)
+
+
+# ==============================================================================
+# PART 4: COLUMNAR FEATURES (float32 Buffer ที่จองไว้ใช้ซ้ำ ไม่สร้าง DataFrame)
+# ==============================================================================
+# สูตรเดียวกับ compute_features_lite แต่รับ Column Arrays (จาก Payload / Ring Buffer) และเขียนผลลง
+# Buffer float32 (n_bars, 18) ตรง ๆ -> ไม่มี DataFrame / Column ใหม่ 20 ตัว / copy ตอนเลือก Column และ dropna
+# TA-Lib ต้องการ float64 -> Indicator ยังคำนวณเป็น float64 ชั่วคราว แล้วปัดเป็น float32 ตอนเขียนลง Buffer
+# (Model / Scaler ใช้ float32 อยู่แล้ว) ผลต่างจาก DataFrame Path ดู columnar_parity()
+
+def _shift_ratio(values, periods):
+    """values / values.shift(periods) แบบ Array (periods แถวแรก = NaN)"""
+    out = np.full(len(values), np.nan)
+    out[periods:] = values[periods:] / values[:-periods]
+    return out
+
+
+def _rolling_corr(x, y, window):
+    """x.rolling(window).corr(y) แบบ Sliding Window (NaN ในหน้าต่าง / Variance 0 -> NaN)"""
+    out = np.full(len(x), np.nan)
+    if len(x) < window:
+        return out
+    xw = np.lib.stride_tricks.sliding_window_view(x, window)
+    yw = np.lib.stride_tricks.sliding_window_view(y, window)
+    dx = xw - xw.mean(axis=1)[:, None]
+    dy = yw - yw.mean(axis=1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[window - 1:] = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+    return out
+
+
+def _align_usd(times, usd_times, usd_close):
+    """USD close ล่าสุด ณ เวลาของแต่ละแท่ง (= reindex ffill + fillna bfill ของ compute_features_lite)"""
+    pos = np.searchsorted(usd_times, times, side='right') - 1
+    vals = usd_close[np.maximum(pos, 0)]
+    vals[pos < 0] = np.nan
+    missing = np.isnan(vals)
+    if missing.any():
+        # bfill: แถวที่ยังเป็น NaN ใช้ค่าถัดไปที่มี
+        nxt = np.where(missing, len(vals), np.arange(len(vals)))
+        nxt = np.minimum.accumulate(nxt[::-1])[::-1]
+        vals = np.append(vals, np.nan)[nxt]
+    return vals
+
+
+class FeatureBuffer:
+    """
+    compute() -> float32 View (n_valid, 18) ของแถวที่ Feature ครบ (เท่ากับ compute_features_lite().values)
+    - Buffer จองครั้งเดียว (ขยายเมื่อ n_bars เกิน) แล้วเขียนทับทุกครั้ง -> View เดิมใช้ไม่ได้หลัง compute() ครั้งถัดไป
+      (ต้องเก็บไว้ต่อ เช่น ใส่ Cache ให้ copy() ก่อน) และไม่ Thread-safe -> 1 Buffer ต่อ Thread
+    - rows = ตำแหน่งแท่ง (ใน Input) ของแต่ละแถวที่คืน, indicators() = close / ema200 ของแถวล่าสุด
+    """
+
+    def __init__(self, capacity=1024):
+        self._buf = np.empty((capacity, len(REQUIRED_FEATURES)), dtype=np.float32)
+        self.rows = np.empty(0, dtype=np.intp)
+        self._close = self._ema200 = None
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+    def compute(self, times, o, h, l, c, v, usd_times=None, usd_close=None, indicators=False):
+        """Column Arrays ของแท่ง M5 (times = Unix วินาที เรียงจากเก่าไปใหม่) + USD (ถ้ามี)"""
+        n = len(times)
+        if n > self.capacity:
+            self._buf = np.empty((max(n, 2 * self.capacity), len(REQUIRED_FEATURES)), dtype=np.float32)
+        buf = self._buf[:n]
+        col = {name: buf[:, i] for name, i in _FEATURE_INDEX.items()}
+
+        times = np.asarray(times, dtype=np.int64)
+        open_p, high_p, low_p, close_p, volume = (np.asarray(x, dtype=np.float64) for x in (o, h, l, c, v))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # --- 1. Momentum & Trend ---
+            col['log_ret_1'][:] = np.log(_shift_ratio(close_p, 1))
+            col['log_ret_5'][:] = np.log(_shift_ratio(close_p, 5))
+            col['dist_ema50'][:] = (close_p - talib.EMA(close_p, timeperiod=50)) / close_p
+            ema50_h1, pivot, r1, s1 = resample_context(times, high_p, low_p, close_p)
+            col['dist_h1_ema'][:] = (close_p - ema50_h1) / close_p
+
+            # --- 2. Candle Psychology ---
+            candle_range = (high_p - low_p) + 1e-9
+            col['body_pct'][:] = np.abs(close_p - open_p) / candle_range
+            col['upper_wick_pct'][:] = (high_p - np.maximum(close_p, open_p)) / candle_range
+            col['lower_wick_pct'][:] = (np.minimum(close_p, open_p) - low_p) / candle_range
+
+            # --- 3. Volume Force ---
+            col['vol_force'][:] = (volume * np.sign(close_p - open_p)) / (talib.SMA(volume, timeperiod=20) + 1e-9)
+
+            # --- 4. Daily Pivots (ของเมื่อวาน) ---
+            col['dist_pivot'][:] = (close_p - pivot) / close_p
+            col['dist_r1'][:] = (close_p - r1) / close_p
+            col['dist_s1'][:] = (close_p - s1) / close_p
+
+            # --- 5. Volatility & Time ---
+            atr = talib.ATR(high_p, low_p, close_p, timeperiod=14)
+            col['atr_14'][:] = atr
+            col['atr_pct'][:] = atr / close_p
+            col['rsi_14'][:] = talib.RSI(close_p, timeperiod=14)
+            hour = (times // 3600) % 24
+            col['hour_sin'][:] = _HOUR_SIN[hour]
+            col['hour_cos'][:] = _HOUR_COS[hour]
+
+            # --- 6. Intermarket (USD) ---
+            if usd_times is not None and len(usd_times):
+                usd_vals = _align_usd(times, np.asarray(usd_times, dtype=np.int64), np.asarray(usd_close, dtype=np.float64))
+                shifted = np.full(n, np.nan)
+                shifted[5:] = usd_vals[:-5]
+                col['usd_ret_5'][:] = np.log(usd_vals / (shifted + 1e-9))
+                col['usd_corr'][:] = _rolling_corr(close_p, usd_vals, 12)
+            else:
+                col['usd_ret_5'][:] = 0.0
+                col['usd_corr'][:] = -1.0
+
+        # Clean NaN/Inf: แถวที่ไม่ครบส่วนใหญ่อยู่ต้น History (Warm-up) -> คืน View ต่อเนื่องได้เลย
+        self.rows = np.flatnonzero(np.isfinite(buf).all(axis=1))
+        self._close = close_p
+        self._ema200 = talib.EMA(close_p, timeperiod=200) if indicators else None
+        k = len(self.rows)
+        if k and self.rows[0] + k == n:
+            return buf[self.rows[0]:]
+        buf[:k] = buf[self.rows]
+        return buf[:k]
+
+    def indicators(self):
+        """INDICATOR_COLUMNS ของแถวล่าสุดที่ compute() คืน (ต้องเรียก compute(..., indicators=True))"""
+        if self._ema200 is None or not len(self.rows):
+            return {'close': _NAN, 'ema200': _NAN}
+        last = self.rows[-1]
+        return {'close': float(self._close[last]), 'ema200': float(self._ema200[last])}
+
+
+def columnar_parity(df_m5, df_usd=None):
+    """
+    เทียบ FeatureBuffer กับ compute_features_lite บน Input เดียวกัน -> Error สัมพัทธ์สูงสุด (ต่อขนาดค่า)
+    (ต่างกันแค่ float32 ~1e-7 และ usd_corr ที่ pandas ใช้ Rolling Algorithm อีกแบบ)
+    Raise ValueError ถ้าแถวที่ได้ไม่ตรงกัน
+    """
+    df_m5 = df_m5.sort_index()
+    expected = compute_features_lite(df_m5, df_usd=df_usd)
+    times = df_m5.index.values.astype('datetime64[s]').astype(np.int64)
+    usd = (None, None)
+    if df_usd is not None and not df_usd.empty:
+        usd = (df_usd.index.values.astype('datetime64[s]').astype(np.int64), df_usd['close'].values)
+    buffer = FeatureBuffer(len(df_m5))
+    X = buffer.compute(times, *(df_m5[col].values for col in ('open', 'high', 'low', 'close', 'tick_volume')), *usd)
+    if not np.array_equal(times[buffer.rows], expected.index.values.astype('datetime64[s]').astype(np.int64)):
+        raise ValueError(f"Columnar rows differ: {len(X)} vs {len(expected)}")
+    if not len(X):
+        return 0.0
+    ref = expected.values
+    return float(np.max(np.abs(X - ref) / (1.0 + np.abs(ref))))
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+
+# ==============================================================================
+# PART 1: PERSISTENT HEADLESS BROWSER (เปิด Chromium ครั้งเดียว ใช้ซ้ำทุกรอบ Scrape)
+# ==============================================================================
+
+# ไม่ต้องโหลดสิ่งที่ Parser ไม่ใช้ -> Page เบาลงและโหลดเสร็จเร็วขึ้น
+_BLOCKED_RESOURCES = ('image', 'media', 'font', 'stylesheet')
+
+
+class PersistentBrowser:
+    """
+    Chromium + Context + Page ที่เปิดค้างไว้ (Start ครั้งแรกที่ fetch)
+    - รอ Selector ของข้อมูลจริงแทน time.sleep คงที่
+    - Restart เฉพาะเมื่อ Browser/Page Crash หรือหลุดการเชื่อมต่อ (Timeout ธรรมดาไม่ Restart)
+    หมายเหตุ: Playwright Sync API ผูกกับ Thread ที่ Start -> เรียก fetch จาก Thread เดียว (News Scheduler)
+    Playwright ถูก Import ตอน fetch ครั้งแรก (API Startup ไม่ต้องโหลด)
+    """
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+        self._crashed = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def alive(self):
+        return (
+            self._browser is not None and self._browser.is_connected()
+            and self._page is not None and not self._page.is_closed() and not self._crashed
+        )
+
+    def _on_crash(self, page):
+        print("NEWS: (WARN) Browser page crashed. Will restart on next fetch.")
+        self._crashed = True
+
+    def _route(self, route):
+        if route.request.resource_type in _BLOCKED_RESOURCES:
+            route.abort()
+        else:
+            route.continue_()
+
+    def _start(self):
+        self.close()
+        from playwright.sync_api import sync_playwright
+        print("NEWS: Starting persistent Chromium...")
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless, args=['--disable-dev-shm-usage', '--disable-gpu']
+        )
+        self._context = self._browser.new_context()
+        self._context.route('**/*', self._route)
+        self._page = self._context.new_page()
+        self._page.on('crash', self._on_crash)
+        self._crashed = False
+
+    def fetch(self, url, wait_selector, timeout_ms=20000):
+        """โหลด url แล้วรอจนมี wait_selector ใน DOM -> คืน HTML (ถ้ารอไม่ทันจะคืน HTML ที่มี ณ ตอนนั้น)"""
+        from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if not self.alive:
+                        self._start()
+                    self._page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
+                    try:
+                        self._page.wait_for_selector(wait_selector, state='attached', timeout=timeout_ms)
+                    except PlaywrightTimeoutError:
+                        print(f"NEWS: (WARN) '{wait_selector}' not found within {timeout_ms} ms.")
+                    return self._page.content()
+                except PlaywrightTimeoutError:
+                    raise
+                except PlaywrightError:
+                    # Browser ตาย/หลุด -> Restart แล้วลองใหม่ 1 ครั้ง
+                    if attempt == 2 or self.alive:
+                        raise
+                    print("NEWS: (WARN) Browser disconnected. Restarting...")
+
+    def close(self):
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        except Exception:
+            pass
+        try:
+            if self._playwright is not None:
+                self._playwright.stop()
+        except Exception:
+            pass
+        self._playwright = self._browser = self._context = self._page = None
+
+
+# ==============================================================================
+# PART 2: NEWS LOCKDOWN INTERVAL INDEX (ตอบ "ตอนนี้อยู่ในช่วงข่าวไหม" ด้วย bisect)
+# ==============================================================================
+
+class NewsIntervalIndex:
+    """
+    เก็บข่าวแดง USD ทั้งหมดจากปฏิทินเป็นช่วง [เวลาข่าว - window, เวลาข่าว + window] ที่เรียงและ Merge แล้ว
+    - Scraper เรียก replace() เมื่อดึงปฏิทินใหม่ (บันทึกลงไฟล์ JSON แบบ Atomic)
+    - /predict เรียก active_event(now) -> O(log n) และแม่นยำตามเวลาจริง ไม่ต้องรอรอบ Scrape
+    - ทุก Worker อ่านไฟล์เดียวกัน และโหลดใหม่เองเมื่อไฟล์เปลี่ยน (เช็ค mtime)
+    """
+
+    def __init__(self, path, window_minutes=30):
+        self.path = path
+        self.window = window_minutes * 60
+        self._index = ([], [], [])  # (starts, ends, names) สลับทั้งชุดทีเดียว -> อ่านได้โดยไม่ต้อง Lock
+        self._events = []
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._reload_if_changed()
+
+    def __len__(self):
+        return len(self._events)
+
+    def _build(self, events):
+        starts, ends, names = [], [], []
+        for ts, name in events:
+            start, end = ts - self.window, ts + self.window
+            if starts and start <= ends[-1]:
+                # ช่วงซ้อนกัน -> รวมเป็นช่วงเดียว
+                ends[-1] = max(ends[-1], end)
+                if name not in names[-1].split(' / '):
+                    names[-1] = f"{names[-1]} / {name}"
+            else:
+                starts.append(start)
+                ends.append(end)
+                names.append(name)
+        return starts, ends, names
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            try:
+                with open(self.path, 'r') as f:
+                    events = sorted((int(ts), str(name)) for ts, name in json.load(f)['events'])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"NEWS: (WARN) Could not read news index {self.path}: {e}")
+                return
+            self._events = events
+            self._index = self._build(events)
+            self._mtime = mtime
+
+    def replace(self, events):
+        """events: [(unix_ts, name), ...] ของข่าวแดงทั้งหมดในปฏิทิน"""
+        events = sorted((int(ts), str(name)) for ts, name in events)
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': int(time.time()), 'events': events}, f)
+            os.replace(tmp_path, self.path)
+            self._events = events
+            self._index = self._build(events)
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+    def active_event(self, now=None):
+        """ชื่อข่าวถ้า now อยู่ในช่วง Lockdown ไม่งั้น None"""
+        self._reload_if_changed()
+        now = time.time() if now is None else now
+        starts, ends, names = self._index
+        i = bisect.bisect_right(starts, now) - 1
+        if i >= 0 and now <= ends[i]:
+            return names[i]
+        return None
+
+    def next_event(self, now=None):
+        """(unix_ts, name) ของข่าวถัดไป หรือ None"""
+        self._reload_if_changed()
+        now = time.time() if now is None else now
+        events = self._events
+        i = bisect.bisect_right(events, (now, chr(0x10FFFF)))
+        return events[i] if i < len(events) else None
@@ -0,0 +1,95 @@
+import time
+import threading
+import traceback
+
+# ==============================================================================
+# PART 1: STAGED STARTUP (HTTP Server ตอบ /status ได้ทันที ของหนักโหลดใน Background)
+# ==============================================================================
+# Import linux_api มีแค่ Flask + numpy/pandas/talib (< 1 วินาที) -> Bind Port ได้ทันทีหลัง /restart
+# ขั้นที่เหลือ (Import TensorFlow / Load Model / News Scheduler) รันเรียงกันใน Thread เดียว
+# สถานะ: 'pending' -> 'starting' (stage = ขั้นที่กำลังทำ) -> 'ready' | 'failed'
+# ระหว่างนี้ /predict ตอบ 503 (EA ถือว่าไม่มีสัญญาณ) ส่วน /status, /command ใช้ได้ตามปกติ
+
+
+class StagedStartup:
+    """
+    stages = [(name, func, required), ...] -> func() คืน False หรือ Raise = ขั้นนั้นล้มเหลว
+    required=True ล้มเหลว -> หยุดทั้งหมด (state = 'failed'), required=False -> เตือนแล้วทำขั้นถัดไป
+    """
+
+    def __init__(self):
+        self.state = 'pending'
+        self.stage = None
+        self.error = None
+        self.durations = {}
+        self._started_at = None
+        self._finished_at = None
+        self._thread = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def start(self, stages, background=True):
+        """เริ่มครั้งเดียวต่อ Process (เรียกซ้ำจะไม่มีผล)"""
+        with self._lock:
+            if self._started_at is not None:
+                return self._thread
+            self._started_at = time.monotonic()
+            self.state = 'starting'
+        if not background:
+            self._run(stages)
+            return None
+        self._thread = threading.Thread(target=self._run, args=(list(stages),), name='obot-startup', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout=None):
+        """รอจนจบทุกขั้น -> True ถ้า ready"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def _run(self, stages):
+        try:
+            for name, func, required in stages:
+                self.stage = name
+                t0 = time.monotonic()
+                try:
+                    ok = func() is not False
+                    error = None if ok else f"{name} failed"
+                except Exception as e:
+                    ok, error = False, f"{name}: {e}"
+                    traceback.print_exc()
+                self.durations[name] = round(time.monotonic() - t0, 3)
+
+                if ok:
+                    print(f"STARTUP: ✅ {name} ({self.durations[name]:.2f}s)")
+                elif required:
+                    self.state, self.error = 'failed', error
+                    print(f"STARTUP: ❌ {error}. Startup stopped.")
+                    return
+                else:
+                    print(f"STARTUP: ⚠️ {error} (optional, continuing)")
+
+            self.state = 'ready'
+            print(f"STARTUP: ✅ Ready in {time.monotonic() - self._started_at:.1f}s")
+        finally:
+            self.stage = None
+            self._finished_at = time.monotonic()
+            self._done.set()
+
+    def status(self):
+        """สำหรับ /status"""
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = round((self._finished_at or time.monotonic()) - self._started_at, 3)
+        return {
+            'state': self.state, 'ready': self.ready, 'stage': self.stage,
+            'elapsed_s': elapsed, 'stages': dict(self.durations), 'error': self.error
+        }
@@ -0,0 +1,110 @@
+import os
+import json
+import sqlite3
+import threading
+
+# ==============================================================================
+# PART 1: SHARED STATE STORE (account_status / news_lockdown ข้าม Worker)
+# ==============================================================================
+# State แบ่งเป็น Namespace (เช่น 'account', 'news') แต่ละอันเป็น dict ของ field -> ค่า (JSON ได้)
+#   - InProcessStateStore : dict ใน Process เดียว (python linux_api.py)
+#   - SQLiteStateStore    : ไฟล์ SQLite (WAL) ใช้ร่วมกันทุก gunicorn Worker
+
+
+class InProcessStateStore:
+    """State ใน Memory ของ Process เดียว"""
+
+    def __init__(self, defaults):
+        self._data = {namespace: dict(fields) for namespace, fields in defaults.items()}
+        self._lock = threading.Lock()
+
+    def get(self, namespace):
+        with self._lock:
+            return dict(self._data.get(namespace, {}))
+
+    def update(self, namespace, **fields):
+        with self._lock:
+            self._data.setdefault(namespace, {}).update(fields)
+
+    def delete(self, namespace, *keys):
+        with self._lock:
+            fields = self._data.get(namespace, {})
+            for key in keys:
+                fields.pop(key, None)
+
+
+class SQLiteStateStore:
+    """
+    State ในไฟล์ SQLite (WAL) -> ทุก Process เห็นค่าเดียวกัน
+    อ่าน: แต่ละ Thread Cache ทั้งตารางไว้ แล้วเช็คแค่ PRAGMA data_version (เปลี่ยนเมื่อ Connection อื่น Commit)
+    -> /predict อ่าน State ได้ในระดับไมโครวินาทีโดยไม่ต้อง Query ตารางทุกครั้ง
+    reset=True: เขียนค่า defaults ทับตอนสร้าง (เช่น bot_status กลับเป็น STOPPED เมื่อ Start Service ใหม่)
+    """
+
+    def __init__(self, path, defaults, reset=True):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection().conn
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        sql = "INSERT OR REPLACE INTO state VALUES (?, ?, ?)" if reset else "INSERT OR IGNORE INTO state VALUES (?, ?, ?)"
+        rows = [(ns, key, json.dumps(value)) for ns, fields in defaults.items() for key, value in fields.items()]
+        with conn:
+            conn.executemany(sql, rows)
+
+    def _connection(self):
+        # Connection ต่อ Thread และต่อ PID (Connection ที่สร้างก่อน fork ห้ามใช้ใน Worker)
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn = conn
+            local.pid = os.getpid()
+            local.version = None
+            local.cache = {}
+        return local
+
+    def _snapshot(self):
+        local = self._connection()
+        version = local.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != local.version:
+            cache = {}
+            for namespace, key, value in local.conn.execute("SELECT namespace, key, value FROM state"):
+                cache.setdefault(namespace, {})[key] = json.loads(value)
+            local.cache = cache
+            local.version = version
+        return local.cache
+
+    def get(self, namespace):
+        return dict(self._snapshot().get(namespace, {}))
+
+    def update(self, namespace, **fields):
+        local = self._connection()
+        with local.conn:
+            local.conn.executemany(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?)",
+                [(namespace, key, json.dumps(value)) for key, value in fields.items()]
+            )
+        local.version = None  # data_version ไม่เปลี่ยนจาก Commit ของตัวเอง -> บังคับอ่านใหม่
+
+    def delete(self, namespace, *keys):
+        local = self._connection()
+        with local.conn:
+            local.conn.executemany(
+                "DELETE FROM state WHERE namespace = ? AND key = ?", [(namespace, key) for key in keys]
+            )
+        local.version = None
+
+
+def make_state_store(backend, defaults, path=None):
+    if backend == 'memory':
+        return InProcessStateStore(defaults)
+    if backend == 'sqlite':
+        if not path:
+            raise ValueError("SQLite state backend requires a database path.")
+        return SQLiteStateStore(path, defaults)
+    raise ValueError(f"Unknown state backend '{backend}'. Use 'memory' or 'sqlite'.")
@@ -1,7 +1,8 @@
 import telegram
 from telegram.ext import Application, CommandHandler, ContextTypes
-import requests
+import httpx
 import time
+import asyncio
 import os
 from pathlib import Path
 
@@ -30,6 +31,69 @@ except ValueError:
 
 API_URL = 'http://127.0.0.1:5000'  # สำหรับทดสอบในเครื่อง
 
+# Timeout (วินาที) ต่อ Endpoint (/retrain, /update_ea, /fix ตอบ job_id ทันที แล้วงานรันใน Background)
+API_TIMEOUTS = {
+    '/status': 5.0,
+    '/command': 5.0,
+    '/jobs': 5.0,
+    '/restart': 15.0,
+    '/retrain': 10.0,
+    '/update_ea': 10.0,
+    '/fix': 10.0,
+}
+
+# ติดตาม Background Job ของ API
+JOB_POLL_SECONDS = 3.0
+JOB_MAX_WAIT_SECONDS = 1800.0
+
+# HTTP Client แบบ Async ใช้ร่วมกันทุก Command (Keep-Alive ไป API ในเครื่อง) - สร้างใน post_init
+api_client = None
+
+async def api_request(method, path, **kwargs):
+    """เรียก Flask API โดยไม่ Block Event Loop (Handler อื่นยังตอบได้ระหว่างรอ)"""
+    endpoint = '/' + path.lstrip('/').split('/')[0]
+    timeout = httpx.Timeout(API_TIMEOUTS.get(endpoint, 30.0), connect=3.0)
+    return await api_client.request(method, path, timeout=timeout, **kwargs)
+
+async def follow_job(bot, job_id, title):
+    """Poll /jobs/<job_id> จนงานเสร็จ แล้วส่งผลเข้า Chat (รันเป็น Task แยก ไม่ Block Command อื่น)"""
+    deadline = time.monotonic() + JOB_MAX_WAIT_SECONDS
+    job = None
+    while time.monotonic() < deadline:
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        try:
+            response = await api_request('GET', f'/jobs/{job_id}')
+        except httpx.TransportError:
+            continue # (API อาจกำลัง Restart)
+        if response.status_code != 200:
+            break
+        job = response.json()
+        if job.get('status') in ('SUCCESS', 'FAIL'):
+            icon = "✅" if job['status'] == 'SUCCESS' else "❌"
+            message = f"{icon} **{title} {job['status']}** (job `{job_id}`)\n{job.get('message')}\n use /help to see commands"
+            await bot.send_message(chat_id=CHAT_ID, text=message, parse_mode='Markdown')
+            return
+
+    last = f"\nLast status: {job.get('status')} - {job.get('message')}" if job else ""
+    await bot.send_message(chat_id=CHAT_ID, text=f"⚠️ **{title}**: lost track of job `{job_id}`.{last}", parse_mode='Markdown')
+
+async def submit_job_command(update, context, path, title):
+    """ส่งคำสั่งที่เป็น Background Job -> ตอบ job_id ทันที แล้วแจ้งผลเมื่อเสร็จ"""
+    response = await api_request('POST', path)
+    if response.status_code == 202:
+        job = response.json()
+        if job.get('created'): # (งานเดิมที่ค้างอยู่มีคนติดตามแล้ว)
+            context.application.create_task(follow_job(context.bot, job['job_id'], title))
+        message = f"{job.get('message')} (job `{job['job_id']}`)\nI will report back when it finishes."
+    else:
+        try:
+            error_msg = response.json().get('message', 'API Error')
+        except:
+            error_msg = f"API Connection Error (Code {response.status_code})"
+        message = f"❌ **Error Triggering {title}**\n{error_msg}"
+        
+    await update.message.reply_text(message, parse_mode='Markdown')
+
 # --- Commands ---
 
 async def start_command(update, context):
@@ -39,7 +103,7 @@ async def start_command(update, context):
     # 🛑 (Optional Debug): ส่งข้อความทันทีเพื่อยืนยันการรับคำสั่ง
     await update.message.reply_text("⏳ Requesting OBot START Command...", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/command', json={'command': 'START'})
+    response = await api_request('POST', '/command', json={'command': 'START'})
     if response.status_code == 200:
         message = "🟢 **OBot Started!**\nMT5 Bot is instructed to start trading. \n use /help to see commands"
     else:
@@ -57,7 +121,7 @@ async def stop_command(update, context):
     
     await update.message.reply_text("⏳ Requesting OBot STOP Command...", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/command', json={'command': 'STOP'})
+    response = await api_request('POST', '/command', json={'command': 'STOP'})
     if response.status_code == 200:
         message = "🔴 **OBot Stopped!**\nMT5 Bot is instructed to stop trading.\n use /help to see commands"
     else:
@@ -74,7 +138,7 @@ async def status_command(update, context):
     if update.effective_chat.id != CHAT_ID: return 
 
     try:
-        response = requests.get(f'{API_URL}/status')
+        response = await api_request('GET', '/status')
         if response.status_code == 200:
             status_data = response.json()
             news_status = status_data.get('news_status', 'Unknown')
@@ -100,7 +164,7 @@ async def status_command(update, context):
             )
         else:
             message = f"❌ **Error retrieving status:** API returned {response.status_code}"
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         message = "❌ **API Connection Error:** Flask API is not running or ngrok URL is wrong."
     
     await update.message.reply_text(message, parse_mode='Markdown')
@@ -111,17 +175,7 @@ async def retrain_command(update, context):
     
     await update.message.reply_text("⏳ Requesting Model Retraining... (This may take a while)", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/retrain')
-    if response.status_code == 200:
-        message = f"**use /help to see commands **\n{response.json().get('message')}"
-    else:
-        try:
-            error_msg = response.json().get('message', 'API Error')
-        except:
-            error_msg = f"API Connection Error (Code {response.status_code})"
-        message = f"❌ **Error Triggering Retrain**\n{error_msg}"
-        
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await submit_job_command(update, context, '/retrain', 'Retrain')
 
 # 🆕 เพิ่ม Command /help
 async def help_command(update, context):
@@ -161,29 +215,28 @@ async def send_startup_message(token, chat_id):
 # 🆕 Define the post_init function
 async def post_init_callback(application: Application):
     """Callback function executed after the Application is initialized."""
+    global api_client
     print("Executing post_init callback...")
+    api_client = httpx.AsyncClient(
+        base_url=API_URL,
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0)
+    )
     # The application is ready, now we can send the message safely within the event loop
     await send_startup_message(TELEGRAM_TOKEN, CHAT_ID)
     print("Startup notification sent.")
 
+async def post_shutdown_callback(application: Application):
+    """ปิด HTTP Client ตอน Bot หยุด"""
+    if api_client is not None:
+        await api_client.aclose()
+
 async def update_command(update, context):
     """Handles /update command to update and recompile the EA."""
     if update.effective_chat.id != CHAT_ID: return 
     
     await update.message.reply_text("⏳ Requesting EA Update & Recompile... (This may take a moment)", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/update_ea') # เรียก Endpoint ใหม่
-    
-    if response.status_code == 200:
-        message = f"**{response.json().get('message')}**\n use /help to see commands"
-    else:
-        try:
-            error_msg = response.json().get('message', 'API Error')
-        except:
-            error_msg = f"API Connection Error (Code {response.status_code})"
-        message = f"❌ **Error Updating EA**\n{error_msg}"
-        
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await submit_job_command(update, context, '/update_ea', 'EA Update')
 
 async def restart_command(update, context):
     """Handles /restart command to restart the API service."""
@@ -191,7 +244,7 @@ async def restart_command(update, context):
     
     await update.message.reply_text("⏳ Requesting Service RESTART...", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/restart')
+    response = await api_request('POST', '/restart')
     if response.status_code == 200:
         message = "✅ **The Service Restarted!**\nService is restarting in the background."
     else:
@@ -206,18 +259,7 @@ async def fix_command(update, context):
     
     await update.message.reply_text("⏳ Requesting System FIX (Download & Reload files)... (Requires server restart after success)", parse_mode='Markdown')
     
-    response = requests.post(f'{API_URL}/fix') 
-    
-    if response.status_code == 200:
-        message = f"**{response.json().get('message')}**\n use /help to see commands"
-    else:
-        try:
-            error_msg = response.json().get('message', 'API Error')
-        except:
-            error_msg = f"API Connection Error (Code {response.status_code})"
-        message = f"❌ **Error Triggering FIX**\n{error_msg}"
-        
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await submit_job_command(update, context, '/fix', 'FIX')
 
 def main(): 
     """Start the Telegram Bot.""" 
@@ -227,7 +269,13 @@ def main():
 
     # 1. สร้าง Application และกำหนด post_init callback
     try:
-        application = Application.builder().token(TELEGRAM_TOKEN).post_init(post_init_callback).build()
+        # concurrent_updates: /retrain ที่รอนานไม่ทำให้ /status ต้องรอคิว
+        application = (
+            Application.builder().token(TELEGRAM_TOKEN)
+            .post_init(post_init_callback).post_shutdown(post_shutdown_callback)
+            .concurrent_updates(True)
+            .build()
+        )
     except telegram.error.InvalidToken as e:
         print(f"❌ Invalid Telegram Token: {e}")
         print("💡 Check that TELEGRAM_BOT_TOKEN in .env is correct.")
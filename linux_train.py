@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import argparse
+import resource
+
+import numpy as np
+
+from linux_model import compute_features_lite, REQUIRED_FEATURES, FEATURE_SET_VERSION
+from linux_ingest import load_bars
+from linux_inference import import_tensorflow
+
+# ==============================================================================
+# OFFLINE TRAINING (สร้าง model.h5 + scaler.pkl ใหม่จาก History ในเครื่อง บน CPU)
+#   python linux_train.py --m5 xauusd_m5.csv --usd usd_m5.csv --out-dir models/versions/20250101-120000
+#   python linux_train.py --m5 ... --init models/model.h5 --epochs 5      (Fine-tune จาก Model เดิม)
+# Label แบบเดียวกับ simulate_trades ของ linux_backtest (TP/SL ตาม ATR ภายใน horizon แท่ง)
+# Feature (Scale แล้ว) เก็บเป็น float32 Memmap บนดิสก์ -> tf.data ตัด Window ทีละ Batch (ไม่สร้าง Window ทั้งหมดใน RAM)
+# ผลลัพธ์ = Directory ของ Version นั้น: model.h5 + scaler.pkl + metadata.json (ใช้กับ load_assets / routes.json ได้ตรง ๆ)
+# /retrain ของ linux_api รันไฟล์นี้เป็น Process แยก (nice + จำกัด Thread / Memory) -> ไม่แย่ง CPU ของ /predict
+# ==============================================================================
+
+SEQUENCE_LENGTH = 50
+LABELS = ('HOLD', 'BUY', 'SELL')
+
+# ==============================================================================
+# PART 1: RESOURCE LIMITS (เรียกก่อน Import TensorFlow)
+# ==============================================================================
+
+def apply_resource_limits(nice=None, threads=None, max_memory_mb=None):
+    """
+    nice          : ลด Priority ของ Process นี้ (19 = ต่ำสุด) -> /predict ได้ CPU ก่อนเสมอ
+    threads       : จำนวน Thread สูงสุดของ TensorFlow / BLAS
+    max_memory_mb : RLIMIT_AS ของ Process (เกิน = MemoryError ใน Process นี้ ไม่ใช่ OOM Killer ยิง Service)
+    """
+    if nice:
+        os.nice(nice)
+    if threads:
+        for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS'):
+            os.environ[var] = str(threads)
+    if max_memory_mb:
+        limit = int(max_memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def report(percent, message):
+    """บรรทัด Progress ที่ run_retrain_job ของ linux_api อ่านไปอัปเดต Job"""
+    print(f"TRAIN: [{int(percent)}%] {message}", flush=True)
+
+# ==============================================================================
+# PART 2: DATASET (Features + Labels -> float32 Memmap)
+# ==============================================================================
+
+def label_bars(df_m5, atr, positions, horizon=12, tp_mult=2.0, sl_mult=1.5):
+    """
+    Label ของแท่งที่ positions (0 = HOLD, 1 = BUY, 2 = SELL, -1 = ข้อมูลไม่พอ)
+    เข้า Open แท่งถัดไป: BUY ถ้าฝั่ง Long โดน TP (ATR x tp_mult) ก่อน SL (ATR x sl_mult) ภายใน horizon แท่ง
+    SELL กลับกัน, ไม่มีฝั่งไหนชนะ = HOLD (แท่งที่โดนทั้ง SL และ TP นับเป็น SL เหมือน simulate_trades)
+    """
+    open_p, high_p, low_p = (df_m5[col].values for col in ('open', 'high', 'low'))
+    n_bars = len(df_m5)
+    labels = np.full(len(positions), -1, dtype=np.int64)
+    ok = (positions + horizon < n_bars) & np.isfinite(atr) & (atr > 0)
+    pos, a = positions[ok], atr[ok]
+
+    entry = open_p[pos + 1]
+    long_state = np.zeros(len(pos), dtype=np.int8)   # 0 = ยังไม่จบ, 1 = TP, -1 = SL
+    short_state = np.zeros(len(pos), dtype=np.int8)
+    for k in range(1, horizon + 1):
+        high_k, low_k = high_p[pos + k], low_p[pos + k]
+        open_long, open_short = long_state == 0, short_state == 0
+        long_sl, long_tp = low_k <= entry - a * sl_mult, high_k >= entry + a * tp_mult
+        short_sl, short_tp = high_k >= entry + a * sl_mult, low_k <= entry - a * tp_mult
+        long_state[open_long & long_sl] = -1
+        long_state[open_long & ~long_sl & long_tp] = 1
+        short_state[open_short & short_sl] = -1
+        short_state[open_short & ~short_sl & short_tp] = 1
+
+    labels[ok] = np.where(long_state == 1, 1, np.where(short_state == 1, 2, 0))
+    return labels
+
+
+def build_dataset(df_m5, df_usd, work_dir, seq_len=SEQUENCE_LENGTH, val_fraction=0.2,
+                  horizon=12, tp_mult=2.0, sl_mult=1.5, chunk_rows=100_000):
+    """
+    คืน dict: X (float32 Memmap ที่ Scale แล้ว), y, train_ends / val_ends (แถวสุดท้ายของแต่ละ Window), scaler, info
+    แบ่ง Train / Validation ตามเวลา (Validation = ช่วงท้าย) และเว้นช่วงระหว่างกัน horizon + seq_len แถว (ไม่ให้ Label รั่ว)
+    RobustScaler Fit เฉพาะช่วง Train
+    """
+    from sklearn.preprocessing import RobustScaler
+
+    features = compute_features_lite(df_m5, df_usd=df_usd)
+    if len(features) < seq_len + horizon + 2:
+        raise ValueError(f"Not enough feature rows to train: {len(features)}")
+
+    positions = df_m5.index.get_indexer(features.index)
+    y = label_bars(df_m5, features['atr_14'].values, positions, horizon, tp_mult, sl_mult)
+    ends = np.flatnonzero(y >= 0)
+    ends = ends[ends >= seq_len - 1]
+    n_val = int(len(ends) * val_fraction)
+    train_ends = ends[:len(ends) - n_val]
+    val_ends = ends[len(ends) - n_val:]
+    val_ends = val_ends[val_ends > train_ends[-1] + horizon + seq_len] if len(train_ends) else val_ends
+    if not len(train_ends):
+        raise ValueError("No labelled training windows.")
+
+    scaler = RobustScaler().fit(features.iloc[:train_ends[-1] + 1][REQUIRED_FEATURES].values)
+
+    # Scale ทีละ Chunk ลง Memmap -> RAM ไม่ต้องถือ Feature Matrix 2 ชุด
+    os.makedirs(work_dir, exist_ok=True)
+    X = np.lib.format.open_memmap(
+        os.path.join(work_dir, 'features.npy'), mode='w+', dtype=np.float32, shape=(len(features), len(REQUIRED_FEATURES)))
+    values = features[REQUIRED_FEATURES].values
+    for start in range(0, len(values), chunk_rows):
+        X[start:start + chunk_rows] = scaler.transform(values[start:start + chunk_rows])
+    X.flush()
+    del X, values
+
+    counts = np.bincount(y[train_ends], minlength=len(LABELS))
+    info = {
+        'bars': len(df_m5), 'feature_rows': len(features),
+        'first_bar': str(df_m5.index[0]), 'last_bar': str(df_m5.index[-1]),
+        'train_windows': int(len(train_ends)), 'val_windows': int(len(val_ends)),
+        'train_until': str(features.index[train_ends[-1]]),
+        'class_counts': dict(zip(LABELS, counts.tolist())),
+        'labels': {'horizon': horizon, 'tp_mult': tp_mult, 'sl_mult': sl_mult},
+    }
+    return {
+        'X': np.load(os.path.join(work_dir, 'features.npy'), mmap_mode='r'),
+        'y': y, 'train_ends': train_ends, 'val_ends': val_ends, 'scaler': scaler, 'info': info,
+    }
+
+
+def make_dataset(tf, X, y, ends, seq_len, batch_size, shuffle=False, seed=0):
+    """tf.data: Index ของแถวท้าย Window -> Batch -> ดึง (B, seq_len, 18) จาก Memmap ทีละ Batch"""
+    offsets = np.arange(1 - seq_len, 1)
+
+    def gather(batch_ends):
+        return X[batch_ends[:, None] + offsets], y[batch_ends]
+
+    ds = tf.data.Dataset.from_tensor_slices(ends.astype(np.int64))
+    if shuffle:
+        ds = ds.shuffle(min(len(ends), 100_000), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(lambda e: tf.numpy_function(gather, [e], (tf.float32, tf.int64)))
+    ds = ds.map(lambda xb, yb: (tf.ensure_shape(xb, (None, seq_len, X.shape[1])), tf.ensure_shape(yb, (None,))))
+    return ds.prefetch(2)
+
+# ==============================================================================
+# PART 3: MODEL (สถาปัตยกรรมเดียวกับ models/model.h5 เดิม)
+# ==============================================================================
+
+def build_model(tf, seq_len=SEQUENCE_LENGTH, n_features=len(REQUIRED_FEATURES), learning_rate=1e-4):
+    layers, l2 = tf.keras.layers, tf.keras.regularizers.l2
+    model = tf.keras.Sequential([
+        layers.Input(shape=(seq_len, n_features)),
+        layers.Conv1D(64, 3, padding='same', activation='relu'),
+        layers.BatchNormalization(),
+        layers.MaxPooling1D(2),
+        layers.Dropout(0.3),
+        layers.Bidirectional(layers.LSTM(64, kernel_regularizer=l2(0.005), recurrent_regularizer=l2(0.005))),
+        layers.BatchNormalization(),
+        layers.Dropout(0.3),
+        layers.Dense(32, activation='relu'),
+        layers.Dense(len(LABELS), activation='softmax'),
+    ])
+    compile_model(tf, model, learning_rate)
+    return model
+
+
+def compile_model(tf, model, learning_rate):
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='sparse_categorical_crossentropy', metrics=['accuracy']
+    )
+
+
+def train(args):
+    """เทรน 1 Version -> args.out_dir (model.h5, scaler.pkl, metadata.json) คืน metadata"""
+    started = time.time()
+    report(2, f"Loading bars from {args.m5}")
+    df_m5 = load_bars(args.m5)
+    df_usd = load_bars(args.usd) if args.usd else None
+
+    report(5, f"Building dataset ({len(df_m5)} bars)")
+    data = build_dataset(
+        df_m5, df_usd, args.out_dir, seq_len=args.seq_len, val_fraction=args.val_fraction,
+        horizon=args.horizon, tp_mult=args.tp_mult, sl_mult=args.sl_mult
+    )
+    del df_m5, df_usd
+    info = data['info']
+    report(15, f"Dataset ready: {info['train_windows']} train / {info['val_windows']} val windows, classes {info['class_counts']}")
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    tf = import_tensorflow(args.threads)
+    tf.keras.utils.set_random_seed(args.seed)
+    X, y = data['X'], data['y']
+    train_ds = make_dataset(tf, X, y, data['train_ends'], args.seq_len, args.batch_size, shuffle=True, seed=args.seed)
+    val_ds = make_dataset(tf, X, y, data['val_ends'], args.seq_len, args.batch_size) if len(data['val_ends']) else None
+
+    if args.init:
+        model = tf.keras.models.load_model(args.init)
+        if tuple(model.input_shape[1:]) != (args.seq_len, len(REQUIRED_FEATURES)):
+            raise ValueError(f"{args.init}: input shape {model.input_shape} != (None, {args.seq_len}, {len(REQUIRED_FEATURES)})")
+        compile_model(tf, model, args.learning_rate)
+    else:
+        model = build_model(tf, args.seq_len, len(REQUIRED_FEATURES), args.learning_rate)
+
+    # Class Weight แบบ Balanced (HOLD มักมากกว่า BUY/SELL หลายเท่า)
+    counts = np.array([info['class_counts'][label] for label in LABELS], dtype=np.float64)
+    class_weight = {i: float(counts.sum() / (len(LABELS) * c)) for i, c in enumerate(counts) if c > 0}
+
+    monitor = 'val_loss' if val_ds is not None else 'loss'
+
+    class Progress(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            scores = ', '.join(f"{k} {v:.4f}" for k, v in logs.items())
+            report(15 + 80 * (epoch + 1) / args.epochs, f"Epoch {epoch + 1}/{args.epochs}: {scores}")
+
+    history = model.fit(
+        train_ds, validation_data=val_ds, epochs=args.epochs, class_weight=class_weight, verbose=0,
+        callbacks=[
+            Progress(),
+            tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=args.patience, restore_best_weights=True),
+        ]
+    )
+
+    report(96, "Saving artifacts")
+    model_path = os.path.join(args.out_dir, 'model.h5')
+    scaler_path = os.path.join(args.out_dir, 'scaler.pkl')
+    model.save(model_path, include_optimizer=False)
+    with open(scaler_path, 'wb') as f:
+        pickle.dump(data['scaler'], f)
+    del X, data
+    os.remove(os.path.join(args.out_dir, 'features.npy'))
+
+    best = int(np.argmin(history.history[monitor]))
+    metadata = {
+        'version': os.path.basename(os.path.normpath(args.out_dir)),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'feature_set_version': FEATURE_SET_VERSION, 'features': REQUIRED_FEATURES, 'seq_len': args.seq_len,
+        'init': args.init, 'epochs_run': len(history.history[monitor]), 'best_epoch': best + 1,
+        'metrics': {k: round(float(v[best]), 6) for k, v in history.history.items()},
+        'class_weight': class_weight, 'data': info,
+        'model_sha256': file_sha256(model_path), 'scaler_sha256': file_sha256(scaler_path),
+        'train_seconds': round(time.time() - started, 1),
+    }
+    with open(os.path.join(args.out_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    report(100, f"Saved {args.out_dir} ({metadata['metrics']})")
+    return metadata
+
+# ==============================================================================
+# PART 4: ARTIFACTS
+# ==============================================================================
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def new_version_dir(root='models/versions'):
+    return os.path.join(root, time.strftime('%Y%m%d-%H%M%S'))
+
+
+def promote(version_dir, model_path, scaler_path):
+    """คัดลอก model.h5 / scaler.pkl ของ Version นั้นไปแทนไฟล์ที่ load_assets ใช้ (แทนที่ทั้งคู่หลังคัดลอกครบ)"""
+    pairs = [(os.path.join(version_dir, 'model.h5'), model_path), (os.path.join(version_dir, 'scaler.pkl'), scaler_path)]
+    for src, dst in pairs:
+        if not os.path.exists(src):
+            raise FileNotFoundError(src)
+    for src, dst in pairs:
+        shutil.copyfile(src, dst + '.promote')
+    for src, dst in pairs:
+        os.replace(dst + '.promote', dst)
+
+# ==============================================================================
+# PART 5: CLI
+# ==============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the OBot Lite model from local M5 history.")
+    parser.add_argument('--m5', required=True, help="XAUUSD M5 bars (CSV/Parquet)")
+    parser.add_argument('--usd', help="USD index M5 bars (CSV/Parquet)")
+    parser.add_argument('--out-dir', help="Version directory (default models/versions/<timestamp>)")
+    parser.add_argument('--init', help="Existing model.h5 to fine-tune instead of training from scratch")
+    parser.add_argument('--seq-len', type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--horizon', type=int, default=12)
+    parser.add_argument('--tp-mult', type=float, default=2.0)
+    parser.add_argument('--sl-mult', type=float, default=1.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--nice', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--max-memory-mb', type=int, default=0, help="RLIMIT_AS for this process (0 = no limit)")
+    parser.add_argument('--promote', action='store_true', help="Copy the result over models/model.h5 + models/scaler.pkl")
+    args = parser.parse_args(argv)
+
+    apply_resource_limits(args.nice, args.threads, args.max_memory_mb)
+    args.out_dir = args.out_dir or new_version_dir()
+    if os.path.exists(os.path.join(args.out_dir, 'model.h5')):
+        parser.error(f"{args.out_dir} already contains a model")
+
+    try:
+        train(args)
+    except Exception as e:
+        print(f"TRAIN: ❌ {type(e).__name__}: {e}", flush=True)
+        return 1
+
+    if args.promote:
+        promote(args.out_dir, 'models/model.h5', 'models/scaler.pkl')
+        print("TRAIN: ✅ Promoted to models/model.h5 + models/scaler.pkl", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import os
+import sys
+import contextlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# linux_api อ่าน Path แบบ Relative (models/model.h5) + Environment ตอน Import
+os.chdir(ROOT)
+os.environ.setdefault('OBOT_STATE_BACKEND', 'memory')
+os.environ.setdefault('OBOT_MODEL_ROUTES', '')  # (ไม่มี routes.json -> มีแค่ Default Route)
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+
+def make_bars(n=1200, seed=0, start='2024-01-01 00:00'):
+    """แท่ง M5 สังเคราะห์ (XAUUSD + USD) แบบ Random Walk -> (df_m5, df_usd) index = time"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, periods=int(n * 1.6), freq='5min')
+    times = times[times.dayofweek < 5][:n]
+    close = 2000 + np.cumsum(rng.normal(0, 1.0, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.2, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.8, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.8, n))
+    df_m5 = pd.DataFrame({
+        'open': np.round(open_, 2), 'high': np.round(high, 2), 'low': np.round(low, 2),
+        'close': np.round(close, 2), 'tick_volume': rng.integers(50, 500, n)
+    }, index=pd.DatetimeIndex(times, name='time'))
+    usd = np.round(100 + np.cumsum(rng.normal(0, 0.05, n)), 3)
+    df_usd = pd.DataFrame({
+        'open': usd, 'high': usd + 0.01, 'low': usd - 0.01, 'close': usd, 'tick_volume': 1
+    }, index=pd.DatetimeIndex(times, name='time'))
+    return df_m5, df_usd
+
+
+def to_records(df, newest_first=True):
+    """DataFrame -> List ของ Bar dict แบบ GetRatesJSON ของ EA (แท่งล่าสุดก่อน)"""
+    records = [
+        {'time': int(t.value // 10**9), 'open': r.open, 'high': r.high, 'low': r.low,
+         'close': r.close, 'tick_volume': int(r.tick_volume), 'real_volume': 0}
+        for t, r in df.iterrows()
+    ]
+    return records[::-1] if newest_first else records
+
+
+@pytest.fixture(scope='session')
+def api():
+    import linux_api
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert linux_api.load_assets()
+    linux_api.state_store.update('account', bot_status='RUNNING')
+    return linux_api
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+def post_predict(client, payload, query=''):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return client.post('/predict' + query, data=json.dumps(payload).encode() + b'\x00')
@@ -0,0 +1,23 @@
+import numpy as np
+
+from linux_cache import bars_fingerprint
+from linux_ingest import bars_to_columns
+from conftest import make_bars, to_records
+
+
+def test_fingerprint_covers_whole_window():
+    df_m5, df_usd = make_bars(300, seed=3)
+    m5, usd = bars_to_columns(to_records(df_m5)), bars_to_columns(to_records(df_usd))
+    key = bars_fingerprint('XAUUSD', m5, usd)
+    assert key == bars_fingerprint('XAUUSD', {f: v.copy() for f, v in m5.items()}, usd)
+    assert key[1] == int(np.max(m5['time']))
+
+    # แท่งเก่า (ไม่ใช่ 3 แท่งท้าย) ถูกแก้ -> Key ใหม่
+    revised = {f: v.copy() for f, v in m5.items()}
+    revised['close'][-200] += 0.5
+    assert bars_fingerprint('XAUUSD', revised, usd) != key
+
+    revised_usd = {f: v.copy() for f, v in usd.items()}
+    revised_usd['close'][-150] += 0.001
+    assert bars_fingerprint('XAUUSD', m5, revised_usd) != key
+    assert bars_fingerprint('XAUUSD', m5, None) != key
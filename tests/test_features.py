@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+import talib
+
+import linux_model
+from linux_model import (
+    REQUIRED_FEATURES, StreamingFeatureEngine, calibrate_talib_flavor, columnar_parity, compute_features_lite,
+    _TalibATR, _TalibEMA, _TalibRSI
+)
+from conftest import make_bars
+
+
+@pytest.mark.parametrize('with_usd', [True, False], ids=['usd', 'no_usd'])
+def test_columnar_parity(with_usd):
+    df_m5, df_usd = make_bars(1200, seed=3)
+    assert columnar_parity(df_m5, df_usd if with_usd else None) <= 1e-5
+
+
+def test_columnar_parity_rows_differ(monkeypatch):
+    """FeatureBuffer ได้แถวไม่ตรงกับ compute_features_lite -> ValueError (ไม่ใช่ค่า Error ที่ดูเหมือนผ่าน)"""
+    df_m5, df_usd = make_bars(600, seed=4)
+    monkeypatch.setattr(linux_model, 'compute_features_lite',
+                        lambda df_m5, df_usd=None: compute_features_lite(df_m5, df_usd).iloc[1:])
+    with pytest.raises(ValueError, match='rows differ'):
+        columnar_parity(df_m5, df_usd)
+
+
+def assert_rows_exact(engine, df_m5, df_usd):
+    expected = compute_features_lite(df_m5, df_usd)[REQUIRED_FEATURES]
+    produced = engine.feature_frame()
+    assert len(produced) >= 1000
+    assert produced.index.equals(expected.index)
+    np.testing.assert_array_equal(produced.values, expected.values)
+
+
+@pytest.mark.parametrize('with_usd', [True, False], ids=['usd', 'no_usd'])
+def test_streaming_matches_batch(with_usd):
+    """Seed จาก History ทั้งก้อน -> ทุก Row ตรงกับ compute_features_lite ทุก bit"""
+    df_m5, df_usd = make_bars(1700, seed=8)
+    df_usd = df_usd if with_usd else None
+    engine = StreamingFeatureEngine.from_frames(df_m5, df_usd, max_rows=2000)
+    assert engine.use_usd == with_usd
+    assert_rows_exact(engine, df_m5, df_usd)
+
+
+@pytest.mark.parametrize('with_usd', [True, False], ids=['usd', 'no_usd'])
+def test_streaming_bar_by_bar_with_forming_bars(with_usd):
+    """ต่อทีละแท่ง (แท่ง Forming ถูกส่งซ้ำด้วยค่าใหม่ก่อนปิด) -> ผลเท่ากับ Batch ของ History สุดท้าย"""
+    df_m5, df_usd = make_bars(1700, seed=9)
+    df_usd = df_usd if with_usd else None
+    engine = StreamingFeatureEngine.from_frames(df_m5.iloc[:600], None if df_usd is None else df_usd.iloc[:600],
+                                                max_rows=2000)
+    for i in range(600, len(df_m5)):
+        t = df_m5.index[i].value // 10**9
+        bar = df_m5.iloc[i]
+        usd_close = None if df_usd is None else df_usd['close'].iloc[i]
+        if usd_close is not None:
+            engine.push_usd(t, usd_close)
+        engine.push_bar(t, bar.open, bar.high, bar.low, bar.open, bar.tick_volume // 2)  # (Forming)
+        engine.push_bar(t, bar.open, bar.high, bar.low, bar.close, bar.tick_volume)
+    assert_rows_exact(engine, df_m5, df_usd)
+
+
+def test_calibrate_talib_flavor_matches_installed_talib():
+    flavor = calibrate_talib_flavor()
+    assert flavor['exact'] and calibrate_talib_flavor() is flavor  # (Calibrate ครั้งเดียวต่อ Process)
+
+    # สูตรที่เลือกต้องตรงกับ talib บนข้อมูลชุดอื่นที่ไม่ได้ใช้ Probe ด้วย
+    df_m5, _ = make_bars(800, seed=10)
+    high, low, close = (df_m5[col].values.astype(np.float64) for col in ('high', 'low', 'close'))
+    ema, atr, rsi = _TalibEMA(50, flavor['ema']), _TalibATR(14, flavor['atr']), _TalibRSI(14, flavor['rsi'])
+    np.testing.assert_array_equal([ema.push(x) for x in close], talib.EMA(close, timeperiod=50))
+    np.testing.assert_array_equal([atr.push(h, l, c) for h, l, c in zip(high, low, close)],
+                                  talib.ATR(high, low, close, timeperiod=14))
+    np.testing.assert_array_equal([rsi.push(x) for x in close], talib.RSI(close, timeperiod=14))
+
+
+def test_calibrate_talib_flavor_without_exact_match(monkeypatch, capsys):
+    """talib Build ที่ไม่มีสูตรไหนตรง -> ใช้ 'classic' และ exact = False"""
+    monkeypatch.setattr(linux_model, '_TALIB_FLAVOR', None)
+    rsi = talib.RSI
+    monkeypatch.setattr(talib, 'RSI', lambda close, timeperiod: rsi(close, timeperiod=timeperiod) * (1 + 1e-12))
+    flavor = calibrate_talib_flavor()
+    assert flavor['rsi'] == 'classic' and not flavor['exact']
+    assert 'No exact RSI match' in capsys.readouterr().out
+    assert StreamingFeatureEngine().exact is False
+
+
+@pytest.mark.parametrize('start, drop_every', [
+    ('2024-01-01 00:00', None),   # เริ่มต้นชั่วโมง/ต้นวัน
+    ('2024-01-03 10:35', None),   # เริ่มกลางชั่วโมง กลางวัน
+    ('2024-01-05 21:50', None),   # เริ่มคืนวันศุกร์ -> ข้าม Weekend ทันที
+    ('2024-01-02 13:15', 7),      # แท่งหายเป็นช่วง ๆ (ชั่วโมงที่มีแท่งไม่ครบ)
+], ids=['aligned', 'mid_hour_mid_day', 'friday_night', 'missing_bars'])
+def test_resample_context_matches_pandas(start, drop_every):
+    """resample_context (Array Bucketing) ต้องเท่ากับ pandas resample + reindex ffill เดิมทุก bit (รวม NaN ช่วงแรก)"""
+    from linux_bench import resample_arrays, resample_context_pandas
+    df_m5, _ = make_bars(3000, seed=11, start=start)
+    if drop_every is not None:
+        df_m5 = df_m5[np.arange(len(df_m5)) % drop_every != 0]
+    assert (df_m5.index.dayofweek >= 5).sum() == 0 and df_m5.index.to_series().diff().max() >= pd.Timedelta(days=2)
+
+    names = ('ema50_h1', 'pivot', 'r1', 's1')
+    for name, produced, expected in zip(names, resample_arrays(df_m5), resample_context_pandas(df_m5)):
+        assert np.array_equal(produced, expected, equal_nan=True), name
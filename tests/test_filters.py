@@ -0,0 +1,108 @@
+import json
+import math
+import itertools
+
+import numpy as np
+import pytest
+
+from linux_config import Config, default_route, configured_routes
+from linux_filters import DEFAULT_FILTERS, SignalDecision, run_pipeline
+from linux_inference import ModelRoute, load_routes
+
+
+def baseline_decision(probs, atr, close, ema200, use_ema_filter=True):
+    """Logic เดิมแบบ Inline ของ preprocess_and_predict + predict_signal (ก่อนมี Filter Pipeline)"""
+    cls = np.argmax(probs)
+    probability = np.max(probs)
+    signal = {0: 'HOLD', 1: 'BUY', 2: 'SELL'}.get(cls, 'NONE')
+    if use_ema_filter and not np.isnan(ema200):
+        if signal == 'BUY' and close < ema200:
+            signal = 'HOLD'
+        elif signal == 'SELL' and close > ema200:
+            signal = 'HOLD'
+    if atr < Config.MIN_ATR:
+        signal = 'HOLD'
+
+    dynamic_risk_pct = 0.5
+    if probability < Config.PREDICTION_THRESHOLD:
+        signal = 'HOLD'
+    elif probability > 0.75:
+        dynamic_risk_pct = 2.0
+    elif probability > 0.65:
+        dynamic_risk_pct = 1.5
+    elif probability > Config.PREDICTION_THRESHOLD:
+        dynamic_risk_pct = 1.0
+    return signal, float(probability), dynamic_risk_pct
+
+
+PROBS = [
+    [0.8, 0.1, 0.1], [0.1, 0.8, 0.1], [0.1, 0.1, 0.8],      # > 0.75
+    [0.2, 0.7, 0.1], [0.15, 0.15, 0.7],                      # 0.65 - 0.75
+    [0.3, 0.6, 0.1], [0.2, 0.2, 0.6],                        # Threshold - 0.65
+    [0.3, 0.55, 0.15], [0.25, 0.2, 0.55],                    # = Threshold พอดี
+    [0.3, 0.5, 0.2], [0.25, 0.25, 0.5],                      # < Threshold
+]
+ATRS = [0.5, Config.MIN_ATR, 3.0]
+CLOSE_EMA = [(2010.0, 2000.0), (1990.0, 2000.0), (2000.0, 2000.0), (2000.0, math.nan)]
+
+
+@pytest.mark.parametrize('use_ema_filter', [True, False], ids=['ema_filter', 'no_ema_filter'])
+def test_default_filters_match_baseline(use_ema_filter):
+    """Default Route (ema200_trend, min_atr, threshold) = Logic เดิมทุกกรณีของ Signal / Probability / Dynamic Risk"""
+    filters = [name for name in Config.SIGNAL_FILTERS if use_ema_filter or name != 'ema200_trend']
+    route = ModelRoute(default_route.symbol, 'baseline', default_route.model_path, default_route.scaler_path,
+                       default_route.features, threshold=Config.PREDICTION_THRESHOLD, min_atr=Config.MIN_ATR,
+                       filters=filters)
+    for probs, atr, (close, ema200) in itertools.product(PROBS, ATRS, CLOSE_EMA):
+        decision = run_pipeline(route.pipeline, SignalDecision(np.array(probs), atr, {'close': close, 'ema200': ema200}),
+                                route)
+        expected = baseline_decision(np.array(probs), atr, close, ema200, use_ema_filter)
+        assert (decision.signal, decision.probability, decision.dynamic_risk) == expected, (probs, atr, close, ema200)
+
+
+def test_default_route_uses_default_filters():
+    assert default_route.filters == DEFAULT_FILTERS == tuple(Config.SIGNAL_FILTERS)
+
+
+# (filter, probs, atr, close, ema200, signal, dynamic_risk, note ที่ต้องมี)
+FILTER_CASES = [
+    ('ema200_trend', [0.1, 0.8, 0.1], 2.0, 1990.0, 2000.0, 'HOLD', 0.5, 'Blocked BUY'),
+    ('ema200_trend', [0.1, 0.8, 0.1], 2.0, 2010.0, 2000.0, 'BUY', 0.5, None),
+    ('ema200_trend', [0.1, 0.1, 0.8], 2.0, 2010.0, 2000.0, 'HOLD', 0.5, 'Blocked SELL'),
+    ('ema200_trend', [0.1, 0.1, 0.8], 2.0, 1990.0, 2000.0, 'SELL', 0.5, None),
+    ('ema200_trend', [0.1, 0.8, 0.1], 2.0, 1990.0, math.nan, 'BUY', 0.5, None),  # (EMA200 ยังไม่พร้อม)
+    ('ema200_trend', [0.8, 0.1, 0.1], 2.0, 1990.0, 2000.0, 'HOLD', 0.5, None),
+    ('min_atr', [0.1, 0.8, 0.1], 0.5, 2000.0, 2000.0, 'HOLD', 0.5, 'Low Volatility'),
+    ('min_atr', [0.1, 0.8, 0.1], 1.0, 2000.0, 2000.0, 'BUY', 0.5, None),  # (ATR = min_atr พอดี ผ่าน)
+    ('threshold', [0.1, 0.8, 0.1], 2.0, 2000.0, 2000.0, 'BUY', 2.0, None),
+    ('threshold', [0.1, 0.1, 0.7], 2.0, 2000.0, 2000.0, 'SELL', 1.5, None),
+    ('threshold', [0.3, 0.6, 0.1], 2.0, 2000.0, 2000.0, 'BUY', 1.0, None),
+    ('threshold', [0.3, 0.55, 0.15], 2.0, 2000.0, 2000.0, 'BUY', 0.5, None),  # (= Threshold: ผ่านแต่ Risk 0.5)
+    ('threshold', [0.3, 0.5, 0.2], 2.0, 2000.0, 2000.0, 'HOLD', 0.5, None),
+]
+
+
+@pytest.mark.parametrize('name, probs, atr, close, ema200, signal, risk, note', FILTER_CASES)
+def test_single_filter(name, probs, atr, close, ema200, signal, risk, note):
+    route = ModelRoute('XAUUSD', name, 'model.h5', 'scaler.pkl', default_route.features,
+                       threshold=0.55, min_atr=1.0, filters=[name])
+    decision = run_pipeline(route.pipeline, SignalDecision(np.array(probs), atr, {'close': close, 'ema200': ema200}),
+                            route)
+    assert (decision.signal, decision.dynamic_risk) == (signal, risk)
+    assert decision.raw_signal == {0: 'HOLD', 1: 'BUY', 2: 'SELL'}[int(np.argmax(probs))]
+    if note is None:
+        assert decision.notes == []
+    else:
+        assert len(decision.notes) == 1 and note in decision.notes[0]
+
+
+def test_unknown_filter_rejected_at_load(tmp_path):
+    routes_path = tmp_path / 'routes.json'
+    routes_path.write_text(json.dumps([{
+        'symbol': 'EURUSD', 'model_path': 'models/model.h5', 'scaler_path': 'models/scaler.pkl',
+        'filters': ['min_atr', 'ema_200_trend']
+    }]))
+    with pytest.raises(ValueError, match='ema_200_trend'):
+        load_routes(str(routes_path), default_route)
+    with pytest.raises(ValueError, match='Unknown signal filters'):
+        list(configured_routes(str(routes_path)))
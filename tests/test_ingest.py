@@ -0,0 +1,148 @@
+import io
+import json
+import struct
+import contextlib
+
+import numpy as np
+import pytest
+
+from linux_ingest import (
+    BAR_FIELDS, WIRE_CONTENT_TYPE, bars_to_columns, decode_bar_payload, decode_wire_payload, encode_wire_payload,
+    _decode_bar_array
+)
+from conftest import make_bars, to_records, post_predict
+
+BAR_FORMAT = ('{{"time":{time}, "open":{open:.5f}, "high":{high:.5f}, "low":{low:.5f}, '
+              '"close":{close:.5f}, "tick_volume":{tick_volume}, "real_volume":0}}')
+
+
+def ea_array(df, bar_format=BAR_FORMAT):
+    """Array ของแท่งแบบ GetRatesJSON ของ EA (แท่งล่าสุดก่อน)"""
+    bars = [bar_format.format(time=int(t.value // 10**9), open=r.open, high=r.high, low=r.low,
+                              close=r.close, tick_volume=int(r.tick_volume))
+            for t, r in df.iloc[::-1].iterrows()]
+    return '[' + ','.join(bars) + ']'
+
+
+def ea_payload(m5_array, usd_array, symbol='XAUUSD'):
+    """Payload แบบ Legacy ของ EA: Array ว่างของ m30/h1/h4 + NUL ต่อท้ายจาก StringToCharArray"""
+    return ('{"symbol":"%s", "m5_data":%s, "usd_m5":%s, "m30_data":[], "h1_data":[], "h4_data":[], "usd_h1":[]}'
+            % (symbol, m5_array, usd_array)).encode() + b'\x00'
+
+
+def assert_matches_json(body):
+    """decode_bar_payload ต้องได้ผลเดียวกับ json.loads -> bars_to_columns"""
+    expected = json.loads(body.rstrip(b'\x00'))
+    data = decode_bar_payload(body)
+    assert set(data) == set(expected)
+    for key, value in expected.items():
+        if key in ('m5_data', 'usd_m5'):
+            columns = bars_to_columns(value)
+            for field in BAR_FIELDS:
+                assert data[key][field].dtype == columns[field].dtype
+                np.testing.assert_array_equal(data[key][field], columns[field])
+        else:
+            assert data[key] == value
+    return data
+
+
+@pytest.fixture(scope='module')
+def bars():
+    df_m5, df_usd = make_bars(300, seed=6)
+    return df_m5, df_usd
+
+
+def test_ea_payload_round_trip(bars):
+    df_m5, df_usd = bars
+    m5_array = ea_array(df_m5)
+    assert _decode_bar_array(m5_array.encode()) is not None  # (Fast Path ไม่ใช่ Fallback)
+    data = assert_matches_json(ea_payload(m5_array, ea_array(df_usd)))
+    assert len(data['m5_data']['time']) == 300 and data['m30_data'] == []
+
+
+def test_empty_arrays():
+    data = assert_matches_json(ea_payload('[]', '[ ]'))
+    assert all(len(data[key]['time']) == 0 for key in ('m5_data', 'usd_m5'))
+
+
+@pytest.mark.parametrize('bar_format', [
+    BAR_FORMAT.replace('"real_volume":0', '"real_volume":null'),
+    BAR_FORMAT.replace('{open:.5f}', '{open:.5e}'),
+    BAR_FORMAT.replace('"time":{time}, "open":{open:.5f}', '"open":{open:.5f}, "time":{time}'),
+], ids=['null', 'exponent', 'reordered'])
+def test_fallback_to_json(bars, bar_format):
+    """รูปแบบที่ Fast Path อ่านไม่ได้ -> Fallback json.loads ได้ค่าเดียวกัน"""
+    df_m5, df_usd = bars
+    # (แท่งเดียวที่ต่างจากที่เหลือก็พอให้ Fallback)
+    m5_array = ea_array(df_m5.iloc[1:]).rstrip(']') + ',' + ea_array(df_m5.iloc[:1], bar_format).lstrip('[')
+    assert _decode_bar_array(m5_array.encode()) is None
+    assert_matches_json(ea_payload(m5_array, ea_array(df_usd)))
+
+
+def test_missing_real_volume(bars):
+    df_m5, df_usd = bars
+    bar_format = BAR_FORMAT.replace(', "real_volume":0', '')
+    assert_matches_json(ea_payload(ea_array(df_m5, bar_format), ea_array(df_usd, bar_format)))
+
+
+def test_symbol_containing_bracket(bars):
+    df_m5, df_usd = bars
+    data = assert_matches_json(ea_payload(ea_array(df_m5), ea_array(df_usd), symbol='XAU]USD[m'))
+    assert data['symbol'] == 'XAU]USD[m'
+
+
+def frame_columns(df):
+    return bars_to_columns(to_records(df, newest_first=False))
+
+
+def test_wire_layout_and_round_trip(bars):
+    df_m5, df_usd = bars
+    meta = {'symbol': 'XAUUSD', 'mode': 'full', 'session': ''}
+    m5, usd = frame_columns(df_m5), frame_columns(df_usd.iloc[:120])
+    body = encode_wire_payload(meta, m5, usd)
+
+    # Header 16 Bytes | Meta เติม 0 ให้ครบ 8 Bytes | Record 48 Bytes ต่อแท่ง (M5 แล้วตามด้วย USD)
+    meta_bytes = json.dumps(meta).encode()
+    assert body[:16] == struct.pack('<4sIII', b'OBB1', len(meta_bytes), 300, 120)
+    offset = (16 + len(meta_bytes) + 7) // 8 * 8
+    assert body[16:16 + len(meta_bytes)] == meta_bytes and not body[16 + len(meta_bytes):offset].strip(b'\x00')
+    assert len(body) == offset + 48 * (300 + 120)
+    assert struct.unpack_from('<qddddq', body, offset) == (
+        m5['time'][0], m5['open'][0], m5['high'][0], m5['low'][0], m5['close'][0], int(m5['tick_volume'][0]))
+
+    data = decode_wire_payload(body)
+    assert {key: data[key] for key in meta} == meta
+    for key, columns in (('m5_data', m5), ('usd_m5', usd)):
+        for field in BAR_FIELDS:
+            assert data[key][field].dtype == columns[field].dtype
+            np.testing.assert_array_equal(data[key][field], columns[field])
+
+
+def test_wire_rejects_malformed(bars):
+    df_m5, _ = bars
+    body = encode_wire_payload({'symbol': 'XAUUSD'}, frame_columns(df_m5.iloc[:10]))
+    malformed = {
+        'truncated_header': body[:12],
+        'truncated_records': body[:-1],
+        'bad_magic': b'OBB2' + body[4:],
+        'bad_length': body[:4] + struct.pack('<I', 200) + body[8:],
+        'trailing_bytes': body + b'\x01' * 8,
+    }
+    for name, payload in malformed.items():
+        with pytest.raises(ValueError):
+            decode_wire_payload(payload)
+
+
+def test_predict_binary_matches_json(api, client, bars, monkeypatch):
+    """/predict แบบ application/x-obot-bars ต้องได้ Probability เดียวกับ JSON Payload"""
+    monkeypatch.setattr(api.Config, 'USE_PREDICTION_CACHE', False)
+    df_m5, df_usd = make_bars(1000, seed=7)
+    json_response = post_predict(client, {'symbol': 'WIRETEST', 'm5_data': to_records(df_m5),
+                                          'usd_m5': to_records(df_usd)})
+    body = encode_wire_payload({'symbol': 'WIRETEST'}, frame_columns(df_m5), frame_columns(df_usd))
+    with contextlib.redirect_stdout(io.StringIO()):
+        wire_response = client.post('/predict', data=body, content_type=WIRE_CONTENT_TYPE)
+
+    assert json_response.status_code == 200 and wire_response.status_code == 200, wire_response.json
+    assert wire_response.json['probability'] == json_response.json['probability']
+    assert wire_response.json['signal'] == json_response.json['signal']
@@ -0,0 +1,82 @@
+import os
+import time
+import subprocess
+import threading
+
+from linux_state import make_state_store, SQLiteStateStore
+from linux_jobs import JobManager, JOB_RUNNING, JOB_QUEUED, JOB_FAIL, JOB_SUCCESS
+
+
+def dead_pid():
+    proc = subprocess.Popen(['true'])
+    proc.wait()
+    return proc.pid
+
+
+def leftover_job(job_id, status, pid, heartbeat=None):
+    now = time.time()
+    return {
+        'id': job_id, 'kind': 'retrain', 'status': status, 'progress': 40, 'message': 'Training...',
+        'created': now - 600, 'started': now - 600, 'finished': None,
+        'pid': pid, 'owner': 'old', 'heartbeat': now if heartbeat is None else heartbeat
+    }
+
+
+def test_startup_fails_jobs_left_by_dead_process(tmp_path):
+    store = make_state_store('sqlite', {'jobs': {}}, path=str(tmp_path / 'state.db'))
+    store.update('jobs', a=leftover_job('a', JOB_RUNNING, dead_pid()), b=leftover_job('b', JOB_QUEUED, os.getpid()))
+
+    manager = JobManager(store)
+    assert manager.get('a')['status'] == JOB_FAIL
+    assert manager.get('b')['status'] == JOB_FAIL  # (PID เดียวกับ Process นี้ = Process ก่อน Restart)
+
+
+def test_stale_heartbeat_does_not_block_new_job(tmp_path):
+    store = make_state_store('sqlite', {'jobs': {}}, path=str(tmp_path / 'state.db'))
+    manager = JobManager(store, stale_seconds=60)
+    live = subprocess.Popen(['sleep', '30'])
+    try:
+        store.update('jobs', fresh=leftover_job('fresh', JOB_RUNNING, live.pid))
+        assert manager.active('retrain')['id'] == 'fresh'
+
+        store.update('jobs', fresh=leftover_job('fresh', JOB_RUNNING, live.pid, heartbeat=time.time() - 120))
+        done = threading.Event()
+        job, created = manager.submit('retrain', lambda progress: (done.set(), (True, 'ok'))[1])
+        assert created and done.wait(5)
+        assert manager.get('fresh')['status'] == JOB_FAIL
+    finally:
+        live.kill()
+
+    for _ in range(50):
+        if manager.get(job['id'])['status'] == JOB_SUCCESS:
+            break
+        time.sleep(0.05)
+    assert manager.get(job['id'])['status'] == JOB_SUCCESS
+
+
+def _submit_in_process(db_path, lock_path, barrier, results):
+    store = SQLiteStateStore(db_path, {'jobs': {}}, reset=False)
+    manager = JobManager(store, lock_path=lock_path)
+    barrier.wait()
+    job, created = manager.submit('retrain', lambda progress: (time.sleep(2), (True, 'ok'))[1])
+    results.put((job['id'], created))
+    time.sleep(1)  # (Process ยังอยู่ -> Job ไม่ถูกมองว่า Orphaned ระหว่างที่ Process อื่นเช็ค)
+
+
+def test_concurrent_submit_across_processes_creates_one_job(tmp_path):
+    """หลาย Worker ส่งงานชนิดเดียวกันพร้อมกัน -> ได้ Job เดียว ทุก Process คืน job_id เดียวกัน"""
+    import multiprocessing
+    ctx = multiprocessing.get_context('fork')
+    db_path = str(tmp_path / 'state.db')
+    make_state_store('sqlite', {'jobs': {}}, path=db_path)
+    barrier, results = ctx.Barrier(8), ctx.Queue()
+    procs = [ctx.Process(target=_submit_in_process, args=(db_path, str(tmp_path / 'job_{kind}.lock'), barrier, results))
+             for _ in range(8)]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get(timeout=30) for _ in procs]
+    for proc in procs:
+        proc.join(timeout=30)
+
+    assert sum(created for _, created in outcomes) == 1
+    assert len({job_id for job_id, _ in outcomes}) == 1
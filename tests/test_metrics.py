@@ -0,0 +1,64 @@
+import time
+import threading
+
+from linux_metrics import PipelineMetrics
+from linux_state import SQLiteStateStore, InProcessStateStore
+
+
+class RecordingStore(InProcessStateStore):
+    """InProcessStateStore ที่จำว่า update ถูกเรียกจาก Thread ไหน"""
+
+    def __init__(self):
+        super().__init__({})
+        self.threads = []
+
+    def update(self, namespace, **fields):
+        self.threads.append(threading.current_thread().name)
+        super().update(namespace, **fields)
+
+
+def test_observe_and_inc_do_not_flush_on_calling_thread():
+    store = RecordingStore()
+    metrics = PipelineMetrics(store, flush_seconds=0.05)
+    for _ in range(200):
+        metrics.observe('model', 0.002)
+        metrics.inc('requests', 'predicted')
+    assert 'MainThread' not in store.threads
+
+    for _ in range(100):
+        if store.threads:
+            break
+        time.sleep(0.01)
+    assert store.threads and set(store.threads) == {'obot-metrics-flush'}
+    (snapshot,) = store.get('metrics').values()
+    assert snapshot['counters'] == {'requests|predicted': 200}
+    assert sum(snapshot['histograms']['model']['counts']) == 200
+
+
+def test_metrics_flush_does_not_invalidate_state_cache(tmp_path):
+    """Metrics อยู่คนละไฟล์กับ State -> Flush ไม่เปลี่ยน data_version ของ State (Cache ของ Worker อื่นไม่ต้องอ่านใหม่)"""
+    state_path = str(tmp_path / 'state.db')
+    state = SQLiteStateStore(state_path, {'account': {'bot_status': 'RUNNING'}})
+    other_worker = SQLiteStateStore(state_path, {}, reset=False)
+    assert other_worker.get('account')['bot_status'] == 'RUNNING'
+    cache = other_worker._local.cache
+
+    metrics = PipelineMetrics(SQLiteStateStore(str(tmp_path / 'metrics.db'), {}), flush_seconds=3600)
+    metrics.inc('requests', 'predicted')
+    metrics.flush()
+    assert other_worker.get('account')['bot_status'] == 'RUNNING'
+    assert other_worker._local.cache is cache
+
+    state.update('account', bot_status='STOPPED')  # (ตรวจว่า Cache ยังเห็น Commit ของ State จริง)
+    assert other_worker.get('account')['bot_status'] == 'STOPPED'
+
+
+def test_summary_counts_local_observations_before_flush():
+    metrics = PipelineMetrics(InProcessStateStore({}), flush_seconds=3600)
+    metrics.observe('total', 0.004)
+    metrics.inc('cache_hits', 'results')
+    metrics.inc('cache_misses', 'results', n=3)
+    summary = metrics.summary()
+    assert summary['workers'] == 1
+    assert summary['stages']['total']['count'] == 1
+    assert summary['cache_hit_rate'] == {'results': 0.25}
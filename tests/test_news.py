@@ -0,0 +1,99 @@
+import os
+import json
+
+import pytest
+
+from linux_config import Config
+from linux_news import NewsIntervalIndex
+
+WINDOW = Config.NEWS_LOCKDOWN_MINUTES * 60
+T0 = 1_704_200_000
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / 'news_index.json')
+
+
+def make_index(path, events):
+    index = NewsIntervalIndex(path, window_minutes=Config.NEWS_LOCKDOWN_MINUTES)
+    index.replace(events)
+    return index
+
+
+def bump_mtime(path):
+    """(mtime บาง Filesystem ละเอียดไม่พอ ถ้าเขียนไฟล์ 2 ครั้งติดกัน)"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_intervals_merge(index_path):
+    events = [
+        (T0 + 3 * 3600, 'CPI'),
+        (T0, 'NFP'),
+        (T0 + 2 * WINDOW - 60, 'Unemployment Rate'),  # ซ้อนกับ NFP
+        (T0 + 2 * WINDOW - 60, 'NFP'),                # ชื่อซ้ำในช่วงเดียวกัน -> ไม่ต่อชื่อซ้ำ
+        (T0 + 3 * 3600 + 2 * WINDOW, 'FOMC'),         # ช่วงชนกันพอดี (start == end ก่อนหน้า) -> รวม
+        (T0 + 6 * 3600, 'Retail Sales'),
+    ]
+    index = make_index(index_path, events)
+    starts, ends, names = index._index
+    assert starts == [T0 - WINDOW, T0 + 3 * 3600 - WINDOW, T0 + 6 * 3600 - WINDOW]
+    assert ends == [T0 + 3 * WINDOW - 60, T0 + 3 * 3600 + 3 * WINDOW, T0 + 6 * 3600 + WINDOW]
+    assert names == ['NFP / Unemployment Rate', 'CPI / FOMC', 'Retail Sales']
+    assert len(index) == len(events)
+
+
+def test_active_event_edges(index_path):
+    index = make_index(index_path, [(T0, 'NFP'), (T0 + 3 * 3600, 'CPI'), (T0 + 3 * 3600 + 2 * WINDOW + 1, 'FOMC')])
+    starts, ends, names = index._index
+    assert len(starts) == 3  # (FOMC ห่างจาก CPI 1 วินาที -> ไม่ Merge)
+    for start, end, name in zip(starts, ends, names):
+        assert index.active_event(start) == name
+        assert index.active_event((start + end) / 2) == name
+        assert index.active_event(end) == name
+        assert index.active_event(end + 0.001) != name
+        assert index.active_event(start - 0.001) != name
+    assert index.active_event(T0 - WINDOW - 1) is None
+    assert index.active_event(T0 + 3 * 3600 + WINDOW + 0.5) is None  # (ช่องว่าง 1 วินาทีระหว่าง CPI กับ FOMC)
+    assert index.active_event(ends[-1] + 1) is None
+
+
+def test_empty_and_missing_file(index_path):
+    index = NewsIntervalIndex(index_path)
+    assert len(index) == 0 and index.active_event(T0) is None and index.next_event(T0) is None
+    index.replace([])
+    assert index.active_event(T0) is None
+
+
+def test_next_event(index_path):
+    index = make_index(index_path, [(T0 + 3600, 'CPI'), (T0, 'NFP')])
+    assert index.next_event(T0 - 1) == (T0, 'NFP')
+    assert index.next_event(T0) == (T0 + 3600, 'CPI')
+    assert index.next_event(T0 + 3600) is None
+
+
+def test_persist_and_reload_on_mtime(index_path):
+    """Scraper (Worker หนึ่ง) replace() -> Worker อื่นที่เปิด Index ไว้แล้วเห็นเองเมื่อไฟล์เปลี่ยน"""
+    reader = NewsIntervalIndex(index_path, window_minutes=Config.NEWS_LOCKDOWN_MINUTES)
+    assert reader.active_event(T0) is None
+
+    writer = make_index(index_path, [(T0, 'NFP')])
+    with open(index_path) as f:
+        assert json.load(f)['events'] == [[T0, 'NFP']]
+    assert reader.active_event(T0) == 'NFP'
+
+    writer.replace([(T0 + 3600, 'CPI')])
+    bump_mtime(index_path)
+    assert reader.active_event(T0) is None
+    assert reader.active_event(T0 + 3600) == 'CPI'
+    assert len(NewsIntervalIndex(index_path)) == 1  # (Process ใหม่โหลดจากไฟล์)
+
+
+def test_corrupt_file_keeps_previous_index(index_path, capsys):
+    reader = make_index(index_path, [(T0, 'NFP')])
+    with open(index_path, 'w') as f:
+        f.write('{"events": [[')
+    bump_mtime(index_path)
+    assert reader.active_event(T0) == 'NFP'
+    assert 'Could not read news index' in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import RobustScaler
+
+from linux_config import configured_routes
+from linux_model import compute_features_lite
+from conftest import make_bars, to_records, post_predict
+
+# Route ที่ใช้ Feature บางส่วน และเรียงไม่เหมือน REQUIRED_FEATURES
+SUBSET_FEATURES = ['rsi_14', 'log_ret_1', 'atr_14', 'dist_ema50']
+SEQ_LEN = 50
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return make_bars(1100, seed=5)
+
+
+@pytest.fixture(scope='module')
+def subset_route(api, bars, tmp_path_factory):
+    import tensorflow as tf
+    tmp = tmp_path_factory.mktemp('subset_route')
+    df_m5, df_usd = bars
+
+    scaler = RobustScaler().fit(compute_features_lite(df_m5, df_usd)[SUBSET_FEATURES])
+    with open(tmp / 'scaler.pkl', 'wb') as f:
+        pickle.dump(scaler, f)
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(SEQ_LEN, len(SUBSET_FEATURES))),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(3, activation='softmax'),
+    ])
+    model.save(tmp / 'model.h5')
+
+    routes_path = tmp / 'routes.json'
+    routes_path.write_text(json.dumps([{
+        'symbol': 'XAUUSD', 'model': 'subset', 'model_path': str(tmp / 'model.h5'),
+        'scaler_path': str(tmp / 'scaler.pkl'), 'features': SUBSET_FEATURES, 'min_atr': 0.0
+    }]))
+    (route,) = configured_routes(str(routes_path))
+    api.model_router.add(route)
+    with api.model_router.use(route, wait=True) as bundle:
+        assert bundle is not None
+
+    # ผลที่ควรได้: Feature ตามลำดับของ Route -> Scaler -> Model
+    window = compute_features_lite(df_m5.iloc[:1000], df_usd.iloc[:1000])[SUBSET_FEATURES].iloc[-SEQ_LEN:]
+    expected = model.predict(scaler.transform(window)[None, ...].astype(np.float32), verbose=0)[0]
+    return route, float(np.max(expected))
+
+
+@pytest.mark.parametrize('streaming, columnar', [(True, False), (False, True), (False, False)],
+                         ids=['streaming', 'columnar', 'dataframe'])
+def test_subset_feature_route(api, client, bars, subset_route, monkeypatch, streaming, columnar):
+    route, expected = subset_route
+    monkeypatch.setattr(api.Config, 'USE_PREDICTION_CACHE', False)
+    monkeypatch.setattr(api.Config, 'USE_STREAMING_FEATURES', streaming)
+    monkeypatch.setattr(api.Config, 'USE_COLUMNAR_FEATURES', columnar)
+    api.feature_engines.clear()
+
+    df_m5, df_usd = bars
+    payload = {'symbol': 'XAUUSD', 'model': route.model,
+               'm5_data': to_records(df_m5.iloc[:1000]), 'usd_m5': to_records(df_usd.iloc[:1000])}
+    response = post_predict(client, payload)
+    assert response.status_code == 200, response.json
+    assert response.json['model'] == route.name
+    assert response.json['probability'] == pytest.approx(expected, abs=1e-5)
+
+
+def test_route_scaler_must_match_features(api, subset_route, tmp_path):
+    """Scaler ไม่ตรงกับ route.features -> routes.json โหลดได้ (ไม่ Unpickle ตอน Import) แต่ Router ปฏิเสธตอนโหลดใน Worker"""
+    from linux_inference import ModelRouter
+    route, _ = subset_route
+    router = ModelRouter(api.model_load_kwargs())
+    routes_path = tmp_path / 'routes.json'
+    for name, features in (('fewer', SUBSET_FEATURES[:3]), ('reordered', SUBSET_FEATURES[::-1])):
+        routes_path.write_text(json.dumps([{
+            'symbol': 'XAUUSD', 'model': name, 'model_path': route.model_path,
+            'scaler_path': route.scaler_path, 'features': features
+        }]))
+        (broken,) = configured_routes(str(routes_path))
+        router.add(broken)
+        with router.use(broken, wait=True) as bundle:
+            assert bundle is None
+        assert 'Scaler' in router.error(broken)
@@ -0,0 +1,38 @@
+import pytest
+
+from linux_ingest import SessionStore, ResyncRequired, bars_to_columns
+from conftest import make_bars, to_records
+
+
+def test_delta_on_second_worker_does_not_resync(tmp_path):
+    """2 Worker (SessionStore คนละ Process) ใช้ Directory เดียวกัน: Delta ตก Worker ไหนก็ต่อได้"""
+    df_m5, df_usd = make_bars(1010, seed=7)
+    worker_a = SessionStore(capacity=1000, shared_dir=str(tmp_path))
+    worker_b = SessionStore(capacity=1000, shared_dir=str(tmp_path))
+
+    def columns(df, start, end, newest_first=False):
+        return bars_to_columns(to_records(df.iloc[start:end], newest_first=newest_first))
+
+    session = worker_a.create('XAUUSD')
+    session.load_snapshot(columns(df_m5, 0, 1000, True), columns(df_usd, 0, 1000, True))
+
+    # Delta ถัดไปตก Worker B, แล้วกลับมา Worker A (ที่ยังถือ Buffer รุ่นเก่าใน Memory)
+    for worker, end in ((worker_b, 1001), (worker_b, 1002), (worker_a, 1003), (worker_b, 1004)):
+        shared = worker.get(session.session_id, 'XAUUSD')
+        shared.apply_delta(columns(df_m5, end - 2, end), columns(df_usd, end - 2, end))
+        assert shared.m5.last_time == df_m5.index[end - 1].value // 10**9
+        assert len(shared.m5) == 1000
+
+    a = worker_a.get(session.session_id, 'XAUUSD')
+    a.refresh()
+    assert list(a.m5.view('close')) == list(df_m5['close'].iloc[4:1004])
+    features_a = a.sync_engine().feature_window(50)
+    features_b = worker_b.get(session.session_id, 'XAUUSD').sync_engine().feature_window(50)
+    assert (features_a == features_b).all()
+
+    # Full Snapshot ใหม่แทน Session เดิม -> Session เดิมต้อง Resync ทุก Worker
+    worker_b.create('XAUUSD', replaces=session.session_id)
+    with pytest.raises(ResyncRequired):
+        worker_a.get(session.session_id, 'XAUUSD').apply_delta(columns(df_m5, 1003, 1005), columns(df_usd, 1003, 1005))
+    with pytest.raises(ResyncRequired):
+        SessionStore(shared_dir=str(tmp_path)).get(session.session_id, 'XAUUSD')
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+import subprocess
+import multiprocessing
+
+import pytest
+
+from linux_state import SQLiteStateStore, InProcessStateStore, make_state_store
+
+DEFAULTS = {'account': {'bot_status': 'STOPPED', 'balance': 0.0}, 'news': {'message': 'starting'}}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'state.db')
+
+
+def test_update_visible_through_second_connection(db_path):
+    a = SQLiteStateStore(db_path, DEFAULTS)
+    b = SQLiteStateStore(db_path, DEFAULTS, reset=False)
+    assert a.get('account')['bot_status'] == 'STOPPED'
+
+    # ไม่มี Commit ใหม่ -> ใช้ Cache เดิม (ไม่ Query ตาราง)
+    cache = a._local.cache
+    a.get('account')
+    assert a._local.cache is cache
+
+    b.update('account', bot_status='RUNNING', balance=1000.5)
+    assert a.get('account') == {'bot_status': 'RUNNING', 'balance': 1000.5}
+    assert a._local.cache is not cache  # (data_version เปลี่ยน -> อ่านใหม่)
+
+    b.delete('account', 'balance')
+    assert a.get('account') == {'bot_status': 'RUNNING'}
+    assert a.get('missing') == {}
+
+
+def test_own_update_visible_immediately(db_path):
+    store = SQLiteStateStore(db_path, DEFAULTS)
+    store.get('news')
+    store.update('news', message='lockdown')
+    assert store.get('news') == {'message': 'lockdown'}
+
+
+def test_get_returns_copy(db_path):
+    store = SQLiteStateStore(db_path, DEFAULTS)
+    store.get('account')['bot_status'] = 'RUNNING'
+    assert store.get('account')['bot_status'] == 'STOPPED'
+
+
+def test_reset(db_path):
+    SQLiteStateStore(db_path, DEFAULTS).update('account', bot_status='RUNNING', last_signal='BUY')
+
+    # reset=False: ค่าเดิมอยู่ครบ เติมแค่ Key ที่ยังไม่มี
+    kept = SQLiteStateStore(db_path, {'account': {'bot_status': 'STOPPED', 'equity': 0.0}}, reset=False)
+    assert kept.get('account') == {'bot_status': 'RUNNING', 'balance': 0.0, 'last_signal': 'BUY', 'equity': 0.0}
+
+    # reset=True (Start Service ใหม่): defaults ทับ, Key อื่นไม่ถูกลบ
+    fresh = SQLiteStateStore(db_path, DEFAULTS)
+    assert fresh.get('account') == {'bot_status': 'STOPPED', 'balance': 0.0, 'last_signal': 'BUY', 'equity': 0.0}
+    assert kept.get('account')['bot_status'] == 'STOPPED'
+
+
+def test_connection_per_thread(db_path):
+    store = SQLiteStateStore(db_path, DEFAULTS)
+    store.get('account')
+    seen = {}
+
+    def worker():
+        seen['conn'] = store._connection().conn
+        store.update('account', bot_status='RUNNING')
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen['conn'] is not store._connection().conn
+    assert store.get('account')['bot_status'] == 'RUNNING'
+
+
+def _forked_update(store):
+    store.update('account', bot_status='RUNNING')
+    os._exit(0 if store.get('account')['bot_status'] == 'RUNNING' else 1)
+
+
+def test_forked_process_uses_own_connection(db_path):
+    """Store ที่สร้างก่อน fork (เหมือน gunicorn preload) -> Worker เขียนผ่าน Connection ใหม่ของตัวเอง"""
+    store = SQLiteStateStore(db_path, DEFAULTS)
+    assert store.get('account')['bot_status'] == 'STOPPED'
+    proc = multiprocessing.get_context('fork').Process(target=_forked_update, args=(store,))
+    proc.start()
+    proc.join(timeout=30)
+    assert proc.exitcode == 0
+    assert store.get('account')['bot_status'] == 'RUNNING'
+
+
+def test_update_from_subprocess(db_path):
+    store = SQLiteStateStore(db_path, DEFAULTS)
+    assert store.get('news') == {'message': 'starting'}
+    code = (
+        "import sys; sys.path.insert(0, sys.argv[1]); from linux_state import SQLiteStateStore; "
+        "SQLiteStateStore(sys.argv[2], {}, reset=False).update('news', message='NFP lockdown')"
+    )
+    subprocess.run([sys.executable, '-c', code, ROOT, db_path], check=True, timeout=60)
+    assert store.get('news') == {'message': 'NFP lockdown'}
+
+
+def test_make_state_store(db_path):
+    assert isinstance(make_state_store('memory', DEFAULTS), InProcessStateStore)
+    assert isinstance(make_state_store('sqlite', DEFAULTS, path=db_path), SQLiteStateStore)
+    with pytest.raises(ValueError):
+        make_state_store('sqlite', DEFAULTS)
+    with pytest.raises(ValueError):
+        make_state_store('redis', DEFAULTS)
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from conftest import make_bars, to_records, post_predict
+
+
+def test_newest_first_payload_extends_engine(api, client):
+    """EA ส่งแท่งล่าสุดก่อน: Request ที่สองต้องต่อ Engine เดิม ไม่ Seed ใหม่"""
+    df_m5, df_usd = make_bars(1100, seed=1)
+    symbol = 'STREAMTEST'
+
+    def payload(end):
+        return {'symbol': symbol, 'm5_data': to_records(df_m5.iloc[end - 1000:end]),
+                'usd_m5': to_records(df_usd.iloc[end - 1000:end])}
+
+    response = post_predict(client, payload(1000))
+    assert response.status_code == 200, response.json
+    engine = api.feature_engines[symbol]
+    assert engine.last_time == df_m5.index[999].value // 10**9
+
+    response = post_predict(client, payload(1001))
+    assert response.status_code == 200, response.json
+    assert api.feature_engines[symbol] is engine
+    assert engine.last_time == df_m5.index[1000].value // 10**9
+
+
+def test_sort_bar_frame_orders_and_drops_duplicates(api):
+    df_m5, _ = make_bars(10, seed=2)
+    shuffled = df_m5.iloc[::-1]
+    duplicated = pd.concat([shuffled, df_m5.iloc[[3]].assign(close=1.0)])
+    result = api.sort_bar_frame(duplicated)
+    assert result.index.is_monotonic_increasing and not result.index.has_duplicates
+    assert result['close'].iloc[3] == 1.0